@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the DCF engine and the valuation server.
+
+Generates seeded synthetic valuations with the same schema as
+valuations/*.json (cycling through every development stage in STAGE_MAP)
+and reports, as JSON:
+
+  - calculate_dcf() single-call latency percentiles
+  - calculate_dcf() throughput over 1k and 100k documents
+  - /api/valuations listing time over 100 and 10k files (cold and warm)
+  - concurrent /api/valuations/{id}/dcf throughput against a local server
+  - Monte Carlo cost per draw, relative to one calculate_dcf() call
+
+    python3 benchmark.py --output results.json
+    python3 benchmark.py --quick          # smaller sizes for a fast smoke run
+
+Compare two result files to spot regressions between commits. The Monte
+Carlo benchmark also fails the run (exit status 1) when a draw costs more
+than MONTE_CARLO_DRAW_BUDGET calculate_dcf() calls, so a per-draw path that
+starts building the full projection again cannot slip through.
+"""
+
+import argparse
+import http.client
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import server
+
+THERAPEUTIC_AREAS = (
+    "Oncology", "CNS / Neurology", "Immunology", "Cardiovascular",
+    "Metabolic", "Infectious Disease", "Rare Disease", "Ophthalmology",
+)
+MODALITIES = ("Small molecule", "Monoclonal antibody", "Gene therapy", "Cell therapy", "ADC", "siRNA")
+CONFIDENCE_LEVELS = ("High", "Medium", "Low")
+ROMAN_NUMERALS = {'i': 'I', 'ii': 'II', 'iii': 'III'}
+# Unique documents kept in memory for throughput runs; larger runs cycle through them
+MAX_DOCUMENT_POOL = 10_000
+# A Monte Carlo draw values one phase at a time in closed form; building the
+# per-year projection for every draw instead costs over a quarter of a
+# calculate_dcf() call, well past this
+MONTE_CARLO_DRAW_BUDGET = 0.15
+
+
+def _stage_label(stage_key):
+    """Turn a STAGE_MAP key like 'phase ii ready' into 'Phase II Ready'."""
+    return " ".join(ROMAN_NUMERALS.get(word, word.capitalize()) for word in stage_key.split())
+
+
+STAGES = tuple(_stage_label(key) for key in sorted(server.STAGE_MAP))
+
+
+def _param(rng, value, unit, source="Synthetic benchmark data"):
+    return {
+        "value": value,
+        "unit": unit,
+        "source": source,
+        "url": "https://example.com/benchmark",
+        "explanation": f"Synthetic value drawn for benchmarking ({rng.randrange(1000)}).",
+        "confidence": rng.choice(CONFIDENCE_LEVELS),
+    }
+
+
+def generate_valuation(rng, index):
+    """Return one realistic synthetic valuation document.
+
+    Development stages cycle with ``index`` so every STAGE_MAP stage is
+    covered; everything else is drawn from ``rng``.
+    """
+    area = rng.choice(THERAPEUTIC_AREAS)
+    pos = [round(rng.uniform(lo, hi), 1) for lo, hi in ((45, 75), (20, 45), (40, 70), (80, 95))]
+    generated = datetime(2024, 1, 1) + timedelta(days=rng.randrange(730))
+    return {
+        "assetOverview": {
+            "assetName": f"BB-{index:06d} ({rng.choice(MODALITIES)})",
+            "therapeuticArea": area,
+            "mechanismOfAction": f"Synthetic mechanism {rng.randrange(100)}",
+            "modality": rng.choice(MODALITIES),
+            "currentDevelopmentStage": STAGES[index % len(STAGES)],
+            "biomarkerStatus": {
+                "hasBiomarker": rng.random() < 0.5,
+                "biomarkerType": rng.choice(("validated", "exploratory", "none")),
+                "notes": "Synthetic biomarker notes.",
+            },
+        },
+        "marketParameters": {
+            "totalAddressableMarket": _param(rng, rng.randrange(5_000, 2_000_000), "patients"),
+            "peakMarketShare": _param(rng, round(rng.uniform(2, 35), 1), "%"),
+            "yearsToPeakAdoption": _param(rng, rng.randint(3, 8), "years"),
+            "annualPricing": _param(rng, rng.randrange(5_000, 400_000, 500), "USD per patient per year"),
+            "lossOfExclusivity": _param(rng, rng.randint(8, 14), "years from approval"),
+            "yearsToDeclinePostLOE": _param(rng, rng.randint(2, 7), "years"),
+            "terminalMarketShare": _param(rng, round(rng.uniform(5, 40), 1), "%"),
+        },
+        "developmentTimeline": {
+            key: _param(rng, round(rng.uniform(lo, hi), 1), "years")
+            for key, lo, hi in (("phaseIDuration", 1, 2.5), ("phaseIIDuration", 2, 4),
+                                ("phaseIIIDuration", 2.5, 5), ("approvalDuration", 0.8, 1.5))
+        },
+        "clinicalTrialCosts": {
+            key: _param(rng, round(rng.uniform(lo, hi), 1), "USD millions")
+            for key, lo, hi in (("phaseI", 3, 15), ("phaseII", 10, 60), ("phaseIII", 40, 250), ("approval", 1, 5))
+        },
+        "probabilityOfSuccess": {
+            "phaseI": _param(rng, pos[0], "%"),
+            "phaseII": _param(rng, pos[1], "%"),
+            "phaseIII": _param(rng, pos[2], "%"),
+            "approval": _param(rng, pos[3], "%"),
+        },
+        "financialParameters": {
+            "costOfGoodsSold": _param(rng, rng.randint(5, 25), "% of revenue"),
+            "operatingExpenses": _param(rng, rng.randint(25, 45), "% of revenue"),
+            "taxRate": _param(rng, rng.randint(15, 28), "%"),
+            "discountRate": _param(rng, round(rng.uniform(8, 14), 1), "%"),
+        },
+        "metadata": {
+            "generatedDate": generated.strftime("%Y-%m-%dT00:00:00Z"),
+            "currency": "USD",
+            "geographicScope": "United States",
+            "notes": "Synthetic valuation generated by benchmark.py.",
+        },
+    }
+
+
+def generate_valuations(count, seed=0):
+    """Return ``count`` synthetic valuations; the same seed gives the same documents."""
+    rng = random.Random(seed)
+    return [generate_valuation(rng, index) for index in range(count)]
+
+
+def write_valuations(directory, count, seed=0):
+    """Write ``count`` synthetic valuations to ``directory`` as bench-NNNNNN.json; returns their ids."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    ids = []
+    for index in range(count):
+        valuation_id = f"bench-{index:06d}"
+        (directory / f"{valuation_id}.json").write_text(json.dumps(generate_valuation(rng, index)))
+        ids.append(valuation_id)
+    return ids
+
+
+def _summarize_durations(samples):
+    """Latency statistics in microseconds for a list of nanosecond samples."""
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] / 1000
+    return {
+        "samples": len(samples),
+        "meanUs": statistics.fmean(samples) / 1000,
+        "p50Us": pick(0.50),
+        "p95Us": pick(0.95),
+        "p99Us": pick(0.99),
+        "maxUs": samples[-1] / 1000,
+    }
+
+
+def bench_dcf_latency(count, seed):
+    """Time calculate_dcf() one call at a time."""
+    documents = generate_valuations(count, seed)
+    server.calculate_dcf(documents[0])  # warm up
+    samples = []
+    for document in documents:
+        start = time.perf_counter_ns()
+        server.calculate_dcf(document)
+        samples.append(time.perf_counter_ns() - start)
+    return _summarize_durations(samples)
+
+
+def bench_dcf_throughput(sizes, seed):
+    """Time calculate_dcf() over batches of documents."""
+    pool = generate_valuations(min(max(sizes), MAX_DOCUMENT_POOL), seed)
+    results = []
+    for size in sizes:
+        start = time.perf_counter()
+        for i in range(size):
+            server.calculate_dcf(pool[i % len(pool)])
+        elapsed = time.perf_counter() - start
+        results.append({
+            "documents": size,
+            "uniqueDocuments": min(size, len(pool)),
+            "seconds": elapsed,
+            "documentsPerSecond": size / elapsed,
+        })
+    return results
+
+
+def bench_monte_carlo(count, draws, seed):
+    """Time simulate_npv_chunk() per draw against calculate_dcf() on the same documents.
+
+    The ratio is what is checked against MONTE_CARLO_DRAW_BUDGET: it is much
+    less sensitive to the machine than the absolute time per draw.
+    """
+    documents = generate_valuations(count, seed)
+    server.simulate_npv_chunk(documents[0], draws, seed)  # warm up
+
+    start = time.perf_counter()
+    for document in documents:
+        server.simulate_npv_chunk(document, draws, seed)
+    per_draw = (time.perf_counter() - start) / (count * draws)
+
+    calls = max(draws // 20, 1)
+    start = time.perf_counter()
+    for document in documents:
+        for _ in range(calls):
+            server.calculate_dcf(document)
+    per_dcf = (time.perf_counter() - start) / (count * calls)
+
+    return {
+        "documents": count,
+        "drawsPerDocument": draws,
+        "usPerDraw": per_draw * 1e6,
+        "usPerDcf": per_dcf * 1e6,
+        "drawToDcfRatio": per_draw / per_dcf,
+        "budget": MONTE_CARLO_DRAW_BUDGET,
+    }
+
+
+class QuietHandler(server.BioBucksHandler):
+    """BioBucksHandler without per-request logging."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """A PooledHTTPServer on an ephemeral localhost port, run from a thread.
+
+    The server gets its own ValuationBackend over ``directory``, so nothing
+    built for one run (search index, change feed, listeners) outlives it.
+    """
+
+    def __init__(self, workers, directory):
+        self.backend = server.ValuationBackend(server.ValuationIndex(directory))
+        self.httpd = server.PooledHTTPServer(("127.0.0.1", 0), QuietHandler, workers=workers,
+                                             backend=self.backend)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.backend.close()
+
+    def connect(self):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+
+
+def _get(connection, path):
+    connection.request("GET", path)
+    response = connection.getresponse()
+    body = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"GET {path} returned {response.status}: {body[:200]!r}")
+    return response, body
+
+
+def bench_listing(sizes, seed, workers, repeats):
+    """Time /api/valuations over directories of synthetic files."""
+    results = []
+    for size in sizes:
+        directory = Path(tempfile.mkdtemp(prefix="biobucks-bench-"))
+        try:
+            write_valuations(directory, size, seed)
+            with LocalServer(workers, directory) as local:
+                connection = local.connect()
+                start = time.perf_counter_ns()
+                _, body = _get(connection, "/api/valuations")
+                cold = time.perf_counter_ns() - start
+                if len(json.loads(body)) != size:
+                    raise RuntimeError("listing returned the wrong number of valuations")
+                samples = []
+                for _ in range(repeats):
+                    start = time.perf_counter_ns()
+                    _get(connection, "/api/valuations")
+                    samples.append(time.perf_counter_ns() - start)
+                connection.close()
+            results.append({
+                "files": size,
+                "coldMs": cold / 1e6,
+                "warm": _summarize_durations(samples),
+                "responseBytes": len(body),
+            })
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_concurrent_dcf(count, seed, workers, concurrency_levels, requests_per_client):
+    """Measure /dcf throughput with several keep-alive clients.
+
+    The "hot" workload repeats a few valuations (DCF cache hits); the
+    "cold" one cycles through more valuations than the DCF cache holds.
+    """
+    directory = Path(tempfile.mkdtemp(prefix="biobucks-bench-"))
+    try:
+        ids = write_valuations(directory, count, seed)
+        workloads = {"hot": ids[:16], "cold": ids}
+        results = []
+        with LocalServer(workers, directory) as local:
+            for workload, workload_ids in workloads.items():
+                for clients in concurrency_levels:
+                    server.DCF_CACHE.clear()
+                    latencies, counters, errors = [], {"hits": 0, "reconnects": 0}, []
+                    lock = threading.Lock()
+
+                    def client(offset):
+                        connection = local.connect()
+                        own, own_hits, reconnects = [], 0, 0
+                        try:
+                            for i in range(requests_per_client):
+                                valuation_id = workload_ids[(offset + i * clients) % len(workload_ids)]
+                                path = f"/api/valuations/{valuation_id}/dcf"
+                                start = time.perf_counter_ns()
+                                try:
+                                    response, _ = _get(connection, path)
+                                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                                    # With more clients than workers the server closes idle
+                                    # keep-alive connections; retry like a browser would
+                                    connection.close()
+                                    connection = local.connect()
+                                    reconnects += 1
+                                    response, _ = _get(connection, path)
+                                own.append(time.perf_counter_ns() - start)
+                                own_hits += response.getheader("X-Cache") == "HIT"
+                        except Exception as e:
+                            errors.append(str(e))
+                        finally:
+                            connection.close()
+                        with lock:
+                            latencies.extend(own)
+                            counters["hits"] += own_hits
+                            counters["reconnects"] += reconnects
+
+                    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(clients)]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+                    if errors:
+                        raise RuntimeError(f"/dcf requests failed: {errors[0]}")
+                    results.append({
+                        "workload": workload,
+                        "valuations": len(workload_ids),
+                        "clients": clients,
+                        "requests": len(latencies),
+                        "seconds": elapsed,
+                        "requestsPerSecond": len(latencies) / elapsed,
+                        "cacheHitRatio": counters["hits"] / len(latencies),
+                        "reconnects": counters["reconnects"],
+                        "latency": _summarize_durations(latencies),
+                    })
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the BioBucks DCF engine and server")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic valuations (default 0)")
+    parser.add_argument("--output", "-o", help="write results to this file instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="use small sizes for a fast smoke run")
+    parser.add_argument("--only", choices=("latency", "throughput", "monte-carlo", "listing", "concurrent"), action="append",
+                        help="run only the named benchmark (repeatable)")
+    parser.add_argument("--workers", type=int, default=server.DEFAULT_WORKERS,
+                        help=f"server worker threads (default {server.DEFAULT_WORKERS})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.quick:
+        latency_count, dcf_sizes, listing_sizes = 200, (1_000, 5_000), (100, 1_000)
+        monte_carlo_count, monte_carlo_draws = 10, 1_000
+        concurrent_count, concurrency_levels, requests_per_client = 300, (1, 4), 50
+    else:
+        latency_count, dcf_sizes, listing_sizes = 1_000, (1_000, 100_000), (100, 10_000)
+        monte_carlo_count, monte_carlo_draws = 50, 10_000
+        concurrent_count, concurrency_levels, requests_per_client = 1_000, (1, 8, 32), 200
+    selected = set(args.only or ("latency", "throughput", "monte-carlo", "listing", "concurrent"))
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "workers": args.workers,
+        "benchmarks": {},
+    }
+    benchmarks = results["benchmarks"]
+
+    if "latency" in selected:
+        print("calculate_dcf latency...", file=sys.stderr)
+        benchmarks["dcfLatency"] = bench_dcf_latency(latency_count, args.seed)
+    if "throughput" in selected:
+        print("calculate_dcf throughput...", file=sys.stderr)
+        benchmarks["dcfThroughput"] = bench_dcf_throughput(dcf_sizes, args.seed)
+    if "monte-carlo" in selected:
+        print("Monte Carlo per draw...", file=sys.stderr)
+        benchmarks["monteCarlo"] = bench_monte_carlo(monte_carlo_count, monte_carlo_draws, args.seed)
+    if "listing" in selected:
+        print("/api/valuations listing...", file=sys.stderr)
+        benchmarks["listing"] = bench_listing(listing_sizes, args.seed, args.workers, repeats=20)
+    if "concurrent" in selected:
+        print("concurrent /dcf...", file=sys.stderr)
+        benchmarks["concurrentDcf"] = bench_concurrent_dcf(
+            concurrent_count, args.seed, args.workers, concurrency_levels, requests_per_client)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    monte_carlo = benchmarks.get("monteCarlo")
+    if monte_carlo and monte_carlo["drawToDcfRatio"] > MONTE_CARLO_DRAW_BUDGET:
+        print(f"FAIL: a Monte Carlo draw costs {monte_carlo['drawToDcfRatio']:.2f} calculate_dcf() calls "
+              f"(budget {MONTE_CARLO_DRAW_BUDGET})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Move valuations between the valuations/ directory and a SQLite database.
+
+    python3 migrate.py import biobucks.db           # valuations/*.json -> database
+    python3 migrate.py export biobucks.db out_dir/  # database -> one JSON file per valuation
+
+Serve the database with: python3 server.py --db biobucks.db
+"""
+
+import argparse
+from pathlib import Path
+
+from server import VALUATIONS_DIR, SqliteValuationStore, ValuationIndex, write_json_atomic
+
+BATCH_SIZE = 500
+
+
+def import_directory(directory, store):
+    """Copy every valuation JSON file in ``directory`` into ``store``. Returns the count."""
+    entries = ValuationIndex(directory).entries()
+    for i in range(0, len(entries), BATCH_SIZE):
+        store.write_many([(entry.id, entry.data) for entry in entries[i:i + BATCH_SIZE]])
+    return len(entries)
+
+
+def export_directory(store, directory):
+    """Write every stored valuation to ``directory`` as <id>.json. Returns the count."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    entries = store.entries()
+    for entry in entries:
+        write_json_atomic(directory / f"{entry.id}.json", entry.data)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate BioBucks valuations to and from SQLite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="load valuations/*.json into a database")
+    import_parser.add_argument("db", help="SQLite database path (created if missing)")
+    import_parser.add_argument("directory", nargs="?", default=VALUATIONS_DIR,
+                               help=f"directory of valuation JSON files (default {VALUATIONS_DIR})")
+
+    export_parser = subparsers.add_parser("export", help="write a database back out as JSON files")
+    export_parser.add_argument("db", help="SQLite database path")
+    export_parser.add_argument("directory", nargs="?", default=VALUATIONS_DIR,
+                               help=f"output directory (default {VALUATIONS_DIR})")
+
+    args = parser.parse_args()
+    if args.command == "export" and not Path(args.db).exists():
+        parser.error(f"database not found: {args.db}")
+
+    store = SqliteValuationStore(args.db)
+    if args.command == "import":
+        count = import_directory(args.directory, store)
+        print(f"Imported {count} valuations from {args.directory} into {args.db}")
+    else:
+        count = export_directory(store, args.directory)
+        print(f"Exported {count} valuations from {args.db} to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
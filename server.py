@@ -4,24 +4,67 @@ Simple HTTP server for BioBucks DCF Valuations viewer.
 Uses only Python standard library - no external dependencies.
 
 Usage:
-    python3 server.py [port]
+    python3 server.py [port] [--workers N] [--single-threaded]
 
 Default port: 8000
 """
 
+import argparse
+import base64
+import copy
+import csv
+import email.utils
+import gzip
+import cProfile
+import hashlib
+import heapq
 import http.server
+import io
+import itertools
+import socket
 import socketserver
 import json
+import sqlite3
 import os
+import pstats
+import signal
 import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
-from urllib.parse import urlparse
-from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from datetime import datetime, timezone
 import math
+import multiprocessing
+import random
+import re
+import selectors
+import uuid
+import weakref
+import zlib
+from array import array
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+PORT = 8000
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_LIMIT = 64  # accepted connections waiting for a worker before new ones get a 503
+KEEP_ALIVE_TIMEOUT = 15  # seconds an idle persistent connection is kept open
 VALUATIONS_DIR = Path(__file__).parent / "valuations"
 
+# Map development stage names (lowercased) to numeric stage values
+STAGE_MAP = {
+    'preclinical ready': 0, 'preclinical': 0, 'discovery': 0,
+    'phase i ready': 1, 'phase i': 1, 'phase 1 ready': 1, 'phase 1': 1,
+    'phase ii ready': 2, 'phase ii': 2, 'phase 2 ready': 2, 'phase 2': 2,
+    'phase iii ready': 3, 'phase iii': 3, 'phase 3 ready': 3, 'phase 3': 3,
+    'registration ready': 4, 'approval': 4,
+    'approved': 5
+}
+
 
 def parse_value(value_str):
     """Parse a numeric value from a string, removing commas and non-numeric characters."""
@@ -40,243 +83,3891 @@ def get_param_value(param, default=0):
         return default
 
 
-def calculate_phase_fractions(year, phase_i_duration, phase_i_end, phase_ii_duration, phase_ii_end,
-                              phase_iii_duration, phase_iii_end, approval_duration, approval_end):
-    """Calculate the overlap fraction of each clinical phase within a given year.
+def calculate_dcf(valuation_data):
+    """Calculate DCF projections for a biotech asset."""
+    return DcfModel(valuation_data).result()
+
+
+# Numeric DCF inputs addressable as "section.key" paths, with the default
+# calculate_dcf() uses when a parameter is missing or unparseable.
+# Values are in document units (%, years, $M for trial costs); value vectors
+# are addressed through the *_INDEX constants below.
+DCF_PARAMETERS = (
+    ('marketParameters.totalAddressableMarket', 0),
+    ('marketParameters.peakMarketShare', 0),
+    ('marketParameters.yearsToPeakAdoption', 0),
+    ('marketParameters.annualPricing', 0),
+    ('marketParameters.lossOfExclusivity', 0),
+    ('marketParameters.yearsToDeclinePostLOE', 0),
+    ('marketParameters.terminalMarketShare', 0),
+    ('developmentTimeline.phaseIDuration', 0),
+    ('developmentTimeline.phaseIIDuration', 0),
+    ('developmentTimeline.phaseIIIDuration', 0),
+    ('developmentTimeline.approvalDuration', 0),
+    ('clinicalTrialCosts.phaseI', 0),
+    ('clinicalTrialCosts.phaseII', 0),
+    ('clinicalTrialCosts.phaseIII', 0),
+    ('clinicalTrialCosts.approval', 0),
+    ('probabilityOfSuccess.phaseI', 100),
+    ('probabilityOfSuccess.phaseII', 100),
+    ('probabilityOfSuccess.phaseIII', 100),
+    ('probabilityOfSuccess.approval', 100),
+    ('financialParameters.costOfGoodsSold', 0),
+    ('financialParameters.operatingExpenses', 0),
+    ('financialParameters.taxRate', 0),
+    ('financialParameters.discountRate', 10),
+)
+DCF_PARAMETER_INDEX = {path: i for i, (path, _) in enumerate(DCF_PARAMETERS)}
+
+PHASE_KEYS = ('phaseI', 'phaseII', 'phaseIII', 'approval')
+
+# Stage value at or below which each phase (and its parameters) still applies
+PHASE_STAGE_LIMITS = {'phaseI': 1, 'phaseII': 2, 'phaseIII': 3, 'approval': 4}
+
+# Positions of the DCF inputs in value vectors
+TAM_INDEX = DCF_PARAMETER_INDEX['marketParameters.totalAddressableMarket']
+PEAK_SHARE_INDEX = DCF_PARAMETER_INDEX['marketParameters.peakMarketShare']
+YEARS_TO_PEAK_INDEX = DCF_PARAMETER_INDEX['marketParameters.yearsToPeakAdoption']
+PRICING_INDEX = DCF_PARAMETER_INDEX['marketParameters.annualPricing']
+LOE_INDEX = DCF_PARAMETER_INDEX['marketParameters.lossOfExclusivity']
+YEARS_TO_DECLINE_INDEX = DCF_PARAMETER_INDEX['marketParameters.yearsToDeclinePostLOE']
+TERMINAL_SHARE_INDEX = DCF_PARAMETER_INDEX['marketParameters.terminalMarketShare']
+PHASE_DURATION_INDEXES = tuple(DCF_PARAMETER_INDEX[f'developmentTimeline.{key}Duration'] for key in PHASE_KEYS)
+PHASE_COST_INDEXES = tuple(DCF_PARAMETER_INDEX[f'clinicalTrialCosts.{key}'] for key in PHASE_KEYS)
+PHASE_POS_INDEXES = tuple(DCF_PARAMETER_INDEX[f'probabilityOfSuccess.{key}'] for key in PHASE_KEYS)
+COGS_INDEX = DCF_PARAMETER_INDEX['financialParameters.costOfGoodsSold']
+OPEX_INDEX = DCF_PARAMETER_INDEX['financialParameters.operatingExpenses']
+TAX_RATE_INDEX = DCF_PARAMETER_INDEX['financialParameters.taxRate']
+DISCOUNT_RATE_INDEX = DCF_PARAMETER_INDEX['financialParameters.discountRate']
+
+
+def get_development_stage(valuation_data):
+    """Return (stage name, numeric stage value) for a valuation."""
+    overview = valuation_data.get('assetOverview', {})
+    current_stage = overview.get('currentDevelopmentStage') or overview.get('currentDevelopmentPhase', 'Phase I Ready')
+    return current_stage, STAGE_MAP.get(str(current_stage).lower())
+
+
+def read_dcf_parameters(valuation_data):
+    """Return the raw value of every DCF parameter, in DCF_PARAMETERS order."""
+    values = []
+    for path, default in DCF_PARAMETERS:
+        section, key = path.split('.')
+        values.append(get_param_value(valuation_data.get(section, {}).get(key, {}), default))
+    return values
+
+
+def _phase_probability(values, stage_value, phase):
+    """Success probability of one phase (index into PHASE_KEYS), capped at 100%.
+
+    Phases already completed at the current stage carry no risk.
+    """
+    if stage_value > PHASE_STAGE_LIMITS[PHASE_KEYS[phase]]:
+        return 1.0
+    return min(values[PHASE_POS_INDEXES[phase]] / 100, 1.0)
+
+
+def _phase_overlaps(start, end, years):
+    """Return (year, fraction) for each of the first ``years`` years that [start, end) overlaps."""
+    first = max(math.floor(start), 0)
+    last = min(math.ceil(end), years)
+    overlaps = []
+    for year in range(first, last):
+        if year == first or year == last - 1:
+            # Partial years at either end of the phase
+            year_start = float(year)
+            year_end = float(year + 1)
+            overlap = (end if end < year_end else year_end) - (start if start > year_start else year_start)
+            if overlap > 0:
+                overlaps.append((year, overlap))
+        else:
+            overlaps.append((year, 1.0))
+    return overlaps
+
+
+def _development_schedule(phase_ends, years):
+    """Return the development rows for the first ``years`` years.
+
+    ``phase_ends`` holds the cumulative end of each phase (phases run back to
+    back from year 0). rows[year] holds (phase index, fraction) pairs for
+    every phase overlapping [year, year + 1), in phase order.
+    """
+    rows = [[] for _ in range(years)]
+    start = 0
+    for phase, end in enumerate(phase_ends):
+        if end > start:
+            for year, overlap in _phase_overlaps(start, end, years):
+                rows[year].append((phase, overlap))
+        start = end
+    return [tuple(row) for row in rows]
+
+
+def _market_share_curve(years_to_approval, first_year, last_year, peak_share, years_to_peak,
+                        loe, years_to_decline, terminal_share):
+    """Return the market share for each commercial year in [first_year, last_year]."""
+    shares = []
+    for year in range(first_year, last_year + 1):
+        years_from_approval = year - years_to_approval
+        if years_from_approval < years_to_peak:
+            market_share = peak_share * ((years_from_approval + 1) / years_to_peak) if years_to_peak > 0 else peak_share
+        elif years_from_approval <= loe:
+            market_share = peak_share
+        elif years_from_approval <= loe + years_to_decline:
+            years_into_decline = years_from_approval - loe
+            decline_progress = years_into_decline / years_to_decline if years_to_decline > 0 else 1
+            market_share = peak_share * (1 - (1 - terminal_share) * decline_progress)
+        else:
+            market_share = peak_share * terminal_share
+        shares.append(market_share)
+    return shares
+
+
+def _discount_factors(wacc, projection_years):
+    """Return the discount factor for years 0..projection_years."""
+    return [(1 + wacc) ** (-year) for year in range(projection_years + 1)]
+
+
+class BatchDcfEngine:
+    """Evaluate many parameter variants of one valuation in a single call.
+
+    The engine is built once from a valuation document. Each variant is a row
+    of values for the engine's ``parameters`` (paths from DCF_PARAMETERS, in
+    document units); parameters not listed keep the valuation's own values.
+    Variants are run through one DcfModel, so each row only recomputes the
+    stages its changed parameters feed and sweeps over a few parameters skip
+    most of the per-year work.
+
+    A single variant produces exactly the NPV and cash flows calculate_dcf()
+    would for the same inputs.
+    """
+
+    def __init__(self, valuation_data, parameters=None):
+        self._model = DcfModel(valuation_data)
+        self.stage, self.stage_value = self._model.stage, self._model.stage_value
+
+        self.parameters = tuple(parameters) if parameters is not None else tuple(p for p, _ in DCF_PARAMETERS)
+        unknown = [p for p in self.parameters if p not in DCF_PARAMETER_INDEX]
+        if unknown:
+            raise ValueError(f"Unknown DCF parameters: {', '.join(unknown)}")
+
+        self.base_values = read_dcf_parameters(valuation_data)
+        self._columns = [DCF_PARAMETER_INDEX[p] for p in self.parameters]
+
+    def evaluate(self, variants, include_years=False):
+        """Evaluate a 2-D sequence of variants (one row per variant).
+
+        Returns a dict with ``npv`` (one value per variant). With
+        ``include_years``, also returns ``fcf`` and ``riskAdjustedFCF``
+        matrices: one row per variant covering years 0..projection horizon
+        of that variant.
+        """
+        model = self._model
+        width = len(self._columns)
+        npvs = []
+        fcf_rows = [] if include_years else None
+        risk_rows = [] if include_years else None
+
+        for row in variants:
+            check_cancelled()
+            if len(row) != width:
+                raise ValueError(f"Expected {width} values per variant, got {len(row)}")
+            for column, value in zip(self._columns, row):
+                model._assign(column, float(value))
+
+            npvs.append(model.npv)
+            if include_years:
+                fcf, risk_adjusted = model.cash_flows()
+                fcf_rows.append(fcf)
+                risk_rows.append(risk_adjusted)
+
+        results = {'npv': npvs}
+        if include_years:
+            results['fcf'] = fcf_rows
+            results['riskAdjustedFCF'] = risk_rows
+        return results
+
+
+PHASE_NAMES = ('Phase I', 'Phase II', 'Phase III', 'Approval Process')
+
+
+class DcfModel:
+    """A valuation compiled once for repeated, incremental DCF evaluation.
+
+    This is the DCF implementation: calculate_dcf(), BatchDcfEngine and the
+    Monte Carlo simulation all evaluate through it. Parameters are parsed
+    into a flat value vector (DCF_PARAMETERS order) and intermediate
+    quantities are cached per stage. Changing a parameter with set() only
+    invalidates the stages it feeds: a discount rate change redoes the
+    discounting, a pricing change recomputes revenue onwards, and nothing is
+    recomputed until a result is read, and then only the stages that result
+    needs.
+    """
+
+    # Stage -> (parameters it reads, upstream stages), in evaluation order
+    STAGES = (
+        ('schedule', ('developmentTimeline.phaseIDuration', 'developmentTimeline.phaseIIDuration',
+                      'developmentTimeline.phaseIIIDuration', 'developmentTimeline.approvalDuration',
+                      'marketParameters.lossOfExclusivity', 'marketParameters.yearsToDeclinePostLOE'), ()),
+        ('development', (), ('schedule',)),
+        ('risk', ('probabilityOfSuccess.phaseI', 'probabilityOfSuccess.phaseII',
+                  'probabilityOfSuccess.phaseIII', 'probabilityOfSuccess.approval'), ()),
+        ('costs', ('clinicalTrialCosts.phaseI', 'clinicalTrialCosts.phaseII',
+                   'clinicalTrialCosts.phaseIII', 'clinicalTrialCosts.approval'), ('schedule',)),
+        ('shares', ('marketParameters.peakMarketShare', 'marketParameters.yearsToPeakAdoption',
+                    'marketParameters.terminalMarketShare'), ('schedule',)),
+        ('revenue', ('marketParameters.totalAddressableMarket', 'marketParameters.annualPricing'), ('shares',)),
+        ('commercial', ('financialParameters.costOfGoodsSold', 'financialParameters.operatingExpenses',
+                        'financialParameters.taxRate'), ('revenue',)),
+        ('cashflows', (), ('development', 'costs', 'commercial', 'risk')),
+        ('discount', ('financialParameters.discountRate',), ('schedule',)),
+        ('npv', (), ('cashflows', 'discount')),
+        ('phase_values', (), ('costs', 'discount')),
+        ('commercial_value', (), ('commercial', 'discount')),
+    )
+
+    __slots__ = (
+        'stage', 'stage_value', '_values', '_dirty',
+        '_durations', '_phase_ends', '_years_to_approval', '_dev_rows', '_projection_years', '_first_commercial',
+        '_pos', '_prior_risk', '_cumulative_pos',
+        '_annual_costs', '_dev_costs',
+        '_shares', '_revenue', '_cogs', '_opex', '_ebit', '_tax', '_fcf',
+        '_risk_adjusted', '_discount', '_present_values', '_npv',
+        '_phase_cost_values', '_commercial_value',
+    )
+
+    def __init__(self, valuation_data):
+        self.stage, self.stage_value = get_development_stage(valuation_data)
+        if self.stage_value is None:
+            raise ValueError(f"Unknown development stage: {self.stage}")
+        self._values = read_dcf_parameters(valuation_data)
+        self._dirty = set(name for name, _, _ in self.STAGES)
+
+    def get(self, path):
+        """Return the raw (document unit) value of a DCF parameter."""
+        return self._values[DCF_PARAMETER_INDEX[path]]
+
+    def set(self, path, value):
+        """Change a DCF parameter, invalidating only the stages that depend on it."""
+        index = DCF_PARAMETER_INDEX.get(path)
+        if index is None:
+            raise ValueError(f"Unknown DCF parameter: {path}")
+        self._assign(index, float(value))
+
+    def update(self, values):
+        """Apply several {path: value} changes at once."""
+        for path, value in values.items():
+            self.set(path, value)
+
+    def load(self, values):
+        """Replace the whole value vector (raw values in DCF_PARAMETERS order)."""
+        current = self._values
+        for index, value in enumerate(values):
+            if current[index] != value:
+                current[index] = value
+                self._dirty |= _DCF_MODEL_INVALIDATES_BY_INDEX[index]
+
+    def _assign(self, index, value):
+        if self._values[index] != value:
+            self._values[index] = value
+            self._dirty |= _DCF_MODEL_INVALIDATES_BY_INDEX[index]
+
+    @property
+    def npv(self):
+        """Risk-adjusted NPV."""
+        self._refresh('npv')
+        return self._npv
+
+    @property
+    def cumulative_pos(self):
+        """Cumulative probability of success across remaining phases."""
+        self._refresh('risk')
+        return self._cumulative_pos
+
+    @property
+    def peak_revenue(self):
+        """Highest annual (unrisked) revenue over the projection."""
+        self._refresh('revenue')
+        return max(self._revenue, default=0)
+
+    @property
+    def phase_cost_values(self):
+        """Present value of each phase's (unrisked) development cost, in PHASE_KEYS order."""
+        self._refresh('phase_values')
+        return self._phase_cost_values
+
+    @property
+    def commercial_value(self):
+        """Present value of the (unrisked) commercial free cash flows."""
+        self._refresh('commercial_value')
+        return self._commercial_value
+
+    def cash_flows(self):
+        """Return (fcf, riskAdjustedFCF) lists for years 0..projection horizon."""
+        self._refresh('cashflows')
+        return [-cost for cost in self._dev_costs] + self._fcf, self._risk_adjusted
+
+    def result(self):
+        """Return the full projection: years, npv, cumulativePoS, wacc, yearsToApproval."""
+        self._refresh('npv')
+        v = self._values
+        years_to_peak, loe, years_to_decline = v[YEARS_TO_PEAK_INDEX], v[LOE_INDEX], v[YEARS_TO_DECLINE_INDEX]
+        years_to_approval = self._years_to_approval
+        phase_i_end, phase_ii_end, phase_iii_end, approval_end = self._phase_ends
+        first_commercial = self._first_commercial
+
+        years = []
+        for year in range(self._projection_years + 1):
+            year_data = {
+                'year': year,
+                'label': 'Current year' if year == 0 else f'Year {year}'
+            }
+
+            if year < first_commercial:
+                # Development phases - the stage is the phase with the largest fraction
+                row = self._dev_rows[year]
+                year_data['stage'] = PHASE_NAMES[max(row, key=lambda x: x[1])[0]] if row else self.stage
+                year_data['developmentCosts'] = self._dev_costs[year]
+                year_data['revenue'] = 0
+                year_data['cogs'] = 0
+                year_data['opex'] = 0
+                year_data['ebit'] = -self._dev_costs[year]
+                year_data['tax'] = 0
+                year_data['fcf'] = -self._dev_costs[year]
+                year_data['riskAdjustedFCF'] = self._risk_adjusted[year]
+                if year < phase_i_end:
+                    year_data['riskPhase'] = 'Phase I (no prior risk)'
+                elif year < phase_ii_end:
+                    year_data['riskPhase'] = 'Phase II (Phase I PoS applied)'
+                elif year < phase_iii_end:
+                    year_data['riskPhase'] = 'Phase III (Phase I × II PoS applied)'
+                elif year < approval_end:
+                    year_data['riskPhase'] = 'Approval (Phase I × II × III PoS applied)'
+                else:
+                    year_data['riskPhase'] = 'Development (full PoS)'
+            else:
+                # Commercial phase - launch is combined with the first year of market ramp
+                years_from_approval = year - years_to_approval
+                if years_from_approval < years_to_peak:
+                    year_data['stage'] = 'Market Ramp'
+                elif years_from_approval < loe:
+                    year_data['stage'] = 'Peak Sales'
+                elif years_from_approval < loe + years_to_decline:
+                    year_data['stage'] = 'Post-LOE Decline'
+                else:
+                    year_data['stage'] = 'Generic Competition'
+
+                i = year - first_commercial
+                year_data['developmentCosts'] = 0
+                year_data['revenue'] = self._revenue[i]
+                year_data['cogs'] = self._cogs[i]
+                year_data['opex'] = self._opex[i]
+                year_data['ebit'] = self._ebit[i]
+                year_data['tax'] = self._tax[i]
+                year_data['fcf'] = self._fcf[i]
+                year_data['riskAdjustedFCF'] = self._risk_adjusted[year]
+                year_data['riskPhase'] = 'Commercial (full cumulative PoS)'
+
+            year_data['discountFactor'] = self._discount[year]
+            year_data['presentValue'] = self._present_values[year]
+            years.append(year_data)
+
+        return {
+            'years': years,
+            'npv': self._npv,
+            'cumulativePoS': self._cumulative_pos,
+            'wacc': v[DISCOUNT_RATE_INDEX] / 100,
+            'yearsToApproval': years_to_approval
+        }
+
+    def _refresh(self, target):
+        """Recompute the dirty stages ``target`` depends on, in dependency order."""
+        dirty = self._dirty
+        if not dirty:
+            return
+        for name, compute in _DCF_MODEL_REQUIRES[target]:
+            if name in dirty:
+                compute(self)
+                dirty.discard(name)
+
+    def _compute_schedule(self):
+        # Only current and future phases contribute time, cost and risk
+        stage = self.stage_value
+        v = self._values
+        self._durations = tuple(
+            v[index] if stage <= PHASE_STAGE_LIMITS[key] else 0
+            for key, index in zip(PHASE_KEYS, PHASE_DURATION_INDEXES)
+        )
+        phase_i_end = self._durations[0]
+        phase_ii_end = phase_i_end + self._durations[1]
+        phase_iii_end = phase_ii_end + self._durations[2]
+        self._phase_ends = (phase_i_end, phase_ii_end, phase_iii_end, phase_iii_end + self._durations[3])
+        self._years_to_approval = sum(self._durations)
+        self._projection_years = math.ceil(self._years_to_approval + v[LOE_INDEX] + v[YEARS_TO_DECLINE_INDEX])
+        # Development years are the whole years before approval, cut off at the horizon
+        self._first_commercial = min(max(math.ceil(self._years_to_approval), 0), self._projection_years + 1)
+
+    def _compute_development(self):
+        self._dev_rows = _development_schedule(self._phase_ends, self._first_commercial)
+
+    def _compute_risk(self):
+        # Each phase's costs are only incurred if prior phases succeed;
+        # commercial revenues require all phases to succeed
+        pos = tuple(_phase_probability(self._values, self.stage_value, phase) for phase in range(len(PHASE_KEYS)))
+        self._pos = pos
+        self._cumulative_pos = pos[0] * pos[1] * pos[2] * pos[3]
+        self._prior_risk = (1.0, pos[0], pos[0] * pos[1], pos[0] * pos[1] * pos[2])
+
+    def _compute_costs(self):
+        # Trial costs are in $M, spread evenly over each phase's duration
+        stage = self.stage_value
+        v = self._values
+        costs = (
+            v[index] * 1_000_000 if stage <= PHASE_STAGE_LIMITS[key] else 0
+            for key, index in zip(PHASE_KEYS, PHASE_COST_INDEXES)
+        )
+        self._annual_costs = tuple(c / d if d > 0 else 0 for c, d in zip(costs, self._durations))
+
+    def _compute_shares(self):
+        v = self._values
+        self._shares = _market_share_curve(
+            self._years_to_approval, self._first_commercial, self._projection_years,
+            v[PEAK_SHARE_INDEX] / 100, v[YEARS_TO_PEAK_INDEX], v[LOE_INDEX], v[YEARS_TO_DECLINE_INDEX],
+            v[TERMINAL_SHARE_INDEX] / 100)
+
+    def _compute_revenue(self):
+        tam, pricing = self._values[TAM_INDEX], self._values[PRICING_INDEX]
+        self._revenue = [tam * market_share * pricing for market_share in self._shares]
+
+    def _compute_commercial(self):
+        cogs = self._values[COGS_INDEX] / 100
+        opex = self._values[OPEX_INDEX] / 100
+        tax_rate = self._values[TAX_RATE_INDEX] / 100
+        self._cogs = [revenue * cogs for revenue in self._revenue]
+        self._opex = [revenue * opex for revenue in self._revenue]
+        self._ebit = [r - c - o for r, c, o in zip(self._revenue, self._cogs, self._opex)]
+        self._tax = [ebit * tax_rate if ebit > 0 else 0 for ebit in self._ebit]
+        self._fcf = [ebit - tax for ebit, tax in zip(self._ebit, self._tax)]
+
+    def _compute_cashflows(self):
+        annual_costs = self._annual_costs
+        prior_risk = self._prior_risk
+        cumulative_pos = self._cumulative_pos
+        rows = self._dev_rows
+        self._dev_costs = [sum([annual_costs[phase] * frac for phase, frac in row]) for row in rows]
+        self._risk_adjusted = [
+            -sum([annual_costs[phase] * frac * prior_risk[phase] for phase, frac in row]) for row in rows
+        ]
+        self._risk_adjusted += [fcf * cumulative_pos for fcf in self._fcf]
+
+    def _compute_discount(self):
+        self._discount = _discount_factors(self._values[DISCOUNT_RATE_INDEX] / 100, self._projection_years)
+
+    def _compute_npv(self):
+        self._present_values = [cash * factor for cash, factor in zip(self._risk_adjusted, self._discount)]
+        self._npv = sum(self._present_values)
+
+    def _compute_phase_values(self):
+        # Same overlaps as the development rows, without building them
+        discount = self._discount
+        values = []
+        start = 0
+        for annual_cost, end in zip(self._annual_costs, self._phase_ends):
+            value = 0.0
+            if end > start:
+                for year, overlap in _phase_overlaps(start, end, self._first_commercial):
+                    value += annual_cost * overlap * discount[year]
+            values.append(value)
+            start = end
+        self._phase_cost_values = values
+
+    def _compute_commercial_value(self):
+        discount = self._discount[self._first_commercial:]
+        self._commercial_value = sum([fcf * factor for fcf, factor in zip(self._fcf, discount)])
+
+
+def _dcf_model_dependencies():
+    """Return (invalidates, requires) for the DcfModel stage graph.
+
+    ``invalidates`` maps each DCF parameter index to every stage it
+    (transitively) feeds; ``requires`` maps each stage to (name, compute
+    method) pairs for the stages it (transitively) reads, itself included,
+    in evaluation order.
+    """
+    downstream = {name: set() for name, _, _ in DcfModel.STAGES}
+    upstream = {name: set(parents) for name, _, parents in DcfModel.STAGES}
+    for name, _, parents in DcfModel.STAGES:
+        for dependency in parents:
+            downstream[dependency].add(name)
+
+    def closure(stage, edges):
+        stages = {stage}
+        for child in edges[stage]:
+            stages |= closure(child, edges)
+        return stages
+
+    invalidates = [frozenset()] * len(DCF_PARAMETERS)
+    for name, inputs, _ in DcfModel.STAGES:
+        for path in inputs:
+            index = DCF_PARAMETER_INDEX[path]
+            invalidates[index] = invalidates[index] | closure(name, downstream)
+
+    order = [name for name, _, _ in DcfModel.STAGES]
+    requires = {}
+    for name in order:
+        needed = closure(name, upstream)
+        requires[name] = tuple((stage, getattr(DcfModel, f'_compute_{stage}')) for stage in order if stage in needed)
+    return tuple(invalidates), requires
+
+
+_DCF_MODEL_INVALIDATES_BY_INDEX, _DCF_MODEL_REQUIRES = _dcf_model_dependencies()
+
+
+
+# Relative half-width of the sampling distribution for each confidence level
+CONFIDENCE_SPREADS = {'high': 0.10, 'medium': 0.25, 'low': 0.50}
+DEFAULT_CONFIDENCE_SPREAD = CONFIDENCE_SPREADS['medium']
+
+# Parameters expressed in percent are clamped to [0, 100] when sampled
+PERCENT_PARAMETERS = {
+    'marketParameters.peakMarketShare', 'marketParameters.terminalMarketShare',
+    'probabilityOfSuccess.phaseI', 'probabilityOfSuccess.phaseII',
+    'probabilityOfSuccess.phaseIII', 'probabilityOfSuccess.approval',
+    'financialParameters.costOfGoodsSold', 'financialParameters.operatingExpenses',
+    'financialParameters.taxRate',
+}
+
+PHASE_PARAMETER_KEYS = {
+    'phaseI': ('developmentTimeline.phaseIDuration', 'clinicalTrialCosts.phaseI', 'probabilityOfSuccess.phaseI'),
+    'phaseII': ('developmentTimeline.phaseIIDuration', 'clinicalTrialCosts.phaseII', 'probabilityOfSuccess.phaseII'),
+    'phaseIII': ('developmentTimeline.phaseIIIDuration', 'clinicalTrialCosts.phaseIII', 'probabilityOfSuccess.phaseIII'),
+    'approval': ('developmentTimeline.approvalDuration', 'clinicalTrialCosts.approval', 'probabilityOfSuccess.approval'),
+}
+
+MONTE_CARLO_CHUNK_SIZE = 10_000
+MONTE_CARLO_CANCEL_CHECK_DRAWS = 1_000  # draws between cancellation checks inside a job task
+MONTE_CARLO_MAX_DRAWS = 1_000_000
+# Larger runs go through /api/jobs so a request never holds a worker for long
+# (100k draws take about a second)
+MONTE_CARLO_MAX_SYNC_DRAWS = 100_000
+MONTE_CARLO_MAX_BINS = 1_000
+MONTE_CARLO_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+
+def _sampling_plan(valuation_data, stage_value):
+    """Return (base values, groups) describing how to sample one valuation.
+
+    ``groups`` maps 'discount', each phase key and 'commercial' to lists of
+    (index, low, high, clamp) entries, so a draw only samples the parameters
+    its outcome actually reaches. Only parameters present in the document
+    and relevant to the current stage are sampled; everything else stays at
+    its deterministic value. ``clamp`` is the (min, max) range to clip draws
+    to, or None when the sampling interval already lies inside it.
+    """
+    values = read_dcf_parameters(valuation_data)
+    group_of = {'financialParameters.discountRate': 'discount'}
+    for phase, limit in PHASE_STAGE_LIMITS.items():
+        for path in PHASE_PARAMETER_KEYS[phase]:
+            group_of[path] = phase if stage_value <= limit else None
+
+    groups = {'discount': [], 'commercial': []}
+    groups.update((phase, []) for phase in PHASE_KEYS)
+    for index, (path, _) in enumerate(DCF_PARAMETERS):
+        group = group_of.get(path, 'commercial')
+        section, key = path.split('.')
+        param = valuation_data.get(section, {}).get(key)
+        if group is None or not isinstance(param, dict) or 'value' not in param:
+            continue
+        confidence = str(param.get('confidence', '')).lower()
+        spread = CONFIDENCE_SPREADS.get(confidence, DEFAULT_CONFIDENCE_SPREAD)
+        value = values[index]
+        low, high = sorted((value * (1 - spread), value * (1 + spread)))
+        if low == high:
+            continue
+        upper = 100.0 if path in PERCENT_PARAMETERS else math.inf
+        clamp = (0.0, upper) if low < 0 or high > upper else None
+        groups[group].append((index, low, high, clamp))
+    return values, groups
+
+
+def _sample_into(values, entries, uniform):
+    """Overwrite ``values`` with triangular draws for each sampling entry."""
+    for index, low, high, clamp in entries:
+        # Inverse CDF of a symmetric triangular distribution
+        u = uniform()
+        if u < 0.5:
+            value = low + (high - low) * math.sqrt(u * 0.5)
+        else:
+            value = high - (high - low) * math.sqrt((1 - u) * 0.5)
+        if clamp is not None:
+            value = min(max(value, clamp[0]), clamp[1])
+        values[index] = value
+
+
+def _phase_cost_pv(start, duration, cost, discount):
+    """Discounted cost of a phase spread evenly over [start, start + duration).
+
+    ``discount`` is the one-year discount factor 1 / (1 + wacc); this is the
+    phase_values stage of DcfModel in closed form for a single phase.
+    """
+    if duration <= 0:
+        return 0.0
+    end = start + duration
+    annual = cost / duration
+    year = max(math.floor(start), 0)
+    factor = discount ** year
+    pv = 0.0
+    while year < end:
+        year_start = start if start > year else year
+        year_end = end if end < year + 1 else year + 1
+        pv += annual * (year_end - year_start) * factor
+        factor *= discount
+        year += 1
+    return pv
+
+
+def _commercial_pv(values, years_to_approval, discount):
+    """Discounted, unrisked commercial FCF for one parameter vector.
+
+    The commercial_value stage of DcfModel with the per-year cash flow lists
+    folded into a single discounted market share sum.
+    """
+    loe, years_to_decline = values[LOE_INDEX], values[YEARS_TO_DECLINE_INDEX]
+    projection_years = math.ceil(years_to_approval + loe + years_to_decline)
+    first_commercial = min(max(math.ceil(years_to_approval), 0), projection_years + 1)
+    shares = _market_share_curve(
+        years_to_approval, first_commercial, projection_years,
+        values[PEAK_SHARE_INDEX] / 100, values[YEARS_TO_PEAK_INDEX], loe, years_to_decline,
+        values[TERMINAL_SHARE_INDEX] / 100)
+    factor = discount ** first_commercial
+    share_pv = 0.0
+    for market_share in shares:
+        share_pv += market_share * factor
+        factor *= discount
+
+    # EBIT has the sign of the operating margin since revenue is never negative
+    margin = 1 - values[COGS_INDEX] / 100 - values[OPEX_INDEX] / 100
+    if margin > 0:
+        margin *= 1 - values[TAX_RATE_INDEX] / 100
+    return values[TAM_INDEX] * values[PRICING_INDEX] * margin * share_pv
+
+
+def simulate_npv_chunk(valuation_data, draws, seed, chunk_index=0):
+    """Simulate ``draws`` NPV outcomes for one chunk of a Monte Carlo run.
+
+    Parameters are sampled from symmetric triangular distributions whose
+    width follows each parameter's confidence level; phase success is then
+    drawn as a Bernoulli trial per phase. A failed phase still incurs its own
+    cost but ends the program, so later phases and revenue are only valued
+    for draws that get that far. Each draw values the same stages as
+    DcfModel (phase cost values and commercial value), but one phase at a
+    time in closed form, so a draw never builds the per-year projection.
+    Chunks are seeded independently from (seed, chunk_index), so a run is
+    reproducible however its chunks are scheduled.
+
+    Returns (npvs, launches) where ``npvs`` is an array('d') of outcomes and
+    ``launches`` is the number of draws that reached market.
+    """
+    model = DcfModel(valuation_data)
+    stage_value = model.stage_value
+    base_values, groups = _sampling_plan(valuation_data, stage_value)
+    discount_group = groups['discount']
+    commercial_group = groups['commercial']
+    # Phases completed at the current stage take no time and cost nothing,
+    # so only the remaining ones are walked per draw
+    phases = [
+        (groups[key], phase, PHASE_DURATION_INDEXES[phase], PHASE_COST_INDEXES[phase])
+        for phase, key in enumerate(PHASE_KEYS) if stage_value <= PHASE_STAGE_LIMITS[key]
+    ]
+
+    rng = random.Random(f"{seed}-{chunk_index}")
+    uniform = rng.random
+    npvs = array('d')
+    launches = 0
+
+    for draw in range(draws):
+        if not draw % MONTE_CARLO_CANCEL_CHECK_DRAWS:
+            check_cancelled()
+        values = list(base_values)
+        _sample_into(values, discount_group, uniform)
+        discount = 1 / (1 + values[DISCOUNT_RATE_INDEX] / 100)
+
+        # Phases up to and including a failed one are paid for
+        npv = 0.0
+        start = 0.0
+        launched = True
+        for entries, phase, duration_index, cost_index in phases:
+            _sample_into(values, entries, uniform)
+            duration = values[duration_index]
+            npv -= _phase_cost_pv(start, duration, values[cost_index] * 1_000_000, discount)
+            start += duration
+            probability = min(values[PHASE_POS_INDEXES[phase]] / 100, 1.0)
+            if probability < 1.0 and uniform() >= probability:
+                launched = False
+                break
+        if launched:
+            _sample_into(values, commercial_group, uniform)
+            npv += _commercial_pv(values, start, discount)
+            launches += 1
+        npvs.append(npv)
+
+    return npvs, launches
+
+
+def _percentile(sorted_values, percent):
+    """Linearly interpolated percentile of an already sorted sequence."""
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
 
-    Returns a list of (phase_name, phase_key, fraction) tuples for phases
-    that overlap with [year, year+1).
+
+def monte_carlo_chunks(draws, bins=1):
+    """Validate a run and return its (chunk_index, chunk_draws) work units."""
+    if not 1 <= draws <= MONTE_CARLO_MAX_DRAWS:
+        raise ValueError(f"draws must be between 1 and {MONTE_CARLO_MAX_DRAWS}")
+    if not 1 <= bins <= MONTE_CARLO_MAX_BINS:
+        raise ValueError(f"bins must be between 1 and {MONTE_CARLO_MAX_BINS}")
+    return [(chunk_index, min(MONTE_CARLO_CHUNK_SIZE, draws - start))
+            for chunk_index, start in enumerate(range(0, draws, MONTE_CARLO_CHUNK_SIZE))]
+
+
+def summarize_monte_carlo(chunk_results, seed, bins=50):
+    """Merge simulate_npv_chunk() results (in chunk order) into NPV statistics.
+
+    Running moments are merged per chunk and the outcomes are kept in a
+    compact array so percentiles and the histogram are exact.
+    """
+    outcomes = array('d')
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    launches = 0
+
+    for npvs, chunk_launches in chunk_results:
+        chunk_draws = len(npvs)
+        launches += chunk_launches
+
+        # Merge chunk moments (Chan et al. parallel variance)
+        chunk_mean = math.fsum(npvs) / chunk_draws
+        chunk_m2 = math.fsum((x - chunk_mean) ** 2 for x in npvs)
+        delta = chunk_mean - mean
+        total = count + chunk_draws
+        mean += delta * chunk_draws / total
+        m2 += chunk_m2 + delta * delta * count * chunk_draws / total
+        count = total
+        outcomes.extend(npvs)
+
+    ordered = sorted(outcomes)
+    low, high = ordered[0], ordered[-1]
+    width = (high - low) / bins
+    counts = [0] * bins
+    for value in ordered:
+        index = int((value - low) / width) if width > 0 else 0
+        counts[min(index, bins - 1)] += 1
+
+    return {
+        'draws': count,
+        'seed': seed,
+        'mean': mean,
+        'stdDev': math.sqrt(m2 / (count - 1)) if count > 1 else 0.0,
+        'probabilityPositive': sum(1 for value in ordered if value > 0) / count,
+        'probabilityOfLaunch': launches / count,
+        'percentiles': {f'p{p}': _percentile(ordered, p) for p in MONTE_CARLO_PERCENTILES},
+        'min': low,
+        'max': high,
+        'histogram': {
+            'binEdges': [low + width * i for i in range(bins)] + [high],
+            'counts': counts
+        }
+    }
+
+
+def run_monte_carlo(valuation_data, draws=10_000, seed=0, bins=50):
+    """Run a Monte Carlo rNPV simulation and summarize the NPV distribution."""
+    chunks = monte_carlo_chunks(draws, bins)
+    results = [simulate_npv_chunk(valuation_data, chunk_draws, seed, chunk_index)
+               for chunk_index, chunk_draws in chunks]
+    return summarize_monte_carlo(results, seed, bins)
+
+
+SENSITIVITY_DEFAULT_CHANGE = 20  # percent, applied either side of the base value
+SENSITIVITY_DEFAULT_STEPS = 5
+SENSITIVITY_MAX_GRID_STEPS = 101
+SENSITIVITY_DEFAULT_GRID = (
+    'financialParameters.discountRate', 'marketParameters.peakMarketShare'
+)
+
+
+def _active_dcf_parameters(valuation_data, stage_value):
+    """Return DCF parameter paths present in the document and relevant to its stage."""
+    inactive = set()
+    for phase, limit in PHASE_STAGE_LIMITS.items():
+        if stage_value > limit:
+            inactive.update(PHASE_PARAMETER_KEYS[phase])
+
+    active = []
+    for path, _ in DCF_PARAMETERS:
+        section, key = path.split('.')
+        param = valuation_data.get(section, {}).get(key)
+        if path not in inactive and isinstance(param, dict) and 'value' in param:
+            active.append(path)
+    return active
+
+
+def _perturbation_range(path, base_value, spec):
+    """Resolve a perturbation spec into (low, high) parameter values.
+
+    ``spec`` is either a number (relative change in percent), a dict with
+    absolute ``low``/``high`` values, or a dict with a relative ``change``.
+    """
+    if spec is None:
+        spec = SENSITIVITY_DEFAULT_CHANGE
+    if isinstance(spec, dict):
+        if 'low' in spec or 'high' in spec:
+            return float(spec.get('low', base_value)), float(spec.get('high', base_value))
+        spec = spec.get('change', SENSITIVITY_DEFAULT_CHANGE)
+    change = float(spec) / 100
+    low, high = base_value * (1 - change), base_value * (1 + change)
+    if path in PERCENT_PARAMETERS:
+        low, high = max(low, 0.0), min(high, 100.0)
+    return low, high
+
+
+def _check_scenario_values(path, values):
+    """Raise ValueError for scenario values the model can't be evaluated at.
+
+    A discount rate of -100% or below makes 1 + rate non-positive, so the
+    discount factors divide by zero (or alternate in sign).
+    """
+    for value in values:
+        if not math.isfinite(value):
+            raise ValueError(f"values for {path} must be finite numbers")
+        if path == 'financialParameters.discountRate' and value <= -100:
+            raise ValueError(f"values for {path} must be above -100")
+
+
+def _grid_axis(path, base_value, spec):
+    """Resolve a grid axis spec into its list of parameter values."""
+    if 'values' in spec:
+        values = [float(v) for v in spec['values']]
+    else:
+        steps = int(spec.get('steps', SENSITIVITY_DEFAULT_STEPS))
+        if steps < 2:
+            raise ValueError("Grid axes need at least 2 steps")
+        low, high = _perturbation_range(path, base_value, spec)
+        values = [low + (high - low) * i / (steps - 1) for i in range(steps)]
+    if not values or len(values) > SENSITIVITY_MAX_GRID_STEPS:
+        raise ValueError(f"Grid axes need between 1 and {SENSITIVITY_MAX_GRID_STEPS} values")
+    _check_scenario_values(path, values)
+    return values
+
+
+def run_sensitivity(valuation_data, parameters=None, grid=None, include_grid=True):
+    """Compute a one-at-a-time tornado table and a two-way NPV grid.
+
+    ``parameters`` maps DCF parameter paths to perturbation specs (see
+    _perturbation_range); by default every parameter in the document that
+    applies at its stage is swung by SENSITIVITY_DEFAULT_CHANGE percent.
+    ``grid`` has ``x`` and ``y`` axes, each with a ``parameter`` and either
+    explicit ``values`` or ``low``/``high``/``change`` plus ``steps``; it
+    defaults to WACC x peak market share. Every scenario is evaluated in one
+    BatchDcfEngine pass.
+    """
+    engine = BatchDcfEngine(valuation_data)
+    base_values = engine.base_values
+
+    if parameters is None:
+        parameters = {path: None for path in _active_dcf_parameters(valuation_data, engine.stage_value)}
+    unknown = [p for p in parameters if p not in DCF_PARAMETER_INDEX]
+    if unknown:
+        raise ValueError(f"Unknown DCF parameters: {', '.join(unknown)}")
+
+    rows = [list(base_values)]
+    tornado = []
+    for path, spec in parameters.items():
+        index = DCF_PARAMETER_INDEX[path]
+        low, high = _perturbation_range(path, base_values[index], spec)
+        _check_scenario_values(path, (low, high))
+        for value in (low, high):
+            row = list(base_values)
+            row[index] = value
+            rows.append(row)
+        tornado.append({'parameter': path, 'baseValue': base_values[index], 'lowValue': low, 'highValue': high})
+
+    axes = None
+    if include_grid:
+        if grid is None:
+            grid = {'x': {'parameter': SENSITIVITY_DEFAULT_GRID[0]},
+                    'y': {'parameter': SENSITIVITY_DEFAULT_GRID[1]}}
+        axes = []
+        for axis in ('x', 'y'):
+            spec = grid.get(axis) or {}
+            path = spec.get('parameter')
+            if path not in DCF_PARAMETER_INDEX:
+                raise ValueError(f"Grid axis '{axis}' needs a known DCF parameter")
+            axes.append((path, _grid_axis(path, base_values[DCF_PARAMETER_INDEX[path]], spec)))
+        (x_path, x_values), (y_path, y_values) = axes
+        x_index, y_index = DCF_PARAMETER_INDEX[x_path], DCF_PARAMETER_INDEX[y_path]
+        for y_value in y_values:
+            for x_value in x_values:
+                row = list(base_values)
+                row[x_index] = x_value
+                row[y_index] = y_value
+                rows.append(row)
+
+    npvs = engine.evaluate(rows)['npv']
+    base_npv = npvs[0]
+
+    for i, entry in enumerate(tornado):
+        entry['lowNpv'] = npvs[1 + 2 * i]
+        entry['highNpv'] = npvs[2 + 2 * i]
+        entry['swing'] = abs(entry['highNpv'] - entry['lowNpv'])
+    tornado.sort(key=lambda x: x['swing'], reverse=True)
+
+    results = {'baseNpv': base_npv, 'tornado': tornado}
+    if axes is not None:
+        offset = 1 + 2 * len(tornado)
+        width = len(x_values)
+        results['grid'] = {
+            'x': {'parameter': x_path, 'values': x_values},
+            'y': {'parameter': y_path, 'values': y_values},
+            'npv': [npvs[offset + row * width:offset + (row + 1) * width] for row in range(len(y_values))]
+        }
+    return results
+
+
+# Goal-seek metrics, read from a DcfModel
+SOLVE_METRICS = {
+    'npv': lambda model: model.npv,
+    'cumulativePoS': lambda model: model.cumulative_pos,
+    'peakRevenue': lambda model: model.peak_revenue,
+}
+TIME_PARAMETERS = {
+    'marketParameters.yearsToPeakAdoption', 'marketParameters.lossOfExclusivity',
+    'marketParameters.yearsToDeclinePostLOE', 'developmentTimeline.phaseIDuration',
+    'developmentTimeline.phaseIIDuration', 'developmentTimeline.phaseIIIDuration',
+    'developmentTimeline.approvalDuration',
+}
+SOLVE_MAX_YEARS = 50  # upper search bound for durations; the projection grows with them
+SOLVE_SCAN_POINTS = 48
+SOLVE_MAX_EXPANSIONS = 60
+SOLVE_MAX_ITERATIONS = 200
+SOLVE_MAX_TARGETS = 50
+
+
+def _solve_bounds(path, base_value, bounds):
+    """Return (low, high, expandable) for a free parameter's search interval.
+
+    Raises ValueError for bounds the model can't be evaluated over, such as
+    a discount rate of -100% (every discount factor divides by zero).
+    """
+    if bounds is not None:
+        if not isinstance(bounds, list) or len(bounds) != 2:
+            raise ValueError("bounds must be [low, high]")
+        low, high = (float(bound) for bound in bounds)
+        if not (math.isfinite(low) and math.isfinite(high) and low < high):
+            raise ValueError("bounds must be finite numbers [low, high] with low < high")
+        if path == 'financialParameters.discountRate' and low <= -100:
+            raise ValueError("bounds for financialParameters.discountRate must be above -100")
+        if path in TIME_PARAMETERS and (low < 0 or high > SOLVE_MAX_YEARS):
+            raise ValueError(f"bounds for {path} must lie within [0, {SOLVE_MAX_YEARS}] years")
+        return low, high, False
+    if path in PERCENT_PARAMETERS or path == 'financialParameters.discountRate':
+        return 0.0, 100.0, False
+    if path in TIME_PARAMETERS:
+        return 0.0, float(SOLVE_MAX_YEARS), False
+    return 0.0, max(4 * abs(base_value), 1.0), True
+
+
+def _brent(f, a, b, fa, fb, xtol):
+    """Brent's method on a bracket with f(a) and f(b) of opposite sign.
+
+    Returns (x, f(x), iterations). Falls back to bisection whenever
+    interpolation misbehaves, so it also converges onto jump
+    discontinuities (where no exact root exists).
+    """
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    c, fc, d = a, fa, b - a
+    bisected = True
+    for iteration in range(1, SOLVE_MAX_ITERATIONS + 1):
+        if fb == 0 or abs(b - a) <= xtol:
+            return b, fb, iteration
+        if fa != fc and fb != fc:
+            # Inverse quadratic interpolation
+            s = (a * fb * fc / ((fa - fb) * (fa - fc)) +
+                 b * fa * fc / ((fb - fa) * (fb - fc)) +
+                 c * fa * fb / ((fc - fa) * (fc - fb)))
+        else:
+            s = b - fb * (b - a) / (fb - fa)
+
+        lower, upper = sorted(((3 * a + b) / 4, b))
+        if (not lower < s < upper or
+                (bisected and abs(s - b) >= abs(b - c) / 2) or
+                (not bisected and abs(s - b) >= abs(c - d) / 2) or
+                (bisected and abs(b - c) < xtol) or
+                (not bisected and abs(c - d) < xtol)):
+            s = (a + b) / 2
+            bisected = True
+        else:
+            bisected = False
+
+        fs = f(s)
+        d, c, fc = c, b, fb
+        if (fa < 0) != (fs < 0):
+            b, fb = s, fs
+        else:
+            a, fa = s, fs
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+    return b, fb, SOLVE_MAX_ITERATIONS
+
+
+def _solve_one(model, path, metric, target, bounds=None, xtol=None):
+    """Find a value of one parameter that brings ``metric`` to ``target``.
+
+    The interval is scanned for sign changes of metric - target first, so
+    the flat stretches and kinks of the phase and LOE schedules can't
+    mislead the root finder; the crossing nearest the base value is then
+    refined with Brent's method. Model parameters are left unchanged.
+    """
+    base_value = model.get(path)
+    read_metric = SOLVE_METRICS[metric]
+
+    def f(value):
+        model.set(path, value)
+        return read_metric(model) - target
+
+    try:
+        low, high, expandable = _solve_bounds(path, base_value, bounds)
+        points = [low + (high - low) * i / (SOLVE_SCAN_POINTS - 1) for i in range(SOLVE_SCAN_POINTS)]
+        if low < base_value < high:
+            points.append(base_value)
+        points.sort()
+        values = [f(x) for x in points]
+
+        brackets = [(points[i], points[i + 1], values[i], values[i + 1]) for i in range(len(points) - 1)
+                    if (values[i] < 0) != (values[i + 1] < 0) or values[i] == 0]
+        if values[-1] == 0:
+            brackets.append((points[-1], points[-1], 0.0, 0.0))
+        expansions = 0
+        while not brackets and expandable and expansions < SOLVE_MAX_EXPANSIONS:
+            # Monetary parameters have no natural ceiling: keep doubling
+            a, fa = points[-1], values[-1]
+            b = 2 * a
+            fb = f(b)
+            points.append(b)
+            values.append(fb)
+            expansions += 1
+            if (fa < 0) != (fb < 0) or fb == 0:
+                brackets.append((a, b, fa, fb))
+
+        if not brackets:
+            reachable = [v + target for v in values]
+            return {
+                'parameter': path, 'metric': metric, 'target': target, 'converged': False,
+                'error': (f"{metric} does not reach {target:g} for {path} in "
+                          f"[{points[0]:g}, {points[-1]:g}] (range {min(reachable):g} to {max(reachable):g})")
+            }
+
+        a, b, fa, fb = min(brackets, key=lambda bracket: abs((bracket[0] + bracket[1]) / 2 - base_value))
+        if fa == 0:
+            value, residual, iterations = a, 0.0, 0
+        else:
+            tolerance = xtol if xtol is not None else 1e-12 * max(1.0, abs(a), abs(b))
+            value, residual, iterations = _brent(f, a, b, fa, fb, tolerance)
+
+        # A residual that stays large as the bracket collapses means the
+        # metric jumps over the target here (e.g. a year boundary)
+        converged = abs(residual) <= 1e-9 * max(1.0, abs(target), abs(fa), abs(fb))
+        result = {
+            'parameter': path,
+            'metric': metric,
+            'target': target,
+            'value': value,
+            'achieved': residual + target,
+            'baseValue': base_value,
+            'iterations': iterations,
+            'converged': converged,
+        }
+        if not converged:
+            result['error'] = f"{metric} jumps across {target:g} at {path} = {value:g}; no exact solution"
+        return result
+    finally:
+        model.set(path, base_value)
+
+
+def solve_dcf(valuation_data, targets):
+    """Goal-seek one or more free parameters against a valuation.
+
+    Each target is a dict with ``parameter`` (a DCF parameter path),
+    optional ``metric`` (npv, cumulativePoS or peakRevenue; default npv),
+    ``value`` (default 0, i.e. break-even), and optional ``bounds`` and
+    ``tolerance``. Targets are solved independently, each varying only its
+    own parameter from the document's values, on one shared DcfModel, so
+    nothing is re-parsed or written. Values are in document units.
+    """
+    if not isinstance(targets, list) or not targets:
+        raise ValueError("targets must be a non-empty list")
+    if len(targets) > SOLVE_MAX_TARGETS:
+        raise ValueError(f"at most {SOLVE_MAX_TARGETS} targets per request")
+
+    model = DcfModel(valuation_data)
+    base_metrics = {metric: read(model) for metric, read in SOLVE_METRICS.items()}
+    inactive = {path for phase, limit in PHASE_STAGE_LIMITS.items() if model.stage_value > limit
+                for path in PHASE_PARAMETER_KEYS[phase]}
+
+    solutions = []
+    for target in targets:
+        if not isinstance(target, dict):
+            raise ValueError("each target must be an object")
+        path = target.get('parameter')
+        metric = target.get('metric', 'npv')
+        if path not in DCF_PARAMETER_INDEX:
+            raise ValueError(f"Unknown DCF parameter: {path}")
+        if metric not in SOLVE_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(SOLVE_METRICS)}")
+        if path in inactive:
+            solutions.append({'parameter': path, 'metric': metric, 'converged': False,
+                              'error': f"{path} does not apply at stage {model.stage}"})
+            continue
+        tolerance = target.get('tolerance')
+        if tolerance is not None and not float(tolerance) > 0:
+            raise ValueError("tolerance must be a positive number")
+        solutions.append(_solve_one(model, path, metric, float(target.get('value', 0)),
+                                    target.get('bounds'), float(tolerance) if tolerance is not None else None))
+
+    return {'base': base_metrics, 'solutions': solutions}
+
+
+class JsonPatchError(ValueError):
+    """A JSON Patch document is malformed or cannot be applied."""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """A JSON Patch 'test' operation did not match the document."""
+
+
+def _parse_json_pointer(pointer):
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise JsonPatchError(f"Invalid JSON Pointer: {pointer!r}")
+    if pointer == '':
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _resolve_parent(document, tokens, pointer):
+    """Return the container that holds the last token of a pointer."""
+    target = document
+    for token in tokens[:-1]:
+        target = _get_child(target, token, pointer)
+    return target
+
+
+def _get_child(container, token, pointer):
+    if isinstance(container, dict):
+        if token not in container:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_array_index(container, token, pointer)]
+    raise JsonPatchError(f"Path not found: {pointer}")
+
+
+def _array_index(array_value, token, pointer, allow_end=False):
+    if token == '-' and allow_end:
+        return len(array_value)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f"Invalid array index in {pointer}")
+    index = int(token)
+    if index > len(array_value) or (index == len(array_value) and not allow_end):
+        raise JsonPatchError(f"Array index out of range in {pointer}")
+    return index
+
+
+def _patch_get(document, pointer):
+    target = document
+    for token in _parse_json_pointer(pointer):
+        target = _get_child(target, token, pointer)
+    return target
+
+
+def _patch_add(document, pointer, value):
+    tokens = _parse_json_pointer(pointer)
+    if not tokens:
+        return value
+    parent = _resolve_parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, tokens[-1], pointer, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Path not found: {pointer}")
+    return document
+
+
+def _patch_remove(document, pointer):
+    tokens = _parse_json_pointer(pointer)
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    parent = _resolve_parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        return parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, tokens[-1], pointer))
+    raise JsonPatchError(f"Path not found: {pointer}")
+
+
+def _patch_replace(document, pointer, value):
+    tokens = _parse_json_pointer(pointer)
+    if not tokens:
+        return value
+    parent = _resolve_parent(document, tokens, pointer)
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JsonPatchError(f"Path not found: {pointer}")
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent[_array_index(parent, tokens[-1], pointer)] = value
+    else:
+        raise JsonPatchError(f"Path not found: {pointer}")
+    return document
+
+
+def apply_json_patch(document, operations):
+    """Apply an RFC 6902 JSON Patch and return the patched copy of ``document``.
+
+    The input document is never modified. Raises JsonPatchError for invalid
+    operations and JsonPatchTestFailed when a 'test' operation fails; either
+    way no partial result escapes.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("A JSON Patch must be an array of operations")
+
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f"Invalid patch operation: {operation!r}")
+        op, path = operation['op'], operation['path']
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f"'{op}' operation requires a value")
+        if op in ('move', 'copy') and 'from' not in operation:
+            raise JsonPatchError(f"'{op}' operation requires 'from'")
+
+        if op == 'add':
+            document = _patch_add(document, path, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _patch_remove(document, path)
+        elif op == 'replace':
+            document = _patch_replace(document, path, copy.deepcopy(operation['value']))
+        elif op == 'move':
+            source = operation['from']
+            if path != source and path.startswith(source + '/'):
+                raise JsonPatchError(f"Cannot move {source} into its own child {path}")
+            value = _patch_remove(document, source)
+            document = _patch_add(document, path, value)
+        elif op == 'copy':
+            value = copy.deepcopy(_patch_get(document, operation['from']))
+            document = _patch_add(document, path, value)
+        elif op == 'test':
+            if _patch_get(document, path) != operation['value']:
+                raise JsonPatchTestFailed(f"Test failed at {path}")
+        else:
+            raise JsonPatchError(f"Unknown patch operation: {op}")
+    return document
+
+
+def apply_overrides(valuation_data, overrides):
+    """Return a copy of ``valuation_data`` with ``overrides`` merged over it.
+
+    Overrides mirror the document structure, e.g.
+    ``{"marketParameters": {"annualPricing": 52000}}``, or use flat
+    ``"section.key"`` paths. A scalar placed on a parameter object replaces
+    its ``value``; objects are merged recursively. Only the branches that
+    change are copied, so the base document is never modified. Sections
+    can only be overridden with objects; anything else raises ValueError.
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError("Overrides must be a JSON object")
+
+    merged = dict(valuation_data)
+    for key, override in overrides.items():
+        if '.' in key:
+            section, field = key.split('.', 1)
+            override = {field: override}
+            key = section
+        elif not isinstance(override, dict):
+            raise ValueError(f"Override for section '{key}' must be a JSON object")
+        merged[key] = _merge_override(merged.get(key), override)
+    return merged
+
+
+def _merge_override(base, override):
+    """Merge one override value over one document value (see apply_overrides)."""
+    if isinstance(override, dict):
+        if not isinstance(base, dict):
+            return override
+        merged = dict(base)
+        for key, value in override.items():
+            merged[key] = _merge_override(base.get(key), value)
+        return merged
+    if isinstance(base, dict) and 'value' in base:
+        merged = dict(base)
+        merged['value'] = override
+        return merged
+    return override
+
+
+# Histogram bucket upper bounds, in seconds
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Fixed API routes are their own label
+METRICS_API_ROUTES = frozenset((
+    '/api/valuations', '/api/cache/stats', '/api/metrics', '/api/portfolio',
+    '/api/export', '/api/events', '/api/search', '/api/jobs',
+))
+METRICS_ROUTE_PATTERNS = (
+    (re.compile(r'^/api/valuations/[^/]+/(dcf|montecarlo|sensitivity|solve)$'), r'/api/valuations/{id}/\1'),
+    (re.compile(r'^/api/valuations/[^/]+$'), '/api/valuations/{id}'),
+    (re.compile(r'^/api/jobs/[^/]+$'), '/api/jobs/{id}'),
+    (re.compile(r'^/(index\.html)?$'), '/'),
+)
+
+
+def metrics_route(path):
+    """Collapse a request path into a low-cardinality route label.
+
+    Only known routes get their own label; any other /api/ path is
+    "other", so clients can't create new series by making up URLs.
+    """
+    path = urlparse(path).path
+    if path in METRICS_API_ROUTES:
+        return path
+    for pattern, route in METRICS_ROUTE_PATTERNS:
+        if pattern.match(path):
+            return pattern.sub(route, path)
+    return 'other' if (path + '/').startswith('/api/') else 'static'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(METRICS_LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(METRICS_LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _metric_labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+class Metrics:
+    """Request and compute metrics, rendered in the Prometheus text format.
+
+    Handlers report each finished request with request_finished(); compute
+    phases (JSON parsing, calculate_dcf, serialization) are timed with
+    ``with METRICS.timed('calculate_dcf'):``. Extra samples can be added at
+    render time with add_collector().
     """
-    year_start = float(year)
-    year_end = float(year + 1)
-    fractions = []
 
-    # Phase I overlap
-    if phase_i_duration > 0 and year_start < phase_i_end:
-        overlap = min(year_end, phase_i_end) - max(year_start, 0)
-        if overlap > 0:
-            fractions.append(('Phase I', 'phaseI', overlap))
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}  # (method, route, status) -> count
+        self._errors = {}  # (method, route, status) -> count, status >= 400
+        self._bytes = {}  # (method, route) -> bytes sent
+        self._latency = {}  # (method, route) -> Histogram
+        self._compute = {}  # operation -> Histogram
+        self._collectors = []
+        self.in_flight = 0
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
 
-    # Phase II overlap
-    if phase_ii_duration > 0 and year_start < phase_ii_end and year_end > phase_i_end:
-        overlap = min(year_end, phase_ii_end) - max(year_start, phase_i_end)
-        if overlap > 0:
-            fractions.append(('Phase II', 'phaseII', overlap))
+    def request_finished(self, method, path, status, seconds, size):
+        """Record one served request."""
+        route = metrics_route(path)
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status is None or status >= 400:
+                self._errors[key] = self._errors.get(key, 0) + 1
+            self._bytes[(method, route)] = self._bytes.get((method, route), 0) + size
+            histogram = self._latency.get((method, route))
+            if histogram is None:
+                histogram = self._latency[(method, route)] = Histogram()
+            histogram.observe(seconds)
 
-    # Phase III overlap
-    if phase_iii_duration > 0 and year_start < phase_iii_end and year_end > phase_ii_end:
-        overlap = min(year_end, phase_iii_end) - max(year_start, phase_ii_end)
-        if overlap > 0:
-            fractions.append(('Phase III', 'phaseIII', overlap))
+    def observe(self, operation, seconds):
+        """Record time spent in a compute phase."""
+        with self._lock:
+            histogram = self._compute.get(operation)
+            if histogram is None:
+                histogram = self._compute[operation] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, operation):
+        """Time the enclosed block as ``operation``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, time.perf_counter() - start)
+
+    def add_collector(self, collector):
+        """Register ``collector() -> [(name, type, help, [(labels dict, value)])]`` for render()."""
+        self._collectors.append(collector)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_metric_labels(labels.keys(), labels.values()) if labels else ''} {value}")
+
+        def histograms(name, help_text, label_names, items):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(items):
+                cumulative = 0
+                for bound, count in zip(METRICS_LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    labels = _metric_labels(label_names + ('le',), key + (repr(bound),))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(f"{name}_bucket{_metric_labels(label_names + ('le',), key + ('+Inf',))} {histogram.count}")
+                lines.append(f"{name}_sum{_metric_labels(label_names, key)} {histogram.sum!r}")
+                lines.append(f"{name}_count{_metric_labels(label_names, key)} {histogram.count}")
+
+        with self._lock:
+            request_labels = ('method', 'route', 'status')
+            family('biobucks_http_requests_total', 'counter', 'HTTP requests served.',
+                   [(dict(zip(request_labels, key)), count) for key, count in sorted(self._requests.items())])
+            family('biobucks_http_request_errors_total', 'counter', 'HTTP responses with a 4xx or 5xx status.',
+                   [(dict(zip(request_labels, key)), count) for key, count in sorted(self._errors.items())])
+            family('biobucks_http_response_bytes_total', 'counter', 'Bytes written in HTTP responses.',
+                   [({'method': method, 'route': route}, size) for (method, route), size in sorted(self._bytes.items())])
+            family('biobucks_http_requests_in_flight', 'gauge', 'HTTP requests currently being handled.',
+                   [({}, self.in_flight)])
+            histograms('biobucks_http_request_duration_seconds', 'HTTP request latency.',
+                       ('method', 'route'), list(self._latency.items()))
+            histograms('biobucks_compute_duration_seconds',
+                       'Time spent in JSON parsing, calculate_dcf, serialization and compression.',
+                       ('operation',), [((operation,), h) for operation, h in self._compute.items()])
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                family(name, kind, help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def profile_dcf(valuation_data):
+    """Run calculate_dcf() and serialize the result under cProfile.
+
+    Returns the DCF result with a ``profile`` key listing the functions with
+    the most cumulative time.
+    """
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        results = calculate_dcf(valuation_data)
+        encode_json(results)
+    finally:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    stats = pstats.Stats(profiler)
+    functions = []
+    for (filename, line, name), (primitive_calls, calls, total_time, cumulative_time, _) in stats.stats.items():
+        functions.append({
+            'function': name,
+            'file': filename,
+            'line': line,
+            'calls': calls,
+            'primitiveCalls': primitive_calls,
+            'totalTime': total_time,
+            'cumulativeTime': cumulative_time
+        })
+    functions.sort(key=lambda function: function['cumulativeTime'], reverse=True)
+
+    results['profile'] = {
+        'totalSeconds': elapsed,
+        'functions': functions[:PROFILE_TOP_FUNCTIONS]
+    }
+    return results
+
+
+# API responses use compact separators; valuation files on disk stay indented
+JSON_SEPARATORS = (',', ':')
+# Content codings we can produce, in order of preference
+CONTENT_ENCODINGS = ('gzip', 'deflate')
+# Bodies smaller than this are not worth compressing
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_LEVEL = 6
+DCF_FORMATS = ('records', 'columnar')
+
+
+def encode_json(data):
+    """Serialize an API response body."""
+    return json.dumps(data, separators=JSON_SEPARATORS).encode('utf-8')
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick a content coding from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, parameters = item.partition(';')
+        weight = 1.0
+        for parameter in parameters.split(';'):
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for coding in CONTENT_ENCODINGS:
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress_body(body, encoding):
+    """Return ``body`` with the given content coding applied."""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=COMPRESSION_LEVEL, mtime=0)
+    if encoding == 'deflate':
+        # HTTP "deflate" is the zlib format (RFC 1950), not a raw deflate stream
+        return zlib.compress(body, COMPRESSION_LEVEL)
+    return body
+
+
+def columnar_dcf(results):
+    """Return a DCF result with ``years`` as parallel arrays keyed by field."""
+    fields = []
+    for year in results['years']:
+        fields.extend(field for field in year if field not in fields)
+    columnar = dict(results)
+    columnar['years'] = {field: [year.get(field) for year in results['years']] for field in fields}
+    return columnar
+
+
+# Bump whenever calculate_dcf() output changes so cached results are not reused
+DCF_MODEL_VERSION = "1"
+
+
+def content_hash(data):
+    """Return a SHA-256 hex digest of a JSON document in canonical form."""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class DcfResultCache:
+    """Bounded LRU cache of serialized DCF responses.
+
+    Entries are keyed by the content hash of the input document together
+    with DCF_MODEL_VERSION, so any edit to a valuation (or to the model)
+    misses naturally and nothing needs explicit invalidation. Each entry maps
+    a content coding (None for identity) to the response body, so compressed
+    variants are built once per document and encoding.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(document_hash, dcf_format='records'):
+        """Return the cache key (also used as the ETag) for a document hash and response format."""
+        version = DCF_MODEL_VERSION if dcf_format == 'records' else f"{DCF_MODEL_VERSION}:{dcf_format}"
+        return hashlib.sha256(f"{version}:{document_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached bodies for ``key`` or None, updating recency and counters."""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, bodies):
+        """Store {encoding: body} for a response, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = bodies
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached response (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries
+            }
+
+
+DCF_CACHE = DcfResultCache()
+
+
+def dcf_cache_metrics():
+    """Expose the DCF result cache counters to /api/metrics."""
+    stats = DCF_CACHE.stats()
+    return [
+        ('biobucks_dcf_cache_hits_total', 'counter', 'DCF result cache hits.', [({}, stats['hits'])]),
+        ('biobucks_dcf_cache_misses_total', 'counter', 'DCF result cache misses.', [({}, stats['misses'])]),
+        ('biobucks_dcf_cache_evictions_total', 'counter', 'DCF results evicted from the cache.',
+         [({}, stats['evictions'])]),
+        ('biobucks_dcf_cache_entries', 'gauge', 'DCF results currently cached.', [({}, stats['entries'])]),
+    ]
+
+
+METRICS.add_collector(dcf_cache_metrics)
+
+
+def summarize_valuation(valuation_id, data):
+    """Return the list-view summary of a valuation document.
+
+    The development stage is the one the DCF uses (get_development_stage()),
+    so ?stage= filters and stage sorting agree with the valuation itself.
+    """
+    return {
+        "id": valuation_id,  # filename without extension
+        "filename": f"{valuation_id}.json",
+        "assetName": data.get("assetOverview", {}).get("assetName", "Unknown Asset"),
+        "therapeuticArea": data.get("assetOverview", {}).get("therapeuticArea", ""),
+        "developmentStage": get_development_stage(data)[0],
+        "generatedDate": data.get("metadata", {}).get("generatedDate", "")
+    }
+
+
+def validate_valuation(valuation_id, data):
+    """Check that ``data`` can be listed and valued, returning its DCF results.
+
+    Raises ValueError for anything else (a non-object document or section,
+    an unknown development stage, inputs the model can't discount, ...), so
+    an edit can be refused before it reaches the index or the disk.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Valuation must be a JSON object")
+    try:
+        summarize_valuation(valuation_id, data)
+        return calculate_dcf(data)
+    except (AttributeError, TypeError, ArithmeticError) as e:
+        raise ValueError(f"Valuation cannot be valued: {e}") from e
+
+
+# List sort keys accepted by ?sort= (prefix "-" for descending)
+VALUATION_SORT_FIELDS = ('assetName', 'therapeuticArea', 'developmentStage', 'generatedDate', 'npv')
+DEFAULT_VALUATION_SORT = '-generatedDate'
+MAX_VALUATION_PAGE_SIZE = 1000
+
+
+def parse_valuation_sort(sort):
+    """Split a ?sort= value into (field, descending). Raises ValueError."""
+    descending = sort.startswith('-')
+    field = sort.lstrip('-+')
+    if field not in VALUATION_SORT_FIELDS:
+        raise ValueError(f"sort must be one of {', '.join(VALUATION_SORT_FIELDS)} (prefix - for descending)")
+    return field, descending
+
+
+# SQLite's COLLATE NOCASE folds ASCII letters only
+_NOCASE_FOLD = {code: code + 32 for code in range(ord('A'), ord('Z') + 1)}
+
+
+def fold_case(text):
+    """Lowercase ASCII letters only, the way SQLite's COLLATE NOCASE compares.
+
+    Text filters use this on every backend so a ?area= or ?stage= value
+    matches the same valuations whether they live in files or in SQLite.
+    """
+    return str(text).translate(_NOCASE_FOLD)
+
+
+def area_matches(area, wanted):
+    """True if a therapeutic area satisfies an ?area= filter (case-insensitive)."""
+    return fold_case(area) == fold_case(wanted)
+
+
+def stage_matches(stage, wanted):
+    """True if a development stage satisfies a ?stage= filter.
+
+    Stages are compared by their STAGE_MAP value when the filter names a
+    known stage (so "phase 2" matches "Phase II"), by name otherwise.
+    """
+    wanted_value = STAGE_MAP.get(wanted.lower())
+    if wanted_value is not None:
+        return STAGE_MAP.get(str(stage).lower()) == wanted_value
+    return fold_case(stage) == fold_case(wanted)
+
+
+def encode_cursor(sort, value, valuation_id):
+    """Return an opaque keyset cursor positioned after one list row."""
+    raw = json.dumps([sort, value, valuation_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Return (value, valuation id) from a cursor issued for ``sort``. Raises ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, valuation_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or not isinstance(valuation_id, str):
+        raise ValueError("Cursor does not match the requested sort")
+    return value, valuation_id
+
+
+def _sort_key(value, valuation_id):
+    # NULL-like values sort first, as they do in SQLite
+    return (value is not None, value if value is not None else 0, valuation_id)
+
+
+class ValuationEntry:
+    """One indexed valuation file: its stat validators, document and summary.
+
+    ``mtime_ns`` and ``size`` are None while an edit is waiting to be written.
+    """
+
+    __slots__ = ('id', 'path', 'mtime_ns', 'size', 'data', 'summary', '_content_hash', '_npv')
+
+    def __init__(self, valuation_id, path, mtime_ns, size, data):
+        self.id = valuation_id
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.data = data
+        self.summary = summarize_valuation(valuation_id, data)
+        self._content_hash = None
+        self._npv = None
+
+    @property
+    def pending(self):
+        """True while the document is newer than the file on disk."""
+        return self.mtime_ns is None
+
+    @property
+    def content_hash(self):
+        """Canonical content hash of the document, computed on first use."""
+        if self._content_hash is None:
+            self._content_hash = content_hash(self.data)
+        return self._content_hash
+
+    @property
+    def npv(self):
+        """Deterministic rNPV of the document, or None if it can't be computed."""
+        if self._npv is None:
+            try:
+                self._npv = calculate_dcf(self.data)['npv']
+            except Exception:
+                self._npv = math.nan
+        return None if math.isnan(self._npv) else self._npv
+
+    def sort_value(self, field):
+        """Return this entry's value for a VALUATION_SORT_FIELDS key."""
+        if field == 'npv':
+            return self.npv
+        if field == 'developmentStage':
+            return STAGE_MAP.get(str(self.summary['developmentStage']).lower())
+        return str(self.summary[field])
+
+
+class ValuationIndex:
+    """In-process index of the valuation files in a directory.
+
+    Parsed documents and their summaries are kept in memory and validated
+    against each file's mtime and size, so only files that changed on disk
+    are re-read. refresh() revalidates the whole directory with a single
+    os.scandir() pass; get() revalidates just one file. Documents handed out
+    are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._entries = {}
+        self._unreadable = {}  # id -> (mtime_ns, size) of files that failed to parse
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._file_locks = {}
+        self._sorted_entries = None
+        self._listeners = []
+        self._refreshed_at = -math.inf
+
+    def add_listener(self, callback):
+        """Call ``callback(valuation_id, entry)`` whenever a document is (re)loaded,
+        edited or written; ``entry`` is None when the valuation goes away."""
+        self._listeners.append(callback)
+
+    def _notify(self, valuation_id, entry):
+        for callback in self._listeners:
+            callback(valuation_id, entry)
+
+    def warm_in_background(self):
+        """Populate the index from a daemon thread so startup isn't blocked."""
+        thread = threading.Thread(target=self.refresh, name="valuation-index-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self, max_age=None):
+        """Bring the index in line with the directory.
+
+        Returns (created, updated, deleted) lists of valuation ids; files that
+        stopped parsing are reported as deleted. With ``max_age``, the scan is
+        skipped if the last one was less than that many seconds ago.
+        """
+        # Concurrent refreshes (list, search, the change feed, export) would
+        # otherwise race on the unreadable set and report changes twice
+        with self._refresh_lock:
+            now = time.monotonic()
+            if max_age is not None and now - self._refreshed_at < max_age:
+                return [], [], []
+            self._refreshed_at = now
+            return self._rescan()
+
+    def _rescan(self):
+        """Reconcile the index with one directory scan. Caller holds the refresh lock."""
+        self.directory.mkdir(exist_ok=True)
+        with os.scandir(self.directory) as it:
+            stats = {}
+            for dir_entry in it:
+                if dir_entry.name.endswith('.json') and dir_entry.is_file():
+                    stat = dir_entry.stat()
+                    stats[dir_entry.name[:-5]] = (dir_entry.path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            current = dict(self._entries)
+
+        created, updated, unreadable = [], [], []
+        for valuation_id, (path, mtime_ns, size) in stats.items():
+            entry = current.get(valuation_id)
+            if entry is not None and (entry.pending or (entry.mtime_ns == mtime_ns and entry.size == size)):
+                continue
+            if self._unreadable.get(valuation_id) == (mtime_ns, size):
+                continue
+            try:
+                self._load(valuation_id, Path(path), mtime_ns, size)
+            except (OSError, ValueError) as e:
+                # Covers invalid JSON, bad UTF-8 and documents that aren't objects
+                print(f"Error reading {path}: {e}")
+                self._unreadable[valuation_id] = (mtime_ns, size)
+                self._discard(valuation_id)
+                if entry is not None:
+                    unreadable.append(valuation_id)
+                continue
+            self._unreadable.pop(valuation_id, None)
+            (updated if entry is not None else created).append(valuation_id)
+
+        deleted = [valuation_id for valuation_id in current if valuation_id not in stats]
+        for valuation_id in deleted:
+            self._discard(valuation_id)
+        for valuation_id in list(self._unreadable):
+            if valuation_id not in stats:
+                del self._unreadable[valuation_id]
+        return created, updated, deleted + unreadable
+
+    def lock_for(self, valuation_id):
+        """Return the lock serializing reads and writes of one valuation file."""
+        with self._lock:
+            lock = self._file_locks.get(valuation_id)
+            if lock is None:
+                lock = self._file_locks[valuation_id] = threading.RLock()
+            return lock
+
+    def path_for(self, valuation_id):
+        """Return the file path backing a valuation id."""
+        return self.directory / f"{valuation_id}.json"
+
+    def get(self, valuation_id):
+        """Return the up-to-date ValuationEntry for an id, or None if it doesn't exist.
+
+        Raises json.JSONDecodeError if the file on disk is not valid JSON, and
+        ValueError if it is not UTF-8 or not a JSON object.
+        """
+        with self._lock:
+            entry = self._entries.get(valuation_id)
+        if entry is not None and entry.pending:
+            return entry
+
+        path = self.path_for(valuation_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._discard(valuation_id)
+            return None
+
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+        return self._load(valuation_id, path, stat.st_mtime_ns, stat.st_size)
+
+    def summaries(self):
+        """Return all valuation summaries, newest generated date first."""
+        self.refresh()
+        with self._lock:
+            return [entry.summary for entry in self._newest_first()]
+
+    def _newest_first(self):
+        """Return entries in the default list order. Caller holds the lock."""
+        if self._sorted_entries is None:
+            self._sorted_entries = sorted(
+                self._entries.values(),
+                key=lambda entry: _sort_key(entry.sort_value('generatedDate'), entry.id),
+                reverse=True
+            )
+        return self._sorted_entries
+
+    def entries(self):
+        """Return every indexed entry, ordered by valuation id."""
+        self.refresh()
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda entry: entry.id)
+
+    def modified_between(self, since, until):
+        """Yield written entries with since < mtime_ns <= until, oldest change first.
+
+        Edits still waiting to be written are left out; they are picked up
+        once their file lands.
+        """
+        self.refresh()
+        with self._lock:
+            entries = [entry for entry in self._entries.values()
+                       if entry.mtime_ns is not None and since < entry.mtime_ns <= until]
+        entries.sort(key=lambda entry: (entry.mtime_ns, entry.id))
+        yield from entries
+
+    def query(self, area=None, stage=None, sort=DEFAULT_VALUATION_SORT, limit=None, cursor=None):
+        """Return (summaries, next cursor) for one page of the filtered, sorted list.
+
+        Rows are ordered by the sort field and then by id, in the same
+        direction; the cursor is None on the last page. Raises ValueError for
+        an unknown sort or a cursor issued for a different sort.
+        """
+        field, descending = parse_valuation_sort(sort)
+        if sort == DEFAULT_VALUATION_SORT and area is None and stage is None:
+            self.refresh()
+            with self._lock:
+                entries = self._newest_first()
+        else:
+            entries = self.entries()
+        if area is not None:
+            entries = [entry for entry in entries if area_matches(entry.summary['therapeuticArea'], area)]
+        if stage is not None:
+            entries = [entry for entry in entries if stage_matches(entry.summary['developmentStage'], stage)]
+
+        rows = [(entry.sort_value(field), entry) for entry in entries]
+        if entries is not self._sorted_entries:
+            rows.sort(key=lambda row: _sort_key(row[0], row[1].id), reverse=descending)
+        if cursor is not None:
+            after = _sort_key(*decode_cursor(cursor, sort))
+            rows = [row for row in rows
+                    if (_sort_key(row[0], row[1].id) < after if descending else _sort_key(row[0], row[1].id) > after)]
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1][0], rows[-1][1].id)
+        return [entry.summary for _, entry in rows], next_cursor
+
+    def exists(self, valuation_id):
+        """True if the valuation exists (on disk or waiting to be written)."""
+        with self._lock:
+            entry = self._entries.get(valuation_id)
+        return (entry is not None and entry.pending) or self.path_for(valuation_id).exists()
+
+    def write(self, valuation_id, data):
+        """Atomically write a valuation file and index the written document."""
+        stat = write_json_atomic(self.path_for(valuation_id), data)
+        self.mark_written(valuation_id, data, stat)
+
+    def delete(self, valuation_id):
+        """Remove a valuation file. Returns False if it didn't exist."""
+        try:
+            self.path_for(valuation_id).unlink()
+        except FileNotFoundError:
+            return False
+        finally:
+            self._discard(valuation_id)
+        return True
+
+    def put(self, valuation_id, data):
+        """Serve ``data`` for a valuation ahead of it being written to disk."""
+        entry = ValuationEntry(valuation_id, self.path_for(valuation_id), None, None, data)
+        with self._lock:
+            self._entries[valuation_id] = entry
+            self._sorted_entries = None
+        self._notify(valuation_id, entry)
+        return entry
+
+    def mark_written(self, valuation_id, data, stat):
+        """Record that ``data`` is now on disk with the given stat."""
+        with self._lock:
+            entry = self._entries.get(valuation_id)
+            if entry is not None and entry.data is data:
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                entry = None
+            else:
+                entry = self._entries[valuation_id] = ValuationEntry(
+                    valuation_id, self.path_for(valuation_id), stat.st_mtime_ns, stat.st_size, data)
+            self._sorted_entries = None
+        if entry is not None:
+            self._notify(valuation_id, entry)
+
+    def invalidate(self, valuation_id):
+        """Forget an entry so its file is re-read on next access."""
+        self._discard(valuation_id, notify=False)
+
+    def _load(self, valuation_id, path, mtime_ns, size):
+        with self.lock_for(valuation_id):
+            with open(path, 'r', encoding='utf-8') as f, METRICS.timed('json_parse'):
+                data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path.name} is not a JSON object")
+        entry = ValuationEntry(valuation_id, path, mtime_ns, size, data)
+        with self._lock:
+            self._entries[valuation_id] = entry
+            self._sorted_entries = None
+        self._notify(valuation_id, entry)
+        return entry
+
+    def _discard(self, valuation_id, notify=True):
+        with self._lock:
+            removed = self._entries.pop(valuation_id, None) is not None
+            if removed:
+                self._sorted_entries = None
+        if removed and notify:
+            self._notify(valuation_id, None)
+
+
+class SqliteValuationStore:
+    """Valuation store backed by a SQLite database.
+
+    A drop-in alternative to ValuationIndex for large collections. Each
+    document is stored as JSON next to indexed columns for the list view
+    (asset name, therapeutic area, development stage, generated date and
+    the NPV computed when it was written), so filtering, sorting and keyset
+    pagination run in SQL. Parsed documents are cached in memory and
+    revalidated against the row's version.
+    """
+
+    SORT_COLUMNS = {
+        'assetName': 'asset_name',
+        'therapeuticArea': 'therapeutic_area',
+        'developmentStage': 'stage_value',
+        'generatedDate': 'generated_date',
+        'npv': 'npv'
+    }
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS valuations (
+            id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            asset_name TEXT NOT NULL,
+            therapeutic_area TEXT NOT NULL,
+            development_stage TEXT NOT NULL,
+            stage_value INTEGER,
+            generated_date TEXT NOT NULL,
+            npv REAL,
+            content_hash TEXT NOT NULL,
+            document TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS valuations_asset_name ON valuations (asset_name, id);
+        CREATE INDEX IF NOT EXISTS valuations_therapeutic_area ON valuations (therapeutic_area COLLATE NOCASE, id);
+        CREATE INDEX IF NOT EXISTS valuations_stage ON valuations (stage_value, id);
+        CREATE INDEX IF NOT EXISTS valuations_generated_date ON valuations (generated_date, id);
+        CREATE INDEX IF NOT EXISTS valuations_npv ON valuations (npv, id);
+        CREATE INDEX IF NOT EXISTS valuations_version ON valuations (version, id);
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._entries = {}
+        self._versions = {}  # id -> version as of the last refresh()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._file_locks = {}
+        self._listeners = []
+        self._refreshed_at = -math.inf
+        with self._connection() as db:
+            db.executescript(self.SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def add_listener(self, callback):
+        """Call ``callback(valuation_id, entry)`` on changes; see ValuationIndex.add_listener()."""
+        self._listeners.append(callback)
+
+    def _notify(self, valuation_id, entry):
+        for callback in self._listeners:
+            callback(valuation_id, entry)
+
+    def warm_in_background(self):
+        """Load the row versions from a daemon thread so startup isn't blocked."""
+        thread = threading.Thread(target=self.refresh, name="valuation-store-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def refresh(self, max_age=None):
+        """Return (created, updated, deleted) ids since the previous refresh().
+
+        With ``max_age``, nothing is checked if the last refresh was less
+        than that many seconds ago.
+        """
+        # Serialised like ValuationIndex.refresh() so concurrent callers
+        # don't report the same change twice
+        with self._refresh_lock:
+            now = time.monotonic()
+            if max_age is not None and now - self._refreshed_at < max_age:
+                return [], [], []
+            self._refreshed_at = now
+            return self._reload_versions()
+
+    def _reload_versions(self):
+        """Diff the stored versions against the last refresh. Caller holds the refresh lock."""
+        versions = dict(self._connection().execute("SELECT id, version FROM valuations"))
+        with self._lock:
+            previous, self._versions = self._versions, versions
+            for valuation_id in [vid for vid in self._entries if vid not in versions]:
+                if not self._entries[valuation_id].pending:
+                    del self._entries[valuation_id]
+        created = [vid for vid in versions if vid not in previous]
+        updated = [vid for vid, version in versions.items() if vid in previous and previous[vid] != version]
+        deleted = [vid for vid in previous if vid not in versions]
+        if self._listeners:
+            changed = created + updated
+            for i in range(0, len(changed), 500):
+                self._load(changed[i:i + 500])
+            for valuation_id in deleted:
+                self._notify(valuation_id, None)
+        return created, updated, deleted
+
+    def lock_for(self, valuation_id):
+        """Return the lock serializing reads and writes of one valuation."""
+        with self._lock:
+            lock = self._file_locks.get(valuation_id)
+            if lock is None:
+                lock = self._file_locks[valuation_id] = threading.RLock()
+            return lock
+
+    def get(self, valuation_id):
+        """Return the up-to-date ValuationEntry for an id, or None if it doesn't exist."""
+        with self._lock:
+            entry = self._entries.get(valuation_id)
+        if entry is not None and entry.pending:
+            return entry
+
+        row = self._connection().execute(
+            "SELECT version FROM valuations WHERE id = ?", (valuation_id,)).fetchone()
+        if row is None:
+            self.invalidate(valuation_id)
+            return None
+        if entry is not None and entry.mtime_ns == row[0]:
+            return entry
+        self._load([valuation_id])
+        with self._lock:
+            return self._entries.get(valuation_id)
+
+    def entries(self):
+        """Return every stored entry, ordered by valuation id."""
+        rows = self._connection().execute("SELECT id, version FROM valuations ORDER BY id").fetchall()
+        with self._lock:
+            cached = dict(self._entries)
+        stale = [vid for vid, version in rows
+                 if vid not in cached or not (cached[vid].pending or cached[vid].mtime_ns == version)]
+        loaded = {}
+        for i in range(0, len(stale), 500):
+            loaded.update(self._load(stale[i:i + 500]))
+        return [loaded.get(vid) or cached[vid] for vid, _ in rows if vid in loaded or vid in cached]
+
+    def summaries(self):
+        """Return all valuation summaries, newest generated date first."""
+        return self.query()[0]
+
+    def query(self, area=None, stage=None, sort=DEFAULT_VALUATION_SORT, limit=None, cursor=None):
+        """Return (summaries, next cursor) for one page; see ValuationIndex.query()."""
+        field, descending = parse_valuation_sort(sort)
+        column = self.SORT_COLUMNS[field]
+        where, params = [], []
+        if area is not None:
+            where.append("therapeutic_area = ? COLLATE NOCASE")
+            params.append(area)
+        if stage is not None:
+            stage_value = STAGE_MAP.get(stage.lower())
+            if stage_value is not None:
+                where.append("stage_value = ?")
+                params.append(stage_value)
+            else:
+                where.append("development_stage = ? COLLATE NOCASE")
+                params.append(stage)
+        if cursor is not None:
+            value, after_id = decode_cursor(cursor, sort)
+            # Keyset condition matching _sort_key() ordering (NULLs first)
+            if descending and value is None:
+                where.append(f"({column} IS NULL AND id < ?)")
+                params.append(after_id)
+            elif descending:
+                where.append(f"({column} < ? OR {column} IS NULL OR ({column} = ? AND id < ?))")
+                params.extend([value, value, after_id])
+            elif value is None:
+                where.append(f"({column} IS NOT NULL OR id > ?)")
+                params.append(after_id)
+            else:
+                where.append(f"({column} > ? OR ({column} = ? AND id > ?))")
+                params.extend([value, value, after_id])
+
+        direction = "DESC" if descending else "ASC"
+        sql = ("SELECT id, asset_name, therapeutic_area, development_stage, generated_date, " + column +
+               " FROM valuations" + (" WHERE " + " AND ".join(where) if where else "") +
+               f" ORDER BY {column} {direction}, id {direction}")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self._connection().execute(sql, params).fetchall()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1][5], rows[-1][0])
+        summaries = [{
+            "id": valuation_id,
+            "filename": f"{valuation_id}.json",
+            "assetName": asset_name,
+            "therapeuticArea": therapeutic_area,
+            "developmentStage": development_stage,
+            "generatedDate": generated_date
+        } for valuation_id, asset_name, therapeutic_area, development_stage, generated_date, _ in rows]
+        return summaries, next_cursor
+
+    def exists(self, valuation_id):
+        """True if the valuation is stored or waiting to be written."""
+        with self._lock:
+            entry = self._entries.get(valuation_id)
+        if entry is not None and entry.pending:
+            return True
+        return self._connection().execute(
+            "SELECT 1 FROM valuations WHERE id = ?", (valuation_id,)).fetchone() is not None
+
+    def put(self, valuation_id, data):
+        """Serve ``data`` for a valuation ahead of it being written."""
+        entry = ValuationEntry(valuation_id, None, None, None, data)
+        with self._lock:
+            self._entries[valuation_id] = entry
+        self._notify(valuation_id, entry)
+        return entry
+
+    def write(self, valuation_id, data):
+        """Store a valuation document and index it."""
+        self.write_many([(valuation_id, data)])
+
+    def write_many(self, documents):
+        """Store (valuation id, document) pairs in a single transaction."""
+        rows, entries = [], []
+        for valuation_id, data in documents:
+            document = json.dumps(data)
+            entry = ValuationEntry(valuation_id, None, time.time_ns(), len(document), data)
+            summary = entry.summary
+            rows.append((
+                valuation_id, entry.mtime_ns, str(summary['assetName']), str(summary['therapeuticArea']),
+                str(summary['developmentStage']), entry.sort_value('developmentStage'),
+                str(summary['generatedDate']), entry.npv, entry.content_hash, document
+            ))
+            entries.append(entry)
+
+        with self._connection() as db:
+            db.executemany("""
+                INSERT INTO valuations (id, version, asset_name, therapeutic_area, development_stage,
+                                        stage_value, generated_date, npv, content_hash, document)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    version = excluded.version, asset_name = excluded.asset_name,
+                    therapeutic_area = excluded.therapeutic_area,
+                    development_stage = excluded.development_stage, stage_value = excluded.stage_value,
+                    generated_date = excluded.generated_date, npv = excluded.npv,
+                    content_hash = excluded.content_hash, document = excluded.document
+            """, rows)
+
+        with self._lock:
+            stored = []
+            for entry in entries:
+                current = self._entries.get(entry.id)
+                if current is not None and current.pending and current.data is not entry.data:
+                    continue  # a newer edit is still waiting to be written
+                self._entries[entry.id] = entry
+                # Listeners (the search index, the change feed) hear about
+                # each edit once. Our own write is not a change for refresh()
+                # to reload, and a pending edit was announced when put()
+                self._versions[entry.id] = entry.mtime_ns
+                if current is None or current.data is not entry.data:
+                    stored.append(entry)
+        for entry in stored:
+            self._notify(entry.id, entry)
+
+    def delete(self, valuation_id):
+        """Remove a valuation. Returns False if it didn't exist."""
+        with self._connection() as db:
+            deleted = db.execute("DELETE FROM valuations WHERE id = ?", (valuation_id,)).rowcount
+        self.invalidate(valuation_id)
+        if deleted:
+            self._notify(valuation_id, None)
+        return deleted > 0
+
+    def invalidate(self, valuation_id):
+        """Forget a cached entry so it is re-read on next access."""
+        with self._lock:
+            self._entries.pop(valuation_id, None)
+
+    @staticmethod
+    def _row_entry(row):
+        """Build a ValuationEntry from an (id, version, content_hash, npv, document) row."""
+        valuation_id, version, digest, npv, document = row
+        with METRICS.timed('json_parse'):
+            data = json.loads(document)
+        entry = ValuationEntry(valuation_id, None, version, len(document), data)
+        entry._content_hash = digest
+        entry._npv = math.nan if npv is None else npv
+        return entry
+
+    def modified_between(self, since, until, batch_size=100):
+        """Yield entries with since < version <= until, oldest change first.
+
+        Rows are read in batches and not cached, so memory stays flat
+        however many rows match.
+        """
+        cursor = self._connection().execute(
+            "SELECT id, version, content_hash, npv, document FROM valuations"
+            " WHERE version > ? AND version <= ? ORDER BY version, id", (since, until))
+        try:
+            for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+                for row in rows:
+                    yield self._row_entry(row)
+        finally:
+            cursor.close()
+
+    def _load(self, valuation_ids):
+        """Read and cache the given rows; returns {id: entry}."""
+        placeholders = ",".join("?" * len(valuation_ids))
+        rows = self._connection().execute(
+            f"SELECT id, version, content_hash, npv, document FROM valuations WHERE id IN ({placeholders})",
+            valuation_ids).fetchall()
+        loaded = {row[0]: self._row_entry(row) for row in rows}
+        with self._lock:
+            for valuation_id, entry in list(loaded.items()):
+                current = self._entries.get(valuation_id)
+                if current is None or not current.pending:
+                    self._entries[valuation_id] = entry
+                else:
+                    del loaded[valuation_id]
+        for valuation_id, entry in loaded.items():
+            self._notify(valuation_id, entry)
+        return loaded
+
+
+VALUATION_INDEX = ValuationIndex(VALUATIONS_DIR)
+
+
+SEARCH_TOKEN_PATTERN = re.compile(r'\w+')
+SEARCH_PARAMETER_FIELDS = ('source', 'url', 'explanation')
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_REFRESH_INTERVAL = 1.0  # seconds between directory rescans triggered by searches
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens for the search index."""
+    return SEARCH_TOKEN_PATTERN.findall(text.lower())
+
+
+def searchable_fields(valuation_data):
+    """Yield (path, text) for the free-text fields of a valuation.
+
+    Covers every parameter's source, url and explanation, the string fields
+    of assetOverview and of its biomarkerStatus.
+    """
+    for section, params in valuation_data.items():
+        if section == 'assetOverview' and isinstance(params, dict):
+            for key, value in params.items():
+                if isinstance(value, str) and value:
+                    yield f"assetOverview.{key}", value
+                elif key == 'biomarkerStatus' and isinstance(value, dict):
+                    for field, text in value.items():
+                        if isinstance(text, str) and text:
+                            yield f"assetOverview.biomarkerStatus.{field}", text
+        elif section != 'metadata' and isinstance(params, dict):
+            for key, param in params.items():
+                if isinstance(param, dict):
+                    for field in SEARCH_PARAMETER_FIELDS:
+                        text = param.get(field)
+                        if isinstance(text, str) and text:
+                            yield f"{section}.{key}.{field}", text
+
+
+def _snippet(text, terms, width=160):
+    """Return up to ``width`` characters of ``text`` around the first matching term."""
+    if len(text) <= width:
+        return text
+    start = 0
+    for match in SEARCH_TOKEN_PATTERN.finditer(text.lower()):
+        if match.group() in terms:
+            start = max(0, match.start() - width // 3)
+            break
+    end = min(len(text), start + width)
+    start = max(0, end - width)
+    if start:
+        start = text.rfind(' ', 0, start) + 1  # don't cut the first word
+    return ('…' if start else '') + text[start:end].strip() + ('…' if end < len(text) else '')
+
+
+class SearchIndex:
+    """In-memory inverted index over the free text of every valuation.
+
+    Postings map a token to {valuation id: term frequency} across that
+    valuation's searchable fields (see searchable_fields()). A query matches
+    valuations containing all of its terms, ranked with BM25; only the
+    returned hits are then scanned for the section/field paths that
+    matched. Kept current through a store listener, so only valuations
+    whose document changed are re-tokenized.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._postings = {}
+        self._documents = {}  # valuation id -> (indexed document, [(path, text, token counts)])
+        self._lengths = {}  # valuation id -> number of tokens
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def update(self, valuation_id, entry):
+        """Store listener: (re)index a valuation, or drop it when ``entry`` is None."""
+        data = entry.data if entry is not None else None
+        with self._lock:
+            current = self._documents.get(valuation_id)
+            if current is not None and current[0] is data:
+                return
+
+        fields, tokens = [], []
+        if data is not None:
+            for path, text in searchable_fields(data):
+                field_tokens = tokenize(text)
+                if field_tokens:
+                    fields.append((path, text, Counter(field_tokens)))
+                    tokens.extend(field_tokens)
+        totals = Counter(tokens)
+
+        with self._lock:
+            self._remove(valuation_id)
+            if data is None:
+                return
+            for token, count in totals.items():
+                self._postings.setdefault(token, {})[valuation_id] = count
+            length = len(tokens)
+            self._documents[valuation_id] = (data, fields)
+            self._lengths[valuation_id] = length
+            self._total_length += length
+
+    def _remove(self, valuation_id):
+        """Drop a valuation from the index. Caller holds the lock."""
+        current = self._documents.pop(valuation_id, None)
+        if current is None:
+            return
+        self._total_length -= self._lengths.pop(valuation_id)
+        for token in {token for _, _, counts in current[1] for token in counts}:
+            postings = self._postings[token]
+            del postings[valuation_id]
+            if not postings:
+                del self._postings[token]
+
+    def search(self, query, limit=SEARCH_DEFAULT_LIMIT):
+        """Return (number of matching valuations, ranked hits) for a query."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return 0, []
+
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if any(p is None for p in postings):
+                return 0, []
+            document_count = len(self._documents)
+            average_length = self._total_length / document_count
+            weighted = sorted(
+                ((math.log(1 + (document_count - len(p) + 0.5) / (len(p) + 0.5)), p) for p in postings),
+                key=lambda item: len(item[1])
+            )
+            rarest, rest = weighted[0][1], [p for _, p in weighted[1:]]
+
+            k1, b, lengths = self.K1, self.B, self._lengths
+            scores = []
+            for valuation_id in rarest:
+                if rest and not all(valuation_id in p for p in rest):
+                    continue
+                norm = k1 * (1 - b + b * lengths[valuation_id] / average_length)
+                score = 0.0
+                for idf, p in weighted:
+                    frequency = p[valuation_id]
+                    score += idf * frequency * (k1 + 1) / (frequency + norm)
+                scores.append((score, valuation_id))
+
+            top = heapq.nsmallest(limit, scores, key=lambda item: (-item[0], item[1]))
+            idf_by_term = {term: math.log(1 + (document_count - len(p) + 0.5) / (len(p) + 0.5))
+                           for term, p in zip(terms, postings)}
+            hits = []
+            for score, valuation_id in top:
+                data, fields = self._documents[valuation_id]
+                matches = []
+                for path, text, counts in fields:
+                    field_score = sum(idf * counts[term] * (k1 + 1) / (counts[term] + k1)
+                                      for term, idf in idf_by_term.items() if term in counts)
+                    if field_score:
+                        matches.append((field_score, path, text))
+                matches.sort(key=lambda m: (-m[0], m[1]))
+                hits.append({
+                    'id': valuation_id,
+                    'assetName': data.get('assetOverview', {}).get('assetName', 'Unknown Asset'),
+                    'score': score,
+                    'matches': [{'path': path, 'score': field_score, 'snippet': _snippet(text, idf_by_term)}
+                                for field_score, path, text in matches]
+                })
+        return len(scores), hits
+
+
+# How often the watcher rescans the store while anyone is subscribed
+EVENTS_POLL_INTERVAL = 1.0
+# Comment lines keep idle streams open through proxies and reveal dead clients
+EVENTS_HEARTBEAT_INTERVAL = 15.0
+# A subscriber that can't take an event within this long is dropped
+EVENTS_SEND_TIMEOUT = 5.0
+# ... as is one with more than this many bytes of events it hasn't taken
+EVENTS_MAX_BACKLOG_BYTES = 256 * 1024
+EVENTS_RETRY_MS = 3000
+# Every ChangeFeed, for the subscriber gauge in /api/metrics
+CHANGE_FEEDS = weakref.WeakSet()
+
+
+def format_event(event, data):
+    """Return one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=JSON_SEPARATORS)}\n\n".encode('utf-8')
+
+
+class ChangeFeed:
+    """Pushes valuation created/updated/deleted events to Server-Sent Events subscribers.
+
+    One watcher thread calls the store's refresh() (a single stat pass over
+    the directory, or a version query for SQLite) every poll interval while
+    anyone is subscribed; the store's listener callbacks turn what changed
+    into events. Edits made through the API are pushed on the next tick
+    without waiting for a rescan. Request handlers hand subscriber sockets
+    over with subscribe(), so an open stream does not hold a worker thread.
+
+    Subscriber sockets are non-blocking and multiplexed with selectors. Each
+    has its own backlog of unsent bytes, flushed as the socket drains, so a
+    slow client never holds up the others or the watcher. A subscriber is
+    dropped once its backlog is older than EVENTS_SEND_TIMEOUT or larger
+    than EVENTS_MAX_BACKLOG_BYTES.
+    """
+
+    def __init__(self, poll_interval=EVENTS_POLL_INTERVAL, heartbeat_interval=EVENTS_HEARTBEAT_INTERVAL):
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.index = None
+        self._lock = threading.Lock()
+        self._known = set()  # ids seen so far, to tell created from updated
+        self._pending = []  # encoded events waiting for the watcher
+        self._handed_over = []  # sockets subscribed since the watcher last looked
+        self._close_requests = []  # events set once the watcher has dropped everyone
+        self._subscriber_count = 0
+        self._wake_reader = self._wake_writer = None
+        self._thread = None
+        CHANGE_FEEDS.add(self)
+
+    def attach(self, index):
+        """Watch ``index`` (a ValuationIndex or SqliteValuationStore)."""
+        self.index = index
+        index.add_listener(self._changed)
+
+    def subscribe(self, connection):
+        """Take ownership of a socket whose SSE response headers have been sent."""
+        connection.setblocking(False)
+        with self._lock:
+            self._handed_over.append(connection)
+            self._subscriber_count += 1
+            if self._thread is None:
+                self._wake_reader, self._wake_writer = socket.socketpair()
+                self._wake_reader.setblocking(False)
+                self._wake_writer.setblocking(False)
+                self._thread = threading.Thread(target=self._run, name="biobucks-events", daemon=True)
+                self._thread.start()
+        self._wake()
+
+    def subscriber_count(self):
+        with self._lock:
+            return self._subscriber_count
+
+    def close(self):
+        """Disconnect every subscriber."""
+        done = threading.Event()
+        with self._lock:
+            if self._thread is None:
+                return
+            self._close_requests.append(done)
+        self._wake()
+        done.wait(EVENTS_SEND_TIMEOUT)
+
+    def _wake(self):
+        """Interrupt the watcher's select() so it picks up new work."""
+        try:
+            self._wake_writer.send(b"\0")
+        except OSError:
+            pass  # a full wake-up buffer already has the watcher's attention
+
+    def _changed(self, valuation_id, entry):
+        with self._lock:
+            if entry is None:
+                if valuation_id not in self._known:
+                    return
+                self._known.discard(valuation_id)
+                event, data = 'deleted', {'id': valuation_id}
+            else:
+                event = 'updated' if valuation_id in self._known else 'created'
+                self._known.add(valuation_id)
+                data = {'id': valuation_id, 'summary': entry.summary}
+            if not self._subscriber_count:
+                return
+            self._pending.append(format_event(event, data))
+        self._wake()
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._wake_reader, selectors.EVENT_READ)
+        backlogs = {}  # socket -> [unsent bytes, when the oldest of them was queued]
+        last_poll = last_sent = time.monotonic()
+        while True:
+            for key, mask in selector.select(self.poll_interval if backlogs else None):
+                connection = key.fileobj
+                if connection is self._wake_reader:
+                    try:
+                        while connection.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif mask & selectors.EVENT_READ:
+                    # Clients never send on an event stream, so a readable
+                    # socket means the other end has closed it
+                    self._drop(selector, backlogs, connection)
+                else:
+                    self._flush(selector, backlogs, connection)
+
+            with self._lock:
+                handed_over, self._handed_over = self._handed_over, []
+                close_requests, self._close_requests = self._close_requests, []
+            for connection in handed_over:
+                backlogs[connection] = [bytearray(), None]
+                selector.register(connection, selectors.EVENT_READ)
+            if close_requests:
+                for connection in list(backlogs):
+                    self._drop(selector, backlogs, connection)
+                for done in close_requests:
+                    done.set()
+            if not backlogs:
+                continue
+
+            now = time.monotonic()
+            if now - last_poll >= self.poll_interval:
+                last_poll = now
+                try:
+                    self.index.refresh()
+                except Exception as e:
+                    sys.stderr.write(f"Event watcher refresh failed: {e}\n")
+
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending and now - last_sent >= self.heartbeat_interval:
+                pending = [b": keep-alive\n\n"]
+            if pending:
+                last_sent = now
+                message = b"".join(pending)
+                for connection in list(backlogs):
+                    self._queue(selector, backlogs, connection, message, now)
+            for connection, (unsent, queued_at) in list(backlogs.items()):
+                if unsent and now - queued_at > EVENTS_SEND_TIMEOUT:
+                    self._drop(selector, backlogs, connection)
+
+    def _queue(self, selector, backlogs, connection, message, now):
+        """Append ``message`` to a subscriber's backlog and send what it will take."""
+        backlog = backlogs[connection]
+        if not backlog[0]:
+            backlog[1] = now
+        backlog[0] += message
+        if len(backlog[0]) > EVENTS_MAX_BACKLOG_BYTES:
+            self._drop(selector, backlogs, connection)
+        else:
+            self._flush(selector, backlogs, connection)
+
+    def _flush(self, selector, backlogs, connection):
+        """Send as much of a subscriber's backlog as its socket accepts without blocking."""
+        backlog = backlogs[connection]
+        try:
+            sent = connection.send(backlog[0])
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._drop(selector, backlogs, connection)
+            return
+        if sent:
+            del backlog[0][:sent]
+            backlog[1] = time.monotonic()
+        # Watch for writability only while there is something left to send
+        selector.modify(connection, selectors.EVENT_READ | (selectors.EVENT_WRITE if backlog[0] else 0))
+
+    def _drop(self, selector, backlogs, connection):
+        selector.unregister(connection)
+        del backlogs[connection]
+        with self._lock:
+            self._subscriber_count -= 1
+        self._disconnect(connection)
+
+    @staticmethod
+    def _disconnect(connection):
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.close()
+
+
+def event_metrics():
+    """Expose the number of open /api/events streams to /api/metrics."""
+    return [('biobucks_event_subscribers', 'gauge', 'Open /api/events streams.',
+             [({}, sum(feed.subscriber_count() for feed in list(CHANGE_FEEDS)))])]
+
+
+METRICS.add_collector(event_metrics)
+
+
+def write_json_atomic(path, data):
+    """Write a JSON document so readers only ever see the old or new file.
+
+    The document is written to a temporary file in the same directory,
+    fsynced and renamed over ``path``. Returns the new file's stat.
+    """
+    path = Path(path)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        os.chmod(temp_path, mode)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return path.stat()
+
+
+class CoalescingWriter:
+    """Debounces valuation writes so a burst of edits costs one disk write.
+
+    schedule() records the latest document for a valuation and writes it
+    once no further edit has arrived for ``delay`` seconds (at most
+    ``max_delay`` after the first pending edit). The index already serves
+    the new document in the meantime. Writes go through the index's write()
+    under the valuation's lock.
+    """
+
+    def __init__(self, index, delay=0.25, max_delay=2.0):
+        self.index = index
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending = {}  # id -> [data, first scheduled time, timer]
+        self._lock = threading.Lock()
+
+    def schedule(self, valuation_id, data):
+        """Queue ``data`` as the next on-disk version of a valuation."""
+        with self._lock:
+            pending = self._pending.get(valuation_id)
+            now = time.monotonic()
+            if pending is None:
+                pending = self._pending[valuation_id] = [data, now, None]
+            else:
+                pending[0] = data
+                pending[2].cancel()
+            delay = max(0.0, min(self.delay, pending[1] + self.max_delay - now))
+            timer = threading.Timer(delay, self.flush, args=(valuation_id,))
+            timer.daemon = True
+            pending[2] = timer
+            timer.start()
+
+    def write_now(self, valuation_id, data):
+        """Write a valuation immediately, superseding any pending edit."""
+        with self.index.lock_for(valuation_id):
+            self.cancel(valuation_id)
+            self.index.write(valuation_id, data)
+
+    def cancel(self, valuation_id):
+        """Drop a pending write (e.g. because the valuation was deleted)."""
+        with self._lock:
+            pending = self._pending.pop(valuation_id, None)
+        if pending is not None:
+            pending[2].cancel()
+
+    def flush(self, valuation_id):
+        """Write the pending document for one valuation, if any."""
+        with self.index.lock_for(valuation_id):
+            with self._lock:
+                pending = self._pending.pop(valuation_id, None)
+            if pending is None:
+                return
+            pending[2].cancel()
+            data = pending[0]
+            try:
+                self.index.write(valuation_id, data)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error writing valuation {valuation_id}: {e}")
+
+    def flush_all(self):
+        """Write every pending document now (used at shutdown)."""
+        with self._lock:
+            valuation_ids = list(self._pending)
+        for valuation_id in valuation_ids:
+            self.flush(valuation_id)
+
+
+JOB_STATUSES_FINISHED = ('succeeded', 'failed', 'cancelled', 'timed_out')
+RECALCULATE_BATCH_SIZE = 25
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job task whose job has been cancelled or has timed out."""
+
+
+# Set in each job worker process by _init_job_worker(): the shared array of
+# live job tokens and the queue task starts are reported on
+_job_tokens = None
+_job_starts = None
+# (slot, generation) of the job task running in this worker process
+_job_task = None
+
+
+def _init_job_worker(tokens, starts):
+    global _job_tokens, _job_starts
+    _job_tokens = tokens
+    _job_starts = starts
+
+
+def _run_job_task(token, function, args):
+    """Run one job task in a worker process, reporting its start to JobManager."""
+    global _job_task
+    _job_task = token
+    try:
+        check_cancelled()
+        _job_starts.put(token)
+        return function(*args)
+    finally:
+        _job_task = None
+
+
+def check_cancelled():
+    """Raise JobCancelled if the job task running in this process should stop.
+
+    Long computations call this between chunks of work; outside a job task
+    it does nothing.
+    """
+    if _job_task is not None:
+        slot, generation = _job_task
+        if _job_tokens[slot] != generation:
+            raise JobCancelled()
+
+
+class Job:
+    """A long-running computation split into tasks on the process pool."""
+
+    __slots__ = ('id', 'type', 'status', 'created', 'started', 'finished', 'timeout',
+                 'tasks_total', 'tasks_done', 'futures', 'finalize', 'result', 'error', 'timer', 'token')
+
+    def __init__(self, job_id, job_type, task_count, finalize, timeout):
+        self.id = job_id
+        self.type = job_type
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.timeout = timeout
+        self.tasks_total = task_count
+        self.tasks_done = 0
+        self.futures = []
+        self.finalize = finalize
+        self.result = None
+        self.error = None
+        self.timer = None
+        self.token = None
+
+    def to_dict(self, include_result=True):
+        """Return the job's status document."""
+        data = {
+            'id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'progress': self.tasks_done / self.tasks_total if self.tasks_total else 1.0,
+            'createdAt': _iso_timestamp(self.created),
+            'startedAt': _iso_timestamp(self.started),
+            'finishedAt': _iso_timestamp(self.finished),
+            'timeout': self.timeout
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        if include_result and self.status == 'succeeded':
+            data['result'] = self.result
+        return data
+
+
+def _iso_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class JobManager:
+    """Runs heavy analyses on a ProcessPoolExecutor, off the request threads.
+
+    A job is a list of picklable (function, args) tasks plus a finalize()
+    callback that combines their results in this process. Progress is the
+    fraction of tasks finished. At most ``max_jobs`` jobs may be queued or
+    running at once; further submissions raise JobQueueFull. Each job has a
+    timeout after which it is cancelled, and finished jobs are kept for
+    ``result_ttl`` seconds.
+
+    Cancelling a job (or its timeout) cancels its queued tasks and clears
+    the job's token in shared memory; tasks already running see that at
+    their next check_cancelled() and stop. Workers report each task start
+    on a queue, so a job turns 'running' when its first task starts.
+    """
+
+    def __init__(self, max_workers=None, max_jobs=16, result_ttl=600, default_timeout=300, max_timeout=3600):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.result_ttl = result_ttl
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._context = multiprocessing.get_context('spawn')
+        self._tokens = None  # shared array: job slot -> generation of the job holding it, 0 when free
+        self._slot_jobs = {}
+        self._generation = 0
+        self._starts = None
+        self._start_watcher = None
+
+    def _executor(self):
+        """Return the process pool, (re)creating it on first use or after a crash."""
+        if self._tokens is None:
+            self._tokens = self._context.Array('q', self.max_jobs, lock=False)
+            self._starts = self._context.SimpleQueue()
+            self._start_watcher = threading.Thread(target=self._watch_starts, args=(self._starts,),
+                                                   name="job-start-watcher", daemon=True)
+            self._start_watcher.start()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context,
+                                             initializer=_init_job_worker, initargs=(self._tokens, self._starts))
+        return self._pool
+
+    def submit(self, job_type, tasks, finalize, timeout=None):
+        """Queue a job and return it. Raises JobQueueFull at capacity."""
+        if timeout is None:
+            timeout = self.default_timeout
+        else:
+            timeout = float(timeout)
+            # float() also accepts "nan" and "inf", which min() would let through
+            if not (math.isfinite(timeout) and timeout > 0):
+                raise ValueError("timeout must be a positive number of seconds")
+            timeout = min(timeout, self.max_timeout)
+
+        with self._lock:
+            self._evict_expired()
+            active = sum(1 for job in self._jobs.values() if job.status not in JOB_STATUSES_FINISHED)
+            if active >= self.max_jobs:
+                raise JobQueueFull(f"Job queue is full ({self.max_jobs} active jobs)")
+
+            pool = self._executor()
+            slot = next((i for i in range(len(self._tokens)) if i not in self._slot_jobs), None)
+            if slot is None:
+                raise JobQueueFull(f"Job queue is full ({len(self._tokens)} active jobs)")
+
+            job = Job(uuid.uuid4().hex, job_type, len(tasks), finalize, timeout)
+            self._jobs[job.id] = job
+            self._generation += 1
+            self._tokens[slot] = self._generation
+            self._slot_jobs[slot] = job
+            job.token = (slot, self._generation)
+            try:
+                for function, args in tasks:
+                    future = pool.submit(_run_job_task, job.token, function, args)
+                    job.futures.append(future)
+            except BrokenProcessPool:
+                self._pool = None
+                self._finish(job, 'failed', error="Worker pool crashed; please resubmit")
+                return job
+
+            job.timer = threading.Timer(timeout, self._expire, args=(job.id,))
+            job.timer.daemon = True
+            job.timer.start()
+
+        if not tasks:
+            self._complete(job)
+        for future in list(job.futures):
+            future.add_done_callback(lambda f, job=job: self._task_done(job, f))
+        return job
+
+    def get(self, job_id):
+        """Return a job by id, or None."""
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def list(self):
+        """Return every retained job, newest first."""
+        with self._lock:
+            self._evict_expired()
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns the job, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in JOB_STATUSES_FINISHED:
+                self._finish(job, 'cancelled')
+            return job
+
+    def shutdown(self):
+        """Cancel outstanding work and stop the worker processes."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status not in JOB_STATUSES_FINISHED:
+                    self._finish(job, 'cancelled')
+            pool, self._pool = self._pool, None
+            starts, self._starts, self._tokens = self._starts, None, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if starts is not None:
+            starts.put(None)
+            self._start_watcher.join()
+            starts.close()
+
+    def _watch_starts(self, starts):
+        """Mark jobs running as their worker processes report task starts."""
+        while (token := starts.get()) is not None:
+            slot, generation = token
+            with self._lock:
+                job = self._slot_jobs.get(slot)
+                if job is not None and job.token == token and job.status == 'queued':
+                    job.status = 'running'
+                    job.started = time.time()
+
+    def _task_done(self, job, future):
+        if future.cancelled():
+            return
+        with self._lock:
+            if job.status in JOB_STATUSES_FINISHED:
+                return
+            error = future.exception()
+            if error is not None:
+                if isinstance(error, BrokenProcessPool):
+                    self._pool = None
+                self._finish(job, 'failed', error=str(error) or type(error).__name__)
+                return
+            if job.started is None:
+                # The start report can trail a quick task's result
+                job.status = 'running'
+                job.started = time.time()
+            job.tasks_done += 1
+            complete = job.tasks_done == job.tasks_total
+        if complete:
+            self._complete(job)
+
+    def _complete(self, job):
+        """Combine task results once every task has finished."""
+        try:
+            result = job.finalize([future.result() for future in job.futures])
+        except Exception as e:
+            with self._lock:
+                if job.status not in JOB_STATUSES_FINISHED:
+                    self._finish(job, 'failed', error=str(e))
+            return
+        with self._lock:
+            if job.status not in JOB_STATUSES_FINISHED:
+                job.result = result
+                self._finish(job, 'succeeded')
+
+    def _expire(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in JOB_STATUSES_FINISHED:
+                self._finish(job, 'timed_out', error=f"Job exceeded its {job.timeout:g}s timeout")
+
+    def _finish(self, job, status, error=None):
+        """Mark a job finished and release its remaining work. Caller holds the lock."""
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        job.finalize = None
+        if job.timer is not None:
+            job.timer.cancel()
+        if job.token is not None:
+            # Tells tasks already running in the workers to stop
+            slot, _ = job.token
+            if self._tokens is not None:
+                self._tokens[slot] = 0
+            self._slot_jobs.pop(slot, None)
+        for future in job.futures:
+            future.cancel()
+        if status != 'succeeded':
+            job.futures = []
+
+    def _evict_expired(self):
+        """Drop finished jobs older than the retention TTL. Caller holds the lock."""
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.status in JOB_STATUSES_FINISHED and job.finished < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def recalculate_batch(documents):
+    """Run calculate_dcf() for a batch of (valuation id, document) pairs."""
+    results = []
+    for valuation_id, data in documents:
+        check_cancelled()
+        try:
+            dcf = calculate_dcf(data)
+        except Exception as e:
+            results.append({'id': valuation_id, 'error': str(e)})
+            continue
+        results.append({
+            'id': valuation_id,
+            'npv': dcf['npv'],
+            'cumulativePoS': dcf['cumulativePoS'],
+            'yearsToApproval': dcf['yearsToApproval']
+        })
+    return results
+
+
+def plan_job(request, index):
+    """Turn a job request into (type, tasks, finalize) for JobManager.submit().
+
+    Supported types: ``montecarlo`` and ``sensitivity`` for one valuation
+    (``valuationId`` plus the same parameters as their endpoints), and
+    ``recalculate`` to run calculate_dcf() across every valuation.
+    Raises LookupError for unknown valuations and ValueError for bad input.
+    """
+    job_type = request.get('type')
+    params = request.get('params') or {}
+    if not isinstance(params, dict):
+        raise ValueError("params must be a JSON object")
+
+    def load(valuation_id):
+        entry = index.get(valuation_id) if isinstance(valuation_id, str) else None
+        if entry is None:
+            raise LookupError("Valuation not found")
+        return entry.data
+
+    if job_type == 'montecarlo':
+        data = load(request.get('valuationId'))
+        seed = int(params['seed']) if 'seed' in params else random.randrange(2 ** 32)
+        bins = int(params.get('bins', 50))
+        chunks = monte_carlo_chunks(int(params.get('draws', 10_000)), bins)
+        tasks = [(simulate_npv_chunk, (data, chunk_draws, seed, chunk_index)) for chunk_index, chunk_draws in chunks]
+        deterministic_npv = calculate_dcf(data)['npv']
+
+        def finalize(results):
+            summary = summarize_monte_carlo(results, seed, bins)
+            summary['deterministicNpv'] = deterministic_npv
+            return summary
+        return job_type, tasks, finalize
+
+    if job_type == 'sensitivity':
+        data = load(request.get('valuationId'))
+        grid = params.get('grid')
+        tasks = [(run_sensitivity, (data, params.get('parameters'), grid or None, grid is not False))]
+        return job_type, tasks, lambda results: results[0]
+
+    if job_type == 'recalculate':
+        documents = [(entry.id, entry.data) for entry in index.entries()]
+        tasks = [(recalculate_batch, (documents[i:i + RECALCULATE_BATCH_SIZE],))
+                 for i in range(0, len(documents), RECALCULATE_BATCH_SIZE)]
+
+        def finalize(results):
+            valuations = [item for batch in results for item in batch]
+            return {
+                'valuations': valuations,
+                'totalNpv': math.fsum(item['npv'] for item in valuations if 'npv' in item)
+            }
+        return job_type, tasks, finalize
+
+    raise ValueError(f"Unknown job type: {job_type!r}")
+
+
+JOB_MANAGER = JobManager()
+
+
+PORTFOLIO_BATCH_SIZE = 25
+PORTFOLIO_PARALLEL_THRESHOLD = 8  # fewer changed assets than this are computed in-process
+# The portfolio has its own small process pool so a /api/portfolio request
+# never queues behind background jobs, and waits at most PORTFOLIO_TIMEOUT
+PORTFOLIO_WORKERS = min(4, os.cpu_count() or 1)
+PORTFOLIO_TIMEOUT = 30
+
+
+def portfolio_contribution(valuation_data):
+    """Reduce one valuation's DCF to what the portfolio view aggregates."""
+    dcf = calculate_dcf(valuation_data)
+    return {
+        'npv': dcf['npv'],
+        'cumulativePoS': dcf['cumulativePoS'],
+        'yearsToApproval': dcf['yearsToApproval'],
+        'riskAdjustedFCF': [year['riskAdjustedFCF'] for year in dcf['years']],
+        'presentValue': [year['presentValue'] for year in dcf['years']]
+    }
+
+
+def portfolio_contributions(documents):
+    """portfolio_contribution() for a batch of documents; errors are returned, not raised."""
+    results = []
+    for data in documents:
+        try:
+            results.append(portfolio_contribution(data))
+        except Exception as e:
+            results.append({'error': str(e)})
+    return results
+
+
+def _peak_funding_need(cash_flows):
+    """Return (amount, year) of the deepest cumulative cash deficit, or (0, None)."""
+    cumulative = 0.0
+    peak, peak_year = 0.0, None
+    for year, cash_flow in enumerate(cash_flows):
+        cumulative += cash_flow
+        if -cumulative > peak:
+            peak, peak_year = -cumulative, year
+    return peak, peak_year
+
+
+class PortfolioAggregator:
+    """Portfolio rNPV across every valuation in an index.
+
+    Each asset's DCF reduction is cached against its content hash, so a
+    request only recomputes the files whose content changed since the last
+    one. When enough assets changed, they are computed in batches on the
+    aggregator's own process pool of ``workers`` processes; if the batches
+    take longer than PORTFOLIO_TIMEOUT, TimeoutError is raised.
+    """
+
+    def __init__(self, index, workers=None):
+        self.index = index
+        self.workers = workers or PORTFOLIO_WORKERS
+        self._contributions = {}  # valuation id -> (content hash, contribution)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _map(self, function, arguments):
+        """Run ``function(*args)`` for each args tuple on the pool and return the results in order."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            pool = self._pool
+        futures = [pool.submit(function, *args) for args in arguments]
+        deadline = time.monotonic() + PORTFOLIO_TIMEOUT
+        try:
+            return [future.result(timeout=max(deadline - time.monotonic(), 0)) for future in futures]
+        except BrokenProcessPool:
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """Stop the worker processes (they are started again on demand)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def etag(self, entries):
+        """Return a validator covering the content of every asset in ``entries``."""
+        digest = hashlib.sha256(DCF_MODEL_VERSION.encode('ascii'))
+        for entry in entries:
+            digest.update(f"{entry.id}\0{entry.content_hash}\0".encode('utf-8'))
+        return digest.hexdigest()
+
+    def contributions(self, entries):
+        """Return {valuation id: contribution} for ``entries``, computing only stale ones."""
+        with self._lock:
+            cached = dict(self._contributions)
+
+        results, stale = {}, []
+        for entry in entries:
+            hit = cached.get(entry.id)
+            if hit is not None and hit[0] == entry.content_hash:
+                results[entry.id] = hit[1]
+            else:
+                stale.append(entry)
+
+        if stale:
+            documents = [entry.data for entry in stale]
+            if len(stale) < PORTFOLIO_PARALLEL_THRESHOLD:
+                computed = portfolio_contributions(documents)
+            else:
+                batches = [(documents[i:i + PORTFOLIO_BATCH_SIZE],)
+                           for i in range(0, len(documents), PORTFOLIO_BATCH_SIZE)]
+                computed = [item for batch in self._map(portfolio_contributions, batches) for item in batch]
+            for entry, contribution in zip(stale, computed):
+                results[entry.id] = contribution
+
+        with self._lock:
+            live = {entry.id for entry in entries}
+            for valuation_id in list(self._contributions):
+                if valuation_id not in live:
+                    del self._contributions[valuation_id]
+            for entry in stale:
+                self._contributions[entry.id] = (entry.content_hash, results[entry.id])
+        return results
+
+    def summary(self, entries=None):
+        """Return total rNPV, the aggregated cash-flow curve and per-asset contributions."""
+        if entries is None:
+            entries = self.index.entries()
+        contributions = self.contributions(entries)
+
+        horizon = max((len(c.get('riskAdjustedFCF', ())) for c in contributions.values()), default=0)
+        risk_adjusted = [0.0] * horizon
+        present_value = [0.0] * horizon
+        total = 0.0
+        assets, errors = [], []
+        for entry in entries:
+            contribution = contributions[entry.id]
+            if 'error' in contribution:
+                errors.append({'id': entry.id, 'error': contribution['error']})
+                continue
+            for year, value in enumerate(contribution['riskAdjustedFCF']):
+                risk_adjusted[year] += value
+            for year, value in enumerate(contribution['presentValue']):
+                present_value[year] += value
+            total += contribution['npv']
+            funding, funding_year = _peak_funding_need(contribution['riskAdjustedFCF'])
+            assets.append({
+                'id': entry.id,
+                'assetName': entry.summary['assetName'],
+                'therapeuticArea': entry.summary['therapeuticArea'],
+                'npv': contribution['npv'],
+                'cumulativePoS': contribution['cumulativePoS'],
+                'yearsToApproval': contribution['yearsToApproval'],
+                'peakFundingNeed': funding,
+                'peakFundingYear': funding_year
+            })
+
+        for asset in assets:
+            asset['shareOfTotal'] = asset['npv'] / total if total else None
+        assets.sort(key=lambda asset: asset['npv'], reverse=True)
+
+        years = []
+        cumulative = 0.0
+        for year in range(horizon):
+            cumulative += risk_adjusted[year]
+            years.append({
+                'year': year,
+                'riskAdjustedFCF': risk_adjusted[year],
+                'presentValue': present_value[year],
+                'cumulativeRiskAdjustedFCF': cumulative
+            })
+        funding, funding_year = _peak_funding_need(risk_adjusted)
+
+        return {
+            'assetCount': len(assets),
+            'totalNpv': total,
+            'peakFundingNeed': funding,
+            'peakFundingYear': funding_year,
+            'years': years,
+            'assets': assets,
+            'errors': errors
+        }
+
+
+class ValuationBackend:
+    """A valuation store and the services built on it, as served by one server.
+
+    Bundles the store (a ValuationIndex or SqliteValuationStore) with its
+    write coalescer, search index, change feed and portfolio aggregator.
+    Servers carry one as ``server.backend``; handlers without one use
+    DEFAULT_BACKEND, the valuations/ directory.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.writer = CoalescingWriter(store)
+        self.search = SearchIndex()
+        store.add_listener(self.search.update)
+        self.events = ChangeFeed()
+        self.events.attach(store)
+        self.portfolio = PortfolioAggregator(store)
+
+    def close(self):
+        """Disconnect event subscribers, write out coalesced edits and stop the portfolio workers."""
+        self.events.close()
+        self.writer.flush_all()
+        self.portfolio.close()
+
+
+DEFAULT_BACKEND = ValuationBackend(VALUATION_INDEX)
+
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_SUMMARY_FIELDS = ('id', 'assetName', 'therapeuticArea', 'developmentStage')
+EXPORT_YEAR_FIELDS = ('year', 'label', 'stage', 'developmentCosts', 'revenue', 'cogs', 'opex', 'ebit', 'tax',
+                      'fcf', 'riskAdjustedFCF', 'riskPhase', 'discountFactor', 'presentValue')
+EXPORT_CSV_COLUMNS = EXPORT_SUMMARY_FIELDS + ('modified', 'npv') + EXPORT_YEAR_FIELDS
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+# Rows are buffered into chunks of about this size before being written
+EXPORT_CHUNK_BYTES = 64 * 1024
+# A file renamed into place keeps the mtime of its write, and a SQLite row
+# is stamped before its transaction commits, so the newest changes may not
+# be visible yet. Exports stop this far behind the clock and the next pull
+# starts from there.
+EXPORT_SETTLE_NS = 2_000_000_000
+
+
+def parse_export_since(value):
+    """Return a ?since= cursor as epoch nanoseconds. Raises ValueError.
+
+    Accepts the X-Next-Since value of a previous export or an ISO 8601
+    timestamp (UTC unless it carries an offset).
+    """
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("since must be an X-Next-Since cursor or an ISO 8601 timestamp")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()) * 1_000_000_000 + moment.microsecond * 1000
+
+
+def export_results(index, since, until, area=None, stage=None):
+    """Yield (entry, DCF result or None, error or None) for each exported valuation, one at a time."""
+    for entry in index.modified_between(since, until):
+        summary = entry.summary
+        if area is not None and not area_matches(summary['therapeuticArea'], area):
+            continue
+        if stage is not None and not stage_matches(summary['developmentStage'], stage):
+            continue
+        try:
+            with METRICS.timed('calculate_dcf'):
+                dcf = calculate_dcf(entry.data)
+        except Exception as e:
+            yield entry, None, str(e)
+        else:
+            yield entry, dcf, None
+
+
+def _export_modified(entry):
+    return datetime.fromtimestamp(entry.mtime_ns / 1e9, timezone.utc).isoformat()
+
+
+def export_ndjson(results):
+    """Yield one JSON line per valuation: its summary, modification time and DCF."""
+    for entry, dcf, error in results:
+        record = {field: entry.summary[field] for field in EXPORT_SUMMARY_FIELDS}
+        record['modified'] = _export_modified(entry)
+        if error is not None:
+            record['error'] = error
+        else:
+            record.update(dcf)
+        yield encode_json(record) + b'\n'
+
+
+def export_csv(results):
+    """Yield a header line, then one CSV row per projection year of each valuation.
+
+    Valuations whose DCF fails have no rows; NDJSON exports report the error.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    yield flush()
+    for entry, dcf, error in results:
+        if error is not None:
+            continue
+        prefix = [entry.summary[field] for field in EXPORT_SUMMARY_FIELDS] + [_export_modified(entry), dcf['npv']]
+        writer.writerows(prefix + [year.get(field, '') for field in EXPORT_YEAR_FIELDS] for year in dcf['years'])
+        yield flush()
+
+
+STATIC_DIR = Path(__file__).parent
+# URL path -> (file, content type, Cache-Control). The URLs aren't
+# fingerprinted, so pages and styles are revalidated on every load
+STATIC_ASSETS = {
+    '/': ('index.html', 'text/html; charset=utf-8', 'no-cache'),
+    '/index.html': ('index.html', 'text/html; charset=utf-8', 'no-cache'),
+    '/styles.css': ('styles.css', 'text/css; charset=utf-8', 'no-cache'),
+    '/favicon.ico': ('favicon.ico', 'image/x-icon', 'public, max-age=86400'),
+    '/favicon.png': ('favicon.png', 'image/png', 'public, max-age=86400'),
+}
+# Files are stat()ed at most this often to notice edits
+STATIC_CHECK_INTERVAL = 1.0
+
+
+class StaticAsset:
+    """One file held in memory with its validators and compressed variants."""
+
+    __slots__ = ('mtime_ns', 'size', 'checked_at', 'etag', 'last_modified', 'modified_at', 'bodies')
+
+    def __init__(self, body, mtime_ns, size):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = time.monotonic()
+        self.etag = hashlib.sha256(body).hexdigest()
+        self.modified_at = mtime_ns // 1_000_000_000  # HTTP dates have whole seconds
+        self.last_modified = email.utils.formatdate(self.modified_at, usegmt=True)
+        self.bodies = {None: body}
+        for encoding in CONTENT_ENCODINGS:
+            compressed = compress_body(body, encoding)
+            if len(compressed) < len(body):
+                self.bodies[encoding] = compressed
+
+
+class StaticAssetCache:
+    """Serves the viewer's static files from memory.
+
+    Each file is read once, with its gzip and deflate variants and ETag
+    computed up front, and re-read only when its mtime or size changes.
+    """
+
+    def __init__(self, directory, check_interval=STATIC_CHECK_INTERVAL):
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._assets = {}  # file name -> StaticAsset
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the StaticAsset for a file, or None if it doesn't exist."""
+        with self._lock:
+            asset = self._assets.get(name)
+        now = time.monotonic()
+        if asset is not None and now - asset.checked_at < self.check_interval:
+            return asset
+
+        path = self.directory / name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                self._assets.pop(name, None)
+            return None
+        if asset is not None and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+            asset.checked_at = now
+            return asset
+
+        asset = StaticAsset(path.read_bytes(), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self._assets[name] = asset
+        return asset
+
+
+STATIC_CACHE = StaticAssetCache(STATIC_DIR)
+
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP server that handles connections on a bounded pool of worker threads.
+
+    Each accepted connection is served by one worker for its lifetime, so
+    HTTP/1.1 keep-alive connections are reused without spawning a thread
+    per request. Idle connections are closed after the handler's timeout, or
+    straight away when every worker is taken and a new connection is
+    waiting. At most ``queue_limit`` connections wait for a worker; beyond
+    that new connections get a 503 and are closed instead of queueing
+    without bound. server_close() stops accepting work, wakes connections
+    idling between requests and waits for in-flight requests to finish.
+    ``backend`` is the ValuationBackend to serve (DEFAULT_BACKEND if None).
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    BUSY_RESPONSE_BODY = b'{"error":"Server busy, retry shortly"}'
+    BUSY_RESPONSE = (
+        b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: " + str(len(BUSY_RESPONSE_BODY)).encode() + b"\r\n"
+        b"Retry-After: 1\r\n"
+        b"Connection: close\r\n\r\n" + BUSY_RESPONSE_BODY
+    )
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, queue_limit=DEFAULT_QUEUE_LIMIT,
+                 backend=None):
+        self.backend = backend
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.rejected_connections = 0
+        self.draining = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="biobucks-worker")
+        self._idle_connections = set()
+        self._detached_connections = set()
+        self._active_connections = 0
+        self._waiting_connections = 0
+        self._connections_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        """Hand the connection to a worker instead of serving it inline."""
+        with self._connections_lock:
+            rejected = self._waiting_connections >= self.queue_limit
+            if rejected:
+                self.rejected_connections += 1
+            else:
+                self._waiting_connections += 1
+            saturated = self._active_connections >= self.workers
+            idle = self._idle_connections.pop() if saturated and self._idle_connections else None
+        if rejected:
+            self._reject(request)
+            return
+        if idle is not None:
+            # Free a worker held by an idle keep-alive connection
+            self._wake(idle)
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        with self._connections_lock:
+            self._waiting_connections -= 1
+            self._active_connections += 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._idle_connections.discard(request)
+                self._active_connections -= 1
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        """Answer a connection the queue has no room for with a 503 and close it."""
+        try:
+            # Never block the accept loop on a slow client
+            request.setblocking(False)
+            request.send(self.BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
 
-    # Approval overlap
-    if approval_duration > 0 and year_start < approval_end and year_end > phase_iii_end:
-        overlap = min(year_end, approval_end) - max(year_start, phase_iii_end)
-        if overlap > 0:
-            fractions.append(('Approval Process', 'approval', overlap))
+    def mark_idle(self, connection):
+        """Record that a connection is waiting for its next request."""
+        with self._connections_lock:
+            # Only give up the worker if a queued connection can't get one otherwise
+            release = self.draining or (self._waiting_connections > 0 and
+                                        self._active_connections >= self.workers)
+            if not release:
+                self._idle_connections.add(connection)
+        if release:
+            self._wake(connection)
 
-    return fractions
+    def mark_busy(self, connection):
+        """Record that a connection is serving a request (or has finished)."""
+        with self._connections_lock:
+            self._idle_connections.discard(connection)
 
+    def detach(self, connection):
+        """Hand a connection over to someone else; it stays open when its handler returns."""
+        with self._connections_lock:
+            self._detached_connections.add(connection)
 
-def calculate_dcf(valuation_data):
-    """Calculate DCF projections for a biotech asset."""
-    params = valuation_data
-
-    # Parse market parameters
-    tam = get_param_value(params.get('marketParameters', {}).get('totalAddressableMarket', {}))
-    peak_share = get_param_value(params.get('marketParameters', {}).get('peakMarketShare', {})) / 100
-    years_to_peak = get_param_value(params.get('marketParameters', {}).get('yearsToPeakAdoption', {}))
-    pricing = get_param_value(params.get('marketParameters', {}).get('annualPricing', {}))
-    loe = get_param_value(params.get('marketParameters', {}).get('lossOfExclusivity', {}))
-    years_to_decline = get_param_value(params.get('marketParameters', {}).get('yearsToDeclinePostLOE', {}))
-    terminal_share = get_param_value(params.get('marketParameters', {}).get('terminalMarketShare', {})) / 100
-
-    # Get current development stage
-    current_stage = params.get('assetOverview', {}).get('currentDevelopmentStage') or params.get('assetOverview', {}).get('currentDevelopmentPhase', 'Phase I Ready')
-    current_stage_lower = current_stage.lower()
-
-    # Map current stage to numeric value
-    stage_map = {
-        'preclinical ready': 0, 'preclinical': 0, 'discovery': 0,
-        'phase i ready': 1, 'phase i': 1, 'phase 1 ready': 1, 'phase 1': 1,
-        'phase ii ready': 2, 'phase ii': 2, 'phase 2 ready': 2, 'phase 2': 2,
-        'phase iii ready': 3, 'phase iii': 3, 'phase 3 ready': 3, 'phase 3': 3,
-        'registration ready': 4, 'approval': 4,
-        'approved': 5
-    }
-    current_stage_value = stage_map.get(current_stage_lower) 
-
-    # Parse development timeline - get individual phase durations
-    dev_timeline = params.get('developmentTimeline', {})
-
-    # Get durations for current and future phases only
-    phase_i_duration = get_param_value(dev_timeline.get('phaseIDuration', {}), 0) if current_stage_value <= 1 else 0
-    phase_ii_duration = get_param_value(dev_timeline.get('phaseIIDuration', {}), 0) if current_stage_value <= 2 else 0
-    phase_iii_duration = get_param_value(dev_timeline.get('phaseIIIDuration', {}), 0) if current_stage_value <= 3 else 0
-    approval_duration = get_param_value(dev_timeline.get('approvalDuration', {}), 0) if current_stage_value <= 4 else 0
-
-    # Calculate cumulative phase end times
-    years_to_approval = phase_i_duration + phase_ii_duration + phase_iii_duration + approval_duration
-    phase_i_end = phase_i_duration
-    phase_ii_end = phase_i_end + phase_ii_duration
-    phase_iii_end = phase_ii_end + phase_iii_duration
-    approval_end = phase_iii_end + approval_duration
-
-    # Parse clinical trial costs (in millions) - only for current and future phases
-    costs = {
-        'phaseI': get_param_value(params.get('clinicalTrialCosts', {}).get('phaseI', {}), 0) * 1_000_000 if current_stage_value <= 1 else 0,
-        'phaseII': get_param_value(params.get('clinicalTrialCosts', {}).get('phaseII', {}), 0) * 1_000_000 if current_stage_value <= 2 else 0,
-        'phaseIII': get_param_value(params.get('clinicalTrialCosts', {}).get('phaseIII', {}), 0) * 1_000_000 if current_stage_value <= 3 else 0,
-        'approval': get_param_value(params.get('clinicalTrialCosts', {}).get('approval', {}), 0) * 1_000_000 if current_stage_value <= 4 else 0
-    }
+    def shutdown_request(self, request):
+        with self._connections_lock:
+            if request in self._detached_connections:
+                self._detached_connections.discard(request)
+                return
+        super().shutdown_request(request)
 
-    # Calculate annual costs for each phase (distribute over phase duration)
-    annual_costs = {
-        'phaseI': costs['phaseI'] / phase_i_duration if phase_i_duration > 0 else 0,
-        'phaseII': costs['phaseII'] / phase_ii_duration if phase_ii_duration > 0 else 0,
-        'phaseIII': costs['phaseIII'] / phase_iii_duration if phase_iii_duration > 0 else 0,
-        'approval': costs['approval'] / approval_duration if approval_duration > 0 else 0
-    }
+    def server_close(self):
+        """Stop accepting connections and drain in-flight requests."""
+        self.draining = True
+        super().server_close()
+        with self._connections_lock:
+            idle = list(self._idle_connections)
+        for connection in idle:
+            self._wake(connection)
+        self._pool.shutdown(wait=True)
 
-    # Parse probability of success - only for current and future phases
-    # Cap each phase at 100% to prevent invalid inputs
-    pos = {
-        'phaseI': min(get_param_value(params.get('probabilityOfSuccess', {}).get('phaseI', {}), 100) / 100, 1.0) if current_stage_value <= 1 else 1.0,
-        'phaseII': min(get_param_value(params.get('probabilityOfSuccess', {}).get('phaseII', {}), 100) / 100, 1.0) if current_stage_value <= 2 else 1.0,
-        'phaseIII': min(get_param_value(params.get('probabilityOfSuccess', {}).get('phaseIII', {}), 100) / 100, 1.0) if current_stage_value <= 3 else 1.0,
-        'approval': min(get_param_value(params.get('probabilityOfSuccess', {}).get('approval', {}), 100) / 100, 1.0) if current_stage_value <= 4 else 1.0
-    }
-    cumulative_pos = pos['phaseI'] * pos['phaseII'] * pos['phaseIII'] * pos['approval']
+    @staticmethod
+    def _wake(connection):
+        """Unblock a worker waiting on an idle keep-alive connection."""
+        try:
+            connection.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
 
-    # Parse financial parameters
-    cogs = get_param_value(params.get('financialParameters', {}).get('costOfGoodsSold', {}), 0) / 100
-    opex = get_param_value(params.get('financialParameters', {}).get('operatingExpenses', {}), 0) / 100
-    tax_rate = get_param_value(params.get('financialParameters', {}).get('taxRate', {}), 0) / 100
-    wacc = get_param_value(params.get('financialParameters', {}).get('discountRate', {}), 10) / 100
 
-    # Build year-by-year projections
-    projection_years = math.ceil(years_to_approval + loe + years_to_decline)
-    years = []
+class CountingWriter:
+    """Wrap a handler's wfile, counting the bytes written through it."""
 
-    for year in range(projection_years + 1):
-        year_data = {
-            'year': year,
-            'label': 'Current year' if year == 0 else f'Year {year}'
-        }
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
 
-        # Determine stage and costs for this year
-        if year < years_to_approval:
-            # Development phases - calculate partial year cost allocation
-            phase_fractions = calculate_phase_fractions(
-                year, phase_i_duration, phase_i_end, phase_ii_duration, phase_ii_end,
-                phase_iii_duration, phase_iii_end, approval_duration, approval_end
-            )
+    def write(self, data):
+        written = self.raw.write(data)
+        self.bytes_written += len(data)
+        return written
 
-            total_dev_cost = sum(annual_costs[key] * frac for _, key, frac in phase_fractions)
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
 
-            # Determine primary stage (phase with largest fraction)
-            if phase_fractions:
-                year_data['stage'] = max(phase_fractions, key=lambda x: x[2])[0]
-            else:
-                year_data['stage'] = current_stage
-
-            year_data['developmentCosts'] = total_dev_cost
-            year_data['revenue'] = 0
-            year_data['cogs'] = 0
-            year_data['opex'] = 0
-            year_data['ebit'] = -year_data['developmentCosts']
-            year_data['tax'] = 0
-            year_data['fcf'] = -year_data['developmentCosts']
-        else:
-            # Commercial phase
-            years_from_approval = year - years_to_approval
-
-            # Combine launch with first year of market ramp
-            if years_from_approval < years_to_peak:
-                year_data['stage'] = 'Market Ramp'
-            elif years_from_approval < loe:
-                year_data['stage'] = 'Peak Sales'
-            elif years_from_approval < loe + years_to_decline:
-                year_data['stage'] = 'Post-LOE Decline'
-            else:
-                year_data['stage'] = 'Generic Competition'
-
-            # Market share calculation - start ramping from year 0 (launch year)
-            if years_from_approval < years_to_peak:
-                # Linear ramp from year 0 to peak
-                market_share = peak_share * ((years_from_approval + 1) / years_to_peak) if years_to_peak > 0 else peak_share
-            elif years_from_approval <= loe:
-                market_share = peak_share
-            elif years_from_approval <= loe + years_to_decline:
-                years_into_decline = years_from_approval - loe
-                decline_progress = years_into_decline / years_to_decline if years_to_decline > 0 else 1
-                market_share = peak_share * (1 - (1 - terminal_share) * decline_progress)
-            else:
-                market_share = peak_share * terminal_share
-
-            year_data['developmentCosts'] = 0
-            year_data['revenue'] = tam * market_share * pricing
-            year_data['cogs'] = year_data['revenue'] * cogs
-            year_data['opex'] = year_data['revenue'] * opex
-            year_data['ebit'] = year_data['revenue'] - year_data['cogs'] - year_data['opex']
-            year_data['tax'] = year_data['ebit'] * tax_rate if year_data['ebit'] > 0 else 0
-            year_data['fcf'] = year_data['ebit'] - year_data['tax']
-
-        # Phase-specific risk adjustment
-        # Each phase's costs are only incurred if prior phases succeed
-        # Commercial revenues require all phases to succeed
-        if year < years_to_approval:
-            # Apply cumulative prior-phase success probability to each phase's costs
-            prior_risk = {
-                'phaseI': 1.0,
-                'phaseII': pos['phaseI'],
-                'phaseIII': pos['phaseI'] * pos['phaseII'],
-                'approval': pos['phaseI'] * pos['phaseII'] * pos['phaseIII']
-            }
 
-            risk_adjusted_cost = sum(
-                annual_costs[key] * frac * prior_risk[key]
-                for _, key, frac in phase_fractions
-            )
+class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
+    """Custom handler for BioBucks API endpoints and static files."""
 
-            year_data['riskAdjustedFCF'] = -risk_adjusted_cost
-
-            # Set risk phase description based on primary phase
-            if year < phase_i_end:
-                year_data['riskPhase'] = 'Phase I (no prior risk)'
-            elif year < phase_ii_end:
-                year_data['riskPhase'] = 'Phase II (Phase I PoS applied)'
-            elif year < phase_iii_end:
-                year_data['riskPhase'] = 'Phase III (Phase I × II PoS applied)'
-            elif year < approval_end:
-                year_data['riskPhase'] = 'Approval (Phase I × II × III PoS applied)'
-            else:
-                year_data['riskPhase'] = 'Development (full PoS)'
-        else:
-            # Commercial phase - revenues only occur if all phases succeed
-            year_data['riskAdjustedFCF'] = year_data['fcf'] * cumulative_pos
-            year_data['riskPhase'] = 'Commercial (full cumulative PoS)'
+    # Persistent connections; every response must carry a Content-Length
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body are written separately; without TCP_NODELAY the body
+    # waits on the client's delayed ACK (~40ms) on reused connections
+    disable_nagle_algorithm = True
 
-        # Discount to present value
-        year_data['discountFactor'] = (1 + wacc) ** (-year)
-        year_data['presentValue'] = year_data['riskAdjustedFCF'] * year_data['discountFactor']
+    requests_served = 0
+    request_started = None
 
-        years.append(year_data)
+    @property
+    def backend(self):
+        """The ValuationBackend of the server this request arrived on."""
+        return getattr(self.server, 'backend', None) or DEFAULT_BACKEND
 
-    # Calculate NPV
-    npv = sum(y['presentValue'] for y in years)
+    def setup(self):
+        """Count the bytes written to the client for /api/metrics."""
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
 
-    return {
-        'years': years,
-        'npv': npv,
-        'cumulativePoS': cumulative_pos,
-        'wacc': wacc,
-        'yearsToApproval': years_to_approval
-    }
+    def handle_one_request(self):
+        """Track keep-alive connections idling between requests so they can be released."""
+        mark_idle = getattr(self.server, 'mark_idle', None)
+        if mark_idle is not None and self.requests_served:
+            mark_idle(self.connection)
+        self.request_started = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.request_started is not None:
+                METRICS.request_finished(self.command or '-', self.path or '', self.response_status,
+                                         time.perf_counter() - self.request_started,
+                                         self.wfile.bytes_written - self.request_bytes_start)
+        self.requests_served += 1
 
+    def parse_request(self):
+        """Mark the connection busy once a request line has arrived."""
+        mark_busy = getattr(self.server, 'mark_busy', None)
+        if mark_busy is not None:
+            mark_busy(self.connection)
+        self.request_started = time.perf_counter()
+        self.request_bytes_start = self.wfile.bytes_written
+        self.response_status = None
+        METRICS.request_started()
+        self.body_consumed = False
+        ok = super().parse_request()
+        if ok and getattr(self.server, 'draining', False):
+            self.close_connection = True
+        return ok
 
-class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
-    """Custom handler for BioBucks API endpoints and static files."""
+    def send_response(self, code, message=None):
+        """Remember the status code for /api/metrics."""
+        self.response_status = code
+        super().send_response(code, message)
 
     def do_GET(self):
         """Handle GET requests."""
@@ -284,31 +3975,96 @@ class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
 
         # API endpoint: List all valuations
         if parsed_path.path == "/api/valuations":
-            self.handle_list_valuations()
+            self.handle_list_valuations(parse_qs(parsed_path.query))
+
+        # API endpoint: DCF result cache counters
+        elif parsed_path.path == "/api/cache/stats":
+            self.send_json_response({"dcf": DCF_CACHE.stats()})
+
+        # API endpoint: Request and compute metrics in Prometheus text format
+        elif parsed_path.path == "/api/metrics":
+            self.handle_metrics()
+
+        # API endpoint: Portfolio rNPV across all valuations
+        elif parsed_path.path == "/api/portfolio":
+            self.handle_portfolio()
+
+        # API endpoint: Streaming NDJSON/CSV export of every valuation's DCF
+        elif parsed_path.path == "/api/export":
+            self.handle_export(parse_qs(parsed_path.query))
+
+        # API endpoint: Server-Sent Events for valuations created, updated or deleted
+        elif parsed_path.path == "/api/events":
+            self.handle_events()
+
+        # API endpoint: Full-text search over sources, explanations and overview
+        elif parsed_path.path == "/api/search":
+            self.handle_search(parse_qs(parsed_path.query))
+
+        # API endpoint: Background job status
+        elif parsed_path.path == "/api/jobs":
+            self.send_json_response([job.to_dict(include_result=False) for job in JOB_MANAGER.list()])
+
+        elif parsed_path.path.startswith("/api/jobs/"):
+            job_id = parsed_path.path.split("/")[-1]
+            self.handle_get_job(job_id)
 
         # API endpoint: Get specific valuation
         elif parsed_path.path.startswith("/api/valuations/") and "/dcf" in parsed_path.path:
             valuation_id = parsed_path.path.split("/")[-2]
-            self.handle_calculate_dcf(valuation_id)
+            self.handle_calculate_dcf(valuation_id, parse_qs(parsed_path.query))
+
+        # API endpoint: Monte Carlo rNPV simulation
+        elif parsed_path.path.startswith("/api/valuations/") and parsed_path.path.endswith("/montecarlo"):
+            valuation_id = parsed_path.path.split("/")[-2]
+            self.handle_monte_carlo(valuation_id, parse_qs(parsed_path.query))
 
         # API endpoint: Get specific valuation
         elif parsed_path.path.startswith("/api/valuations/"):
             valuation_id = parsed_path.path.split("/")[-1]
             self.handle_get_valuation(valuation_id)
 
-        # Serve static HTML file
-        elif parsed_path.path == "/" or parsed_path.path == "/index.html":
-            self.serve_index()
-
-        # Ignore favicon.ico requests silently
-        elif parsed_path.path == "/favicon.ico":
-            self.send_response(404)
-            self.end_headers()
+        # Serve the viewer's page, styles and icons from memory
+        elif parsed_path.path in STATIC_ASSETS:
+            self.serve_static(parsed_path.path)
 
         # Default behavior for other files
         else:
             super().do_GET()
 
+    def do_HEAD(self):
+        """Handle HEAD requests."""
+        parsed_path = urlparse(self.path)
+        if parsed_path.path in STATIC_ASSETS:
+            self.serve_static(parsed_path.path, include_body=False)
+        else:
+            super().do_HEAD()
+
+    def do_POST(self):
+        """Handle POST requests."""
+        parsed_path = urlparse(self.path)
+
+        # API endpoint: What-if DCF with parameter overrides (nothing is saved)
+        if parsed_path.path.startswith("/api/valuations/") and parsed_path.path.endswith("/dcf"):
+            valuation_id = parsed_path.path.split("/")[-2]
+            self.handle_calculate_dcf_overrides(valuation_id, parse_qs(parsed_path.query))
+
+        # API endpoint: Tornado and two-way sensitivity analysis
+        elif parsed_path.path.startswith("/api/valuations/") and parsed_path.path.endswith("/sensitivity"):
+            valuation_id = parsed_path.path.split("/")[-2]
+            self.handle_sensitivity(valuation_id)
+
+        # API endpoint: Goal-seek parameters to a target NPV (or other metric)
+        elif parsed_path.path.startswith("/api/valuations/") and parsed_path.path.endswith("/solve"):
+            valuation_id = parsed_path.path.split("/")[-2]
+            self.handle_solve(valuation_id)
+
+        # API endpoint: Submit a background job
+        elif parsed_path.path == "/api/jobs":
+            self.handle_submit_job()
+        else:
+            self.send_error_response(404, "Not found")
+
     def do_PUT(self):
         """Handle PUT requests."""
         parsed_path = urlparse(self.path)
@@ -320,6 +4076,17 @@ class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
         else:
             self.send_error_response(404, "Not found")
 
+    def do_PATCH(self):
+        """Handle PATCH requests."""
+        parsed_path = urlparse(self.path)
+
+        # API endpoint: Partial update via JSON Patch
+        if parsed_path.path.startswith("/api/valuations/"):
+            valuation_id = parsed_path.path.split("/")[-1]
+            self.handle_patch_valuation(valuation_id, parse_qs(parsed_path.query))
+        else:
+            self.send_error_response(404, "Not found")
+
     def do_DELETE(self):
         """Handle DELETE requests."""
         parsed_path = urlparse(self.path)
@@ -328,35 +4095,200 @@ class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
         if parsed_path.path.startswith("/api/valuations/"):
             valuation_id = parsed_path.path.split("/")[-1]
             self.handle_delete_valuation(valuation_id)
+
+        # API endpoint: Cancel a background job
+        elif parsed_path.path.startswith("/api/jobs/"):
+            job_id = parsed_path.path.split("/")[-1]
+            self.handle_cancel_job(job_id)
         else:
             self.send_error_response(404, "Not found")
 
-    def handle_list_valuations(self):
-        """Return list of all valuation JSON files."""
+    def handle_list_valuations(self, query):
+        """Return the valuation summaries, optionally filtered, sorted and paginated.
+
+        Supports ?area=, ?stage=, ?sort=[-]field and ?limit= with ?cursor=;
+        the cursor for the next page is returned in the X-Next-Cursor header.
+        """
         try:
-            # Ensure valuations directory exists
-            VALUATIONS_DIR.mkdir(exist_ok=True)
+            try:
+                limit = int(query['limit'][0]) if 'limit' in query else None
+                if limit is not None and not 1 <= limit <= MAX_VALUATION_PAGE_SIZE:
+                    raise ValueError(f"limit must be between 1 and {MAX_VALUATION_PAGE_SIZE}")
+                valuations, next_cursor = self.backend.store.query(
+                    area=query.get('area', [None])[0],
+                    stage=query.get('stage', [None])[0],
+                    sort=query.get('sort', [DEFAULT_VALUATION_SORT])[0],
+                    limit=limit,
+                    cursor=query.get('cursor', [None])[0]
+                )
+            except ValueError as e:
+                self.send_error_response(400, str(e))
+                return
 
-            valuations = []
-            for json_file in VALUATIONS_DIR.glob("*.json"):
-                try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        valuations.append({
-                            "id": json_file.stem,  # filename without extension
-                            "filename": json_file.name,
-                            "assetName": data.get("assetOverview", {}).get("assetName", "Unknown Asset"),
-                            "therapeuticArea": data.get("assetOverview", {}).get("therapeuticArea", ""),
-                            "generatedDate": data.get("metadata", {}).get("generatedDate", "")
-                        })
-                except (json.JSONDecodeError, KeyError) as e:
-                    print(f"Error reading {json_file}: {e}")
-                    continue
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+            self.send_json_response(valuations, headers=headers)
 
-            # Sort by generated date (newest first)
-            valuations.sort(key=lambda x: x.get("generatedDate", ""), reverse=True)
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_metrics(self):
+        """Return request and compute metrics in the Prometheus text format."""
+        body = METRICS.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_portfolio(self):
+        """Return the aggregated rNPV of every valuation."""
+        try:
+            entries = self.backend.store.entries()
+            etag = self.backend.portfolio.etag(entries)
+            if self.etag_matches(etag):
+                self.send_not_modified(etag)
+                return
+
+            try:
+                summary = self.backend.portfolio.summary(entries)
+            except TimeoutError:
+                self.send_error_response(503, "Portfolio is still being calculated; please retry",
+                                         headers={"Retry-After": "5"})
+                return
+            self.send_json_response(summary, etag=etag)
+
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_export(self, query):
+        """Stream year-by-year DCF results as NDJSON (default) or CSV.
+
+        Supports ?format=, ?area=, ?stage= and ?since= (only valuations
+        modified after the cursor); the cursor for the next incremental pull
+        is returned in the X-Next-Since header. Valuations are read and
+        calculated one at a time and sent with chunked transfer encoding.
+        """
+        export_format = query.get('format', ['ndjson'])[0]
+        if export_format not in EXPORT_FORMATS:
+            self.send_error_response(400, f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+            return
+        try:
+            since = parse_export_since(query['since'][0]) if 'since' in query else 0
+        except ValueError as e:
+            self.send_error_response(400, str(e))
+            return
+        until = max(since, time.time_ns() - EXPORT_SETTLE_NS)
+
+        results = export_results(self.backend.store, since, until,
+                                 area=query.get('area', [None])[0], stage=query.get('stage', [None])[0])
+        lines = export_ndjson(results) if export_format == 'ndjson' else export_csv(results)
+        try:
+            # Surface errors reading the store before committing to a 200;
+            # for CSV that means reading past the header to the first rows
+            primed = list(itertools.islice(lines, 2 if export_format == 'csv' else 1))
+        except Exception as e:
+            self.send_error_response(500, str(e))
+            return
+
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(200)
+        self.send_header("Content-type", EXPORT_CONTENT_TYPES[export_format])
+        self.send_header("Content-Disposition", f'attachment; filename="biobucks-export.{export_format}"')
+        self.send_header("X-Next-Since", str(until))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            # HTTP/1.0 has no chunked encoding; the end of the body is the close
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+
+        try:
+            self.write_stream(itertools.chain(primed, lines), chunked, encoding)
+        except Exception as e:
+            # Headers are gone; dropping the connection without the final
+            # chunk tells the client the export is incomplete
+            self.log_error("Export aborted: %s", e)
+            self.close_connection = True
+
+    def write_stream(self, pieces, chunked, encoding=None):
+        """Write an iterable of byte strings as the response body.
+
+        Pieces are buffered into EXPORT_CHUNK_BYTES chunks and optionally
+        compressed as they go.
+        """
+        compressor = None
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            compressor = zlib.compressobj(COMPRESSION_LEVEL)
 
-            self.send_json_response(valuations)
+        def send(data, final=False):
+            if compressor is not None:
+                data = compressor.compress(data) + (compressor.flush() if final else b'')
+            if not data:
+                return
+            if chunked:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        buffered, size = [], 0
+        for piece in pieces:
+            buffered.append(piece)
+            size += len(piece)
+            if size >= EXPORT_CHUNK_BYTES:
+                send(b''.join(buffered))
+                buffered, size = [], 0
+        send(b''.join(buffered), final=True)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def handle_events(self):
+        """Open a Server-Sent Events stream of valuation changes.
+
+        Each event (created, updated or deleted) carries the valuation id and,
+        unless deleted, its list-view summary. The socket is handed to the
+        backend's change feed, freeing this worker for other requests.
+        """
+        detach = getattr(self.server, 'detach', None)
+        if detach is None:
+            self.send_error_response(503, "Event streams need the worker pool (run without --single-threaded)")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # The stream has no length; it ends when either side closes it
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(f"retry: {EVENTS_RETRY_MS}\n\n".encode('utf-8'))
+        self.close_connection = True
+        detach(self.connection)
+        self.backend.events.subscribe(self.connection)
+
+    def handle_search(self, query):
+        """Return valuations whose text fields match ?q=, best first."""
+        try:
+            text = query.get('q', [''])[0]
+            if not text.strip():
+                self.send_error_response(400, "q is required")
+                return
+            try:
+                limit = int(query.get('limit', [str(SEARCH_DEFAULT_LIMIT)])[0])
+            except ValueError:
+                self.send_error_response(400, "limit must be an integer")
+                return
+            limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+            # Pick up files changed behind our back, at most once a second
+            self.backend.store.refresh(max_age=SEARCH_REFRESH_INTERVAL)
+            total, hits = self.backend.search.search(text, limit)
+            self.send_json_response({"query": text, "total": total, "hits": hits})
 
         except Exception as e:
             self.send_error_response(500, str(e))
@@ -364,57 +4296,257 @@ class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
     def handle_get_valuation(self, valuation_id):
         """Return specific valuation JSON file."""
         try:
-            json_file = VALUATIONS_DIR / f"{valuation_id}.json"
+            entry = self.backend.store.get(valuation_id)
 
-            if not json_file.exists():
+            if entry is None:
                 self.send_error_response(404, "Valuation not found")
                 return
 
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            etag = entry.content_hash
+            if self.etag_matches(etag):
+                self.send_not_modified(etag)
+                return
 
-            self.send_json_response(data)
+            self.send_json_response(entry.data, etag=etag)
 
         except json.JSONDecodeError as e:
             self.send_error_response(400, f"Invalid JSON: {e}")
         except Exception as e:
             self.send_error_response(500, str(e))
 
-    def handle_calculate_dcf(self, valuation_id):
-        """Calculate and return DCF for a specific valuation."""
+    def handle_calculate_dcf(self, valuation_id, query):
+        """Calculate and return DCF for a specific valuation.
+
+        With ?profile=1 the cache is bypassed and the result carries a
+        cProfile breakdown of the calculation and serialization.
+        """
         try:
-            json_file = VALUATIONS_DIR / f"{valuation_id}.json"
+            entry = self.backend.store.get(valuation_id)
 
-            if not json_file.exists():
+            if entry is None:
                 self.send_error_response(404, "Valuation not found")
                 return
 
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if query.get('profile', ['0'])[0] not in ('', '0', 'false'):
+                self.send_json_response(profile_dcf(entry.data))
+                return
+
+            dcf_format = self.dcf_format(query)
+            if dcf_format is None:
+                return
+
+            etag = DcfResultCache.key_for(entry.content_hash, dcf_format)
+            if self.etag_matches(etag):
+                self.send_not_modified(etag)
+                return
+
+            self.send_cached_dcf(etag, entry.data, dcf_format)
+
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_calculate_dcf_overrides(self, valuation_id, query):
+        """Calculate DCF for a valuation with overrides applied in memory only."""
+        try:
+            entry = self.backend.store.get(valuation_id)
+
+            if entry is None:
+                self.send_error_response(404, "Valuation not found")
+                return
 
-            dcf_results = calculate_dcf(data)
-            self.send_json_response(dcf_results)
+            dcf_format = self.dcf_format(query)
+            if dcf_format is None:
+                return
+
+            overrides = self.read_json_body()
+            data = entry.data
+
+            try:
+                data = apply_overrides(data, overrides)
+            except ValueError as e:
+                self.send_error_response(400, str(e))
+                return
+
+            try:
+                self.send_cached_dcf(DcfResultCache.key_for(content_hash(data), dcf_format), data, dcf_format)
+            except (ValueError, ArithmeticError) as e:
+                # The overrides produced a document the model can't value,
+                # e.g. an unknown stage or a discount rate of -100%
+                self.send_error_response(400, f"Invalid overrides: {e}")
+
+        except json.JSONDecodeError as e:
+            self.send_error_response(400, f"Invalid JSON: {e}")
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_monte_carlo(self, valuation_id, query):
+        """Run a Monte Carlo rNPV simulation for a specific valuation."""
+        try:
+            entry = self.backend.store.get(valuation_id)
+
+            if entry is None:
+                self.send_error_response(404, "Valuation not found")
+                return
+
+            try:
+                draws = int(query.get('draws', ['10000'])[0])
+                seed = int(query['seed'][0]) if 'seed' in query else random.randrange(2 ** 32)
+                bins = int(query.get('bins', ['50'])[0])
+            except ValueError:
+                self.send_error_response(400, "draws, seed and bins must be integers")
+                return
+            if draws > MONTE_CARLO_MAX_SYNC_DRAWS:
+                self.send_error_response(
+                    400, f"draws above {MONTE_CARLO_MAX_SYNC_DRAWS} must be submitted as a montecarlo job to /api/jobs")
+                return
+
+            data = entry.data
+
+            try:
+                results = run_monte_carlo(data, draws=draws, seed=seed, bins=bins)
+            except ValueError as e:
+                self.send_error_response(400, str(e))
+                return
+
+            with METRICS.timed('calculate_dcf'):
+                results['deterministicNpv'] = calculate_dcf(data)['npv']
+            self.send_json_response(results)
+
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_sensitivity(self, valuation_id):
+        """Return a tornado table and two-way NPV grid for a specific valuation."""
+        try:
+            entry = self.backend.store.get(valuation_id)
+
+            if entry is None:
+                self.send_error_response(404, "Valuation not found")
+                return
+
+            request = self.read_json_body()
+            if not isinstance(request, dict):
+                self.send_error_response(400, "Request body must be a JSON object")
+                return
+
+            data = entry.data
+
+            try:
+                results = run_sensitivity(
+                    data,
+                    parameters=request.get('parameters'),
+                    grid=request.get('grid'),
+                    include_grid=request.get('grid', True) is not False
+                )
+            except (ValueError, TypeError, AttributeError) as e:
+                self.send_error_response(400, f"Invalid sensitivity request: {e}")
+                return
+            except ArithmeticError as e:
+                # e.g. a document whose own inputs can't be discounted
+                self.send_error_response(400, f"Sensitivity cannot be computed: {e}")
+                return
+
+            self.send_json_response(results)
+
+        except json.JSONDecodeError as e:
+            self.send_error_response(400, f"Invalid JSON: {e}")
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_solve(self, valuation_id):
+        """Solve for the parameter values that hit the requested targets."""
+        try:
+            entry = self.backend.store.get(valuation_id)
+
+            if entry is None:
+                self.send_error_response(404, "Valuation not found")
+                return
+
+            request = self.read_json_body()
+            if not isinstance(request, dict):
+                self.send_error_response(400, "Request body must be a JSON object")
+                return
+
+            # Accept a single target inline or a batch under "targets"
+            targets = request['targets'] if 'targets' in request else [request]
+            try:
+                results = solve_dcf(entry.data, targets)
+            except (ValueError, TypeError) as e:
+                self.send_error_response(400, f"Invalid solve request: {e}")
+                return
+            except ArithmeticError as e:
+                # e.g. a document whose own inputs can't be discounted
+                self.send_error_response(400, f"Valuation cannot be solved: {e}")
+                return
+
+            self.send_json_response(results)
+
+        except json.JSONDecodeError as e:
+            self.send_error_response(400, f"Invalid JSON: {e}")
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
+    def handle_submit_job(self):
+        """Queue a Monte Carlo, sensitivity or portfolio recalculation job."""
+        try:
+            request = self.read_json_body()
+            if not isinstance(request, dict):
+                self.send_error_response(400, "Request body must be a JSON object")
+                return
+
+            try:
+                job_type, tasks, finalize = plan_job(request, self.backend.store)
+                job = JOB_MANAGER.submit(job_type, tasks, finalize, timeout=request.get('timeout'))
+            except LookupError as e:
+                self.send_error_response(404, str(e))
+                return
+            except (ValueError, TypeError) as e:
+                self.send_error_response(400, f"Invalid job request: {e}")
+                return
+            except JobQueueFull as e:
+                self.send_error_response(503, str(e), headers={"Retry-After": "5"})
+                return
+
+            self.send_json_response(job.to_dict(), status=202, headers={"Location": f"/api/jobs/{job.id}"})
 
+        except json.JSONDecodeError as e:
+            self.send_error_response(400, f"Invalid JSON: {e}")
         except Exception as e:
             self.send_error_response(500, str(e))
 
+    def handle_get_job(self, job_id):
+        """Return a job's status, progress and (once finished) its result."""
+        job = JOB_MANAGER.get(job_id)
+        if job is None:
+            self.send_error_response(404, "Job not found")
+            return
+        self.send_json_response(job.to_dict())
+
+    def handle_cancel_job(self, job_id):
+        """Cancel a queued or running job."""
+        job = JOB_MANAGER.cancel(job_id)
+        if job is None:
+            self.send_error_response(404, "Job not found")
+            return
+        self.send_json_response(job.to_dict())
+
     def handle_update_valuation(self, valuation_id):
         """Update a valuation with new parameters."""
         try:
-            json_file = VALUATIONS_DIR / f"{valuation_id}.json"
-
-            if not json_file.exists():
+            if not self.backend.store.exists(valuation_id):
                 self.send_error_response(404, "Valuation not found")
                 return
 
             # Get update from request body
-            content_length = int(self.headers['Content-Length'])
-            body = self.rfile.read(content_length)
-            update_data = json.loads(body.decode('utf-8'))
+            update_data = self.read_json_body()
+            try:
+                validate_valuation(valuation_id, update_data)
+            except ValueError as e:
+                self.send_error_response(400, f"Invalid valuation: {e}")
+                return
 
             # Save updated data directly (frontend sends complete valuation object)
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(update_data, f, indent=2)
+            self.backend.writer.write_now(valuation_id, update_data)
 
             self.send_json_response(update_data)
 
@@ -423,64 +4555,249 @@ class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_error_response(500, str(e))
 
+    def handle_patch_valuation(self, valuation_id, query):
+        """Apply a JSON Patch to a valuation and return the new DCF summary.
+
+        The patched document is served from memory straight away; the file
+        is rewritten atomically once a burst of edits settles.
+        """
+        try:
+            with self.backend.store.lock_for(valuation_id):
+                entry = self.backend.store.get(valuation_id)
+
+                if entry is None:
+                    self.send_error_response(404, "Valuation not found")
+                    return
+
+                if 'If-Match' in self.headers and not self.matching_etags('If-Match', entry.content_hash):
+                    self.send_error_response(412, "Valuation has changed since it was read")
+                    return
+
+                operations = self.read_json_body()
+                try:
+                    data = apply_json_patch(entry.data, operations)
+                except JsonPatchTestFailed as e:
+                    self.send_error_response(409, str(e))
+                    return
+                except JsonPatchError as e:
+                    self.send_error_response(400, f"Invalid JSON Patch: {e}")
+                    return
+
+                # Value the patched document before it replaces the stored one
+                try:
+                    with METRICS.timed('calculate_dcf'):
+                        dcf_results = validate_valuation(valuation_id, data)
+                except ValueError as e:
+                    self.send_error_response(400, f"Invalid valuation after patch: {e}")
+                    return
+
+                entry = self.backend.store.put(valuation_id, data)
+                self.backend.writer.schedule(valuation_id, data)
+
+            with METRICS.timed('serialize'):
+                body = encode_json(dcf_results)
+            DCF_CACHE.put(DcfResultCache.key_for(entry.content_hash), {None: body})
+
+            summary = {key: value for key, value in dcf_results.items() if key != 'years'}
+            if query.get('years', ['0'])[0] not in ('', '0', 'false'):
+                summary['years'] = dcf_results['years']
+            self.send_json_response(summary, etag=entry.content_hash)
+
+        except json.JSONDecodeError as e:
+            self.send_error_response(400, f"Invalid JSON: {e}")
+        except Exception as e:
+            self.send_error_response(500, str(e))
+
     def handle_delete_valuation(self, valuation_id):
         """Delete a valuation file."""
         try:
-            json_file = VALUATIONS_DIR / f"{valuation_id}.json"
+            with self.backend.store.lock_for(valuation_id):
+                self.backend.writer.cancel(valuation_id)
+                deleted = self.backend.store.delete(valuation_id)
 
-            if not json_file.exists():
+            if not deleted:
                 self.send_error_response(404, "Valuation not found")
                 return
 
-            # Delete the file
-            json_file.unlink()
-
             self.send_json_response({"success": True, "message": "Valuation deleted successfully"})
 
         except Exception as e:
             self.send_error_response(500, str(e))
 
-    def serve_index(self):
-        """Serve the main HTML page."""
-        html_file = Path(__file__).parent / "index.html"
-
-        if not html_file.exists():
-            self.send_error_response(404, "index.html not found. Please create it first.")
+    def serve_static(self, url_path, include_body=True):
+        """Serve one of STATIC_ASSETS from memory, honouring conditional requests."""
+        name, content_type, cache_control = STATIC_ASSETS[url_path]
+        try:
+            asset = STATIC_CACHE.get(name)
+        except OSError as e:
+            self.send_error_response(500, str(e))
+            return
+        if asset is None:
+            message = f"{name} not found. Please create it first." if name == 'index.html' else f"{name} not found"
+            self.send_error_response(404, message)
             return
 
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        if encoding not in asset.bodies:
+            encoding = None  # not worth compressing (e.g. PNG)
+        body = asset.bodies[encoding]
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        if 'If-None-Match' in self.headers:
+            not_modified = self.etag_matches(asset.etag)
+        else:
+            not_modified = self.not_modified_since(asset.modified_at)
+
+        self.send_response(304 if not_modified else 200)
+        if not not_modified:
+            self.send_header("Content-type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("ETag", f'"{self.representation_etag(asset.etag, encoding)}"')
+        self.send_header("Last-Modified", asset.last_modified)
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        if include_body and not not_modified:
+            self.wfile.write(body)
+
+    def not_modified_since(self, modified_at):
+        """Return True if the request's If-Modified-Since is at or after ``modified_at``."""
+        header = self.headers.get('If-Modified-Since')
+        if not header:
+            return False
         try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            since = email.utils.parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return modified_at <= since.timestamp()
 
-            self.send_response(200)
-            self.send_header("Content-type", "text/html; charset=utf-8")
-            self.send_header("Content-Length", str(len(content.encode('utf-8'))))
-            self.end_headers()
-            self.wfile.write(content.encode('utf-8'))
+    body_consumed = False
 
-        except Exception as e:
-            self.send_error_response(500, str(e))
+    def read_json_body(self):
+        """Parse the request body as JSON, treating an empty body as {}."""
+        content_length = int(self.headers.get('Content-Length') or 0)
+        self.body_consumed = True
+        if content_length == 0:
+            return {}
+        body = self.rfile.read(content_length)
+        with METRICS.timed('json_parse'):
+            return json.loads(body.decode('utf-8'))
+
+    def send_cached_dcf(self, etag, valuation_data, dcf_format='records'):
+        """Send the DCF for a document, computing and caching it on a miss."""
+        bodies = DCF_CACHE.get(etag)
+        cache_status = "HIT"
+        if bodies is None:
+            with METRICS.timed('calculate_dcf'):
+                dcf_results = calculate_dcf(valuation_data)
+            if dcf_format == 'columnar':
+                dcf_results = columnar_dcf(dcf_results)
+            with METRICS.timed('serialize'):
+                bodies = {None: encode_json(dcf_results)}
+            DCF_CACHE.put(etag, bodies)
+            cache_status = "MISS"
+        self.send_json_bytes(bodies[None], etag=etag, headers={"X-Cache": cache_status}, encoded=bodies)
+
+    def dcf_format(self, query):
+        """Return the ?format= of a DCF request, or None after sending a 400."""
+        dcf_format = query.get('format', ['records'])[0]
+        if dcf_format not in DCF_FORMATS:
+            self.send_error_response(400, f"format must be one of: {', '.join(DCF_FORMATS)}")
+            return None
+        return dcf_format
 
-    def send_json_response(self, data):
+    def matching_etags(self, header_name, etag):
+        """Return the tags in an If-Match or If-None-Match header that name ``etag``.
+
+        A tag matches in any content coding and with or without a W/
+        prefix, since clients echo whichever representation ETag they got;
+        "*" matches anything. Tags are returned quoted, without W/.
+        """
+        candidates = [tag.strip().removeprefix('W/') for tag in self.headers.get(header_name, '').split(',')]
+        representations = {f'"{self.representation_etag(etag, encoding)}"'
+                           for encoding in (None,) + CONTENT_ENCODINGS}
+        return [tag for tag in candidates if tag == '*' or tag in representations]
+
+    def etag_matches(self, etag):
+        """Return True if the request's If-None-Match covers ``etag`` in any content coding."""
+        return bool(self.matching_etags('If-None-Match', etag))
+
+    @staticmethod
+    def representation_etag(etag, encoding):
+        """Compressed bodies differ byte for byte, so each coding gets its own ETag."""
+        return etag if encoding is None else f"{etag}-{encoding}"
+
+    def send_not_modified(self, etag):
+        """Send a 304 for a successful conditional request.
+
+        The 304 must carry the ETag a 200 would have, but whether that body
+        gets compressed depends on its size, which isn't known here. The
+        client's matching tag names the representation it holds, so that is
+        echoed, preferring the negotiated coding when several match.
+        """
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        negotiated = f'"{self.representation_etag(etag, encoding)}"'
+        matches = [tag for tag in self.matching_etags('If-None-Match', etag) if tag != '*']
+        self.send_response(304)
+        self.send_header("ETag", matches[0] if matches and negotiated not in matches else negotiated)
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+
+    def send_json_response(self, data, etag=None, status=200, headers=None):
         """Send JSON response."""
-        json_data = json.dumps(data, indent=2)
+        with METRICS.timed('serialize'):
+            body = encode_json(data)
+        self.send_json_bytes(body, etag=etag, status=status, headers=headers)
 
-        self.send_response(200)
+    def send_json_bytes(self, body, etag=None, headers=None, status=200, encoded=None):
+        """Send an already serialized JSON body, compressed if the client accepts it.
+
+        ``encoded`` is an optional {encoding: body} dict of cached variants;
+        any compression done here is added to it.
+        """
+        encoding = None
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        if encoding is not None:
+            compressed = encoded.get(encoding) if encoded is not None else None
+            if compressed is None:
+                with METRICS.timed('compress'):
+                    compressed = compress_body(body, encoding)
+                if encoded is not None:
+                    encoded[encoding] = compressed
+            body = compressed
+
+        self.send_response(status)
         self.send_header("Content-type", "application/json")
-        self.send_header("Content-Length", str(len(json_data.encode('utf-8'))))
+        self.send_header("Content-Length", str(len(body)))
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        if etag is not None:
+            self.send_header("ETag", f'"{self.representation_etag(etag, encoding)}"')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json_data.encode('utf-8'))
+        self.wfile.write(body)
 
-    def send_error_response(self, code, message):
+    def send_error_response(self, code, message, headers=None):
         """Send error response."""
-        error_data = {"error": message}
-        json_data = json.dumps(error_data)
+        body = encode_json({"error": message})
 
         self.send_response(code)
         self.send_header("Content-type", "application/json")
-        self.send_header("Content-Length", str(len(json_data.encode('utf-8'))))
+        self.send_header("Content-Length", str(len(body)))
+        if not self.body_consumed and int(self.headers.get('Content-Length') or 0):
+            # The unread request body would corrupt the next keep-alive request
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json_data.encode('utf-8'))
+        self.wfile.write(body)
 
     def log_message(self, format, *args):
         """Custom log format."""
@@ -490,26 +4807,84 @@ class BioBucksHandler(http.server.SimpleHTTPRequestHandler):
         """Override handle to catch BrokenPipeError."""
         try:
             super().handle()
-        except BrokenPipeError:
+        except (BrokenPipeError, ConnectionResetError):
             # Client closed connection before we could send response
             # This is common for favicon requests - just ignore it
             pass
 
 
+class SingleThreadedHandler(BioBucksHandler):
+    """BioBucksHandler for --single-threaded mode.
+
+    With only one thread, an idle keep-alive client would block everyone
+    else until KEEP_ALIVE_TIMEOUT, so every response closes its connection.
+    """
+
+    protocol_version = "HTTP/1.0"
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="BioBucks DCF Valuations viewer")
+    parser.add_argument("port", nargs="?", type=int, default=PORT, help=f"port to listen on (default {PORT})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"worker threads for concurrent requests (default {DEFAULT_WORKERS})")
+    parser.add_argument("--queue-limit", type=int, default=DEFAULT_QUEUE_LIMIT,
+                        help="connections allowed to wait for a free worker before new ones "
+                             f"get a 503 (default {DEFAULT_QUEUE_LIMIT})")
+    parser.add_argument("--single-threaded", action="store_true",
+                        help="serve one request at a time (no worker pool)")
+    parser.add_argument("--db", metavar="PATH",
+                        help="serve valuations from a SQLite database instead of the valuations/ directory")
+    parser.add_argument("--job-workers", type=int, default=None,
+                        help="processes for background jobs (default: CPU count)")
+    return parser.parse_args(argv)
+
+
 def main():
     """Start the server."""
+    args = parse_args()
+
     # Ensure valuations directory exists
     VALUATIONS_DIR.mkdir(exist_ok=True)
 
-    # Enable SO_REUSEADDR to allow immediate rebinding
-    socketserver.TCPServer.allow_reuse_address = True
+    if args.job_workers:
+        JOB_MANAGER.max_workers = args.job_workers
+
+    if args.db:
+        backend = ValuationBackend(SqliteValuationStore(args.db))
+    else:
+        backend = DEFAULT_BACKEND
+
+    # Parse existing valuations without delaying startup
+    backend.store.warm_in_background()
 
-    with socketserver.TCPServer(("", PORT), BioBucksHandler) as httpd:
+    if args.single_threaded:
+        # Enable SO_REUSEADDR to allow immediate rebinding
+        socketserver.TCPServer.allow_reuse_address = True
+        httpd = socketserver.TCPServer(("", args.port), SingleThreadedHandler)
+        httpd.backend = backend
+        mode = "single-threaded"
+    else:
+        httpd = PooledHTTPServer(("", args.port), BioBucksHandler, workers=args.workers,
+                                 queue_limit=args.queue_limit, backend=backend)
+        mode = f"{args.workers} worker threads"
+
+    # Treat SIGTERM like Ctrl+C so in-flight requests are drained
+    def request_shutdown(signum, frame):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    with httpd:
         print(f"\n{'='*60}")
         print(f"  BioBucks DCF Valuations Viewer")
         print(f"{'='*60}")
-        print(f"\n  Server running at: http://localhost:{PORT}")
-        print(f"  Valuations directory: {VALUATIONS_DIR}")
+        print(f"\n  Server running at: http://localhost:{args.port}")
+        if args.db:
+            print(f"  Valuations database: {args.db}")
+        else:
+            print(f"  Valuations directory: {VALUATIONS_DIR}")
+        print(f"  Serving mode: {mode}")
         print(f"\n  Press Ctrl+C to stop the server\n")
         print(f"{'='*60}\n")
 
@@ -519,6 +4894,10 @@ def main():
             print("\n\nShutting down server...")
             httpd.shutdown()
 
+    # Persist edits still waiting in the write coalescing window
+    backend.close()
+    JOB_MANAGER.shutdown()
+
 
 if __name__ == "__main__":
     main()
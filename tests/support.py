@@ -0,0 +1,55 @@
+import http.client
+import json
+import threading
+import unittest
+
+import server
+
+
+class QuietHandler(server.BioBucksHandler):
+    """BioBucksHandler without per-request logging."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ServerTestCase(unittest.TestCase):
+    """Runs a PooledHTTPServer on an ephemeral port for the test class."""
+
+    workers = 2
+
+    @classmethod
+    def make_backend(cls):
+        """Return the ValuationBackend to serve; None serves valuations/."""
+        return None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = cls.make_backend()
+        cls.httpd = server.PooledHTTPServer(("127.0.0.1", 0), QuietHandler, workers=cls.workers,
+                                            backend=cls.backend)
+        cls.port = cls.httpd.server_address[1]
+        cls.thread = threading.Thread(target=cls.httpd.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        cls.thread.join()
+        if cls.backend is not None:
+            cls.backend.close()
+
+    def connect(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+        self.addCleanup(connection.close)
+        return connection
+
+    def request(self, method, path, body=None, headers=None, connection=None):
+        """Send a request and return (response, body bytes)."""
+        connection = connection or self.connect()
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
@@ -0,0 +1,141 @@
+import copy
+import json
+import math
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import server
+
+VALUATION_PATH = Path(server.VALUATIONS_DIR) / 'nlrp3-inhibitor-parkinsons-2026-01-25.json'
+
+
+def load_valuation():
+    with open(VALUATION_PATH) as f:
+        return json.load(f)
+
+
+def variants():
+    """The sample valuation at every development stage, plus fractional and missing inputs."""
+    base = load_valuation()
+    documents = [base]
+    for stage in ('Preclinical', 'Phase II', 'Phase III', 'Approval', 'Approved'):
+        doc = copy.deepcopy(base)
+        doc['assetOverview']['currentDevelopmentStage'] = stage
+        documents.append(doc)
+    doc = copy.deepcopy(base)
+    doc['developmentTimeline']['phaseIIDuration']['value'] = 2.25
+    doc['marketParameters']['yearsToPeakAdoption']['value'] = 0
+    del doc['financialParameters']['discountRate']
+    documents.append(doc)
+    return documents
+
+
+class CalculateDcfTests(unittest.TestCase):
+    def test_sample_valuation_npv(self):
+        results = server.calculate_dcf(load_valuation())
+        self.assertEqual(results['npv'], 100410970.84502594)
+        self.assertEqual(results['years'][0]['stage'], 'Phase I')
+        self.assertEqual(results['years'][-1]['stage'], 'Generic Competition')
+        self.assertAlmostEqual(results['npv'], math.fsum(y['presentValue'] for y in results['years']), places=3)
+
+    def test_completed_phases_cost_nothing(self):
+        doc = load_valuation()
+        doc['assetOverview']['currentDevelopmentStage'] = 'Phase III'
+        results = server.calculate_dcf(doc)
+        self.assertEqual(results['yearsToApproval'],
+                         doc['developmentTimeline']['phaseIIIDuration']['value']
+                         + doc['developmentTimeline']['approvalDuration']['value'])
+        self.assertEqual(results['years'][0]['stage'], 'Phase III')
+
+    def test_unknown_stage_is_rejected(self):
+        doc = load_valuation()
+        doc['assetOverview']['currentDevelopmentStage'] = 'Phase IV'
+        with self.assertRaises(ValueError):
+            server.calculate_dcf(doc)
+
+
+class DcfModelTests(unittest.TestCase):
+    def test_batch_matches_calculate_dcf(self):
+        for doc in variants():
+            expected = server.calculate_dcf(doc)
+            engine = server.BatchDcfEngine(doc)
+            results = engine.evaluate([engine.base_values], include_years=True)
+            self.assertEqual(results['npv'], [expected['npv']])
+            self.assertEqual(results['fcf'], [[y['fcf'] for y in expected['years']]])
+            self.assertEqual(results['riskAdjustedFCF'], [[y['riskAdjustedFCF'] for y in expected['years']]])
+
+    def test_incremental_updates_match_a_fresh_model(self):
+        doc = load_valuation()
+        model = server.DcfModel(doc)
+        model.npv
+        changes = [
+            ('financialParameters.discountRate', 14),
+            ('marketParameters.annualPricing', 30000),
+            ('developmentTimeline.phaseIIIDuration', 4.5),
+            ('probabilityOfSuccess.phaseII', 20),
+        ]
+        for path, value in changes:
+            model.set(path, value)
+            section, key = path.split('.')
+            doc[section][key]['value'] = value
+            self.assertEqual(model.result(), server.calculate_dcf(doc))
+
+    def test_batch_rows_are_independent(self):
+        doc = load_valuation()
+        engine = server.BatchDcfEngine(doc, ['marketParameters.annualPricing', 'financialParameters.discountRate'])
+        rows = [[48000, 11], [30000, 11], [48000, 20], [48000, 11]]
+        npvs = engine.evaluate(rows)['npv']
+        self.assertEqual(npvs[0], npvs[3])
+        self.assertEqual(npvs[0], server.calculate_dcf(doc)['npv'])
+
+    def test_stage_values_reconcile_with_npv(self):
+        # npv = -sum(prior-phase PoS x phase cost PV) + cumulative PoS x commercial PV
+        for doc in variants():
+            model = server.DcfModel(doc)
+            prior = 1.0
+            expected = 0.0
+            for phase, value in enumerate(model.phase_cost_values):
+                expected -= prior * value
+                prior *= server._phase_probability(model._values, model.stage_value, phase)
+            expected += model.cumulative_pos * model.commercial_value
+            self.assertAlmostEqual(model.npv, expected, delta=abs(model.npv) * 1e-9)
+
+
+class MonteCarloTests(unittest.TestCase):
+    def test_chunks_are_reproducible(self):
+        doc = load_valuation()
+        first = server.simulate_npv_chunk(doc, 500, seed=7, chunk_index=2)
+        second = server.simulate_npv_chunk(doc, 500, seed=7, chunk_index=2)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, server.simulate_npv_chunk(doc, 500, seed=7, chunk_index=3))
+
+    def test_draws_do_not_rebuild_the_projection(self):
+        # Per-draw cost is what benchmark.py budgets; a draw must not go
+        # through the staged per-year model
+        doc = load_valuation()
+        with mock.patch.object(server.DcfModel, '_refresh', side_effect=AssertionError('stage recompute')):
+            npvs, launches = server.simulate_npv_chunk(doc, 200, seed=3)
+        self.assertEqual(len(npvs), 200)
+
+    def test_certain_inputs_reproduce_the_deterministic_npv(self):
+        # With full confidence in every input there is nothing to sample, and
+        # PoS of 100% means every draw launches
+        doc = load_valuation()
+        for section, key in (path.split('.') for path, _ in server.DCF_PARAMETERS):
+            param = doc.get(section, {}).get(key)
+            if isinstance(param, dict):
+                param['value'] = 100 if section == 'probabilityOfSuccess' else param['value']
+                param['confidence'] = 'none'
+        server.CONFIDENCE_SPREADS['none'] = 0.0
+        try:
+            npvs, launches = server.simulate_npv_chunk(doc, 10, seed=1)
+        finally:
+            del server.CONFIDENCE_SPREADS['none']
+        self.assertEqual(launches, 10)
+        self.assertEqual(set(npvs), {npvs[0]})
+        self.assertAlmostEqual(npvs[0], server.calculate_dcf(doc)['npv'], delta=abs(npvs[0]) * 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
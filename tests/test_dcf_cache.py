@@ -0,0 +1,53 @@
+import json
+import unittest
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+VALUATION_ID = 'nlrp3-inhibitor-parkinsons-2026-01-25'
+
+
+class DcfResultCacheTests(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = server.DcfResultCache(max_entries=2)
+        cache.put('a', {None: b'a'})
+        cache.put('b', {None: b'b'})
+        cache.get('a')
+        cache.put('c', {None: b'c'})
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), {None: b'a'})
+        self.assertEqual(cache.evictions, 1)
+
+    def test_keys_depend_on_format(self):
+        self.assertNotEqual(server.DcfResultCache.key_for('hash'),
+                            server.DcfResultCache.key_for('hash', 'columnar'))
+
+
+class DcfEndpointTests(ServerTestCase):
+    def setUp(self):
+        server.DCF_CACHE.clear()
+
+    def test_second_request_is_a_cache_hit(self):
+        response, first = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf')
+        self.assertEqual(response.getheader('X-Cache'), 'MISS')
+        response, second = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf')
+        self.assertEqual(response.getheader('X-Cache'), 'HIT')
+        self.assertEqual(first, second)
+        self.assertEqual(json.loads(first)['npv'], server.calculate_dcf(load_valuation())['npv'])
+
+    def test_unchanged_result_is_not_resent(self):
+        response, _ = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf')
+        etag = response.getheader('ETag')
+        response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf', headers={'If-None-Match': etag})
+        self.assertEqual((response.status, body), (304, b''))
+
+    def test_columnar_format_holds_the_same_years(self):
+        _, records = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf')
+        response, columnar = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf?format=columnar')
+        self.assertEqual(response.status, 200)
+        records, columnar = json.loads(records), json.loads(columnar)
+        for field, values in columnar['years'].items():
+            self.assertEqual(values, [year.get(field) for year in records['years']])
+        response, _ = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf?format=xml')
+        self.assertEqual(response.status, 400)
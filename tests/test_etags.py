@@ -0,0 +1,67 @@
+import json
+import tempfile
+from pathlib import Path
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+class EtagTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        directory = Path(cls.temp.name)
+        (directory / 'large.json').write_text(json.dumps(load_valuation()))
+        (directory / 'small.json').write_text(json.dumps({'assetOverview': {'assetName': 'Small'}}))
+        return server.ValuationBackend(server.ValuationIndex(directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def get(self, valuation_id, headers=None):
+        return self.request('GET', f'/api/valuations/{valuation_id}', headers={**GZIP, **(headers or {})})
+
+    def rename(self, etag, name):
+        patch = [{'op': 'replace', 'path': '/assetOverview/assetName', 'value': name}]
+        return self.request('PATCH', '/api/valuations/large', patch, headers={'If-Match': etag})
+
+    def test_not_modified_repeats_the_uncompressed_etag_of_small_bodies(self):
+        response, _ = self.get('small')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        etag = response.getheader('ETag')
+        self.assertFalse(etag.endswith('-gzip"'))
+
+        response, _ = self.get('small', {'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.getheader('ETag'), etag)
+
+    def test_not_modified_repeats_the_compressed_etag(self):
+        response, _ = self.get('large')
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        etag = response.getheader('ETag')
+        self.assertTrue(etag.endswith('-gzip"'))
+
+        for header in (etag, f'W/{etag}', f'"stale", {etag}'):
+            with self.subTest(header=header):
+                response, _ = self.get('large', {'If-None-Match': header})
+                self.assertEqual(response.status, 304)
+                self.assertEqual(response.getheader('ETag'), etag)
+
+    def test_if_match_accepts_compressed_and_weak_etags(self):
+        response, _ = self.get('large')
+        etag = response.getheader('ETag')
+        response, body = self.rename(etag, 'Renamed once')
+        self.assertEqual(response.status, 200, body)
+
+        response, _ = self.get('large')
+        etag = response.getheader('ETag')
+        response, body = self.rename(f'W/{etag}', 'Renamed twice')
+        self.assertEqual(response.status, 200, body)
+
+        response, _ = self.rename(etag, 'Lost update')
+        self.assertEqual(response.status, 412)
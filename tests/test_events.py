@@ -0,0 +1,132 @@
+import json
+import socket
+import tempfile
+import threading
+import time
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+def read_until(connection, marker, timeout=5):
+    """Read from a socket until ``marker`` arrives, it closes or ``timeout`` passes."""
+    connection.settimeout(timeout)
+    received = b''
+    try:
+        while marker not in received:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+    except TimeoutError:
+        pass
+    return received
+
+
+class StaticIndex:
+    """Just enough of a store for a ChangeFeed to watch."""
+
+    def add_listener(self, callback):
+        self.notify = callback
+
+    def refresh(self):
+        return [], [], []
+
+
+class ChangeFeedTests(unittest.TestCase):
+    def setUp(self):
+        self.index = StaticIndex()
+        self.feed = server.ChangeFeed(poll_interval=0.05)
+        self.feed.attach(self.index)
+        self.addCleanup(self.feed.close)
+
+    def subscriber(self, buffer_bytes=None):
+        ours, theirs = socket.socketpair()
+        self.addCleanup(ours.close)
+        self.addCleanup(theirs.close)
+        if buffer_bytes is not None:
+            ours.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buffer_bytes)
+            theirs.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_bytes)
+        self.feed.subscribe(ours)
+        return theirs
+
+    def wait_for_subscribers(self, count):
+        deadline = time.monotonic() + 5
+        while self.feed.subscriber_count() != count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.feed.subscriber_count(), count)
+
+    def test_slow_subscriber_is_dropped_without_delaying_others(self):
+        slow = self.subscriber(buffer_bytes=4096)
+        fast = self.subscriber()
+        received = []
+        reader = threading.Thread(target=lambda: received.append(read_until(fast, b'"id":"last"')))
+        reader.start()
+        self.wait_for_subscribers(2)
+
+        summary = {'assetName': 'x' * 1000}
+        with mock.patch.object(server, 'EVENTS_MAX_BACKLOG_BYTES', 64 * 1024):
+            start = time.monotonic()
+            for i in range(200):
+                self.index.notify(f'asset-{i}', types.SimpleNamespace(summary=summary))
+                time.sleep(0.001)
+            self.index.notify('last', types.SimpleNamespace(summary={}))
+            reader.join(5)
+
+        self.assertIn(b'"id":"last"', received[0])
+        self.assertLess(time.monotonic() - start, server.EVENTS_SEND_TIMEOUT)
+        self.wait_for_subscribers(1)
+        self.assertNotIn(b'"id":"last"', read_until(slow, b'"id":"last"'))
+
+    def test_hung_up_subscriber_is_dropped(self):
+        client = self.subscriber()
+        self.wait_for_subscribers(1)
+        client.close()
+        self.wait_for_subscribers(0)
+
+    def test_close_disconnects_subscribers(self):
+        client = self.subscriber()
+        self.wait_for_subscribers(1)
+        self.feed.close()
+        self.assertEqual(self.feed.subscriber_count(), 0)
+        self.assertEqual(read_until(client, b'never'), b'')
+
+
+class EventStreamTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        backend = server.ValuationBackend(server.SqliteValuationStore(Path(cls.temp.name) / 'valuations.db'))
+        backend.store.write('asset', load_valuation())
+        return backend
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def test_patch_is_announced_once(self):
+        stream = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        self.addCleanup(stream.close)
+        stream.sendall(b'GET /api/events HTTP/1.1\r\nHost: test\r\n\r\n')
+        self.assertIn(b'retry:', read_until(stream, b'retry:'))
+
+        patch = [{'op': 'replace', 'path': '/assetOverview/assetName', 'value': 'Renamed'}]
+        response, _ = self.request('PATCH', '/api/valuations/asset', patch)
+        self.assertEqual(response.status, 200)
+        self.backend.writer.flush_all()
+
+        received = read_until(stream, b'"assetName":"Renamed"')
+        self.assertIn(b'event: updated', received)
+        # Neither the coalesced write nor later refreshes repeat the event
+        received += read_until(stream, b'event:', timeout=3 * server.EVENTS_POLL_INTERVAL)
+        self.assertEqual(received.count(b'event:'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+class UnreadableIndex(server.ValuationIndex):
+    """A directory index whose export scan fails."""
+
+    def modified_between(self, since, until):
+        raise OSError("store unavailable")
+        yield
+
+
+class ExportTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        directory = Path(cls.temp.name)
+        for valuation_id in ('first', 'second'):
+            path = directory / f'{valuation_id}.json'
+            path.write_text(json.dumps(load_valuation()))
+            os.utime(path, (1_700_000_000, 1_700_000_000))
+        return server.ValuationBackend(server.ValuationIndex(directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def test_csv_has_a_header_and_rows_per_year(self):
+        response, body = self.request('GET', '/api/export?format=csv')
+        self.assertEqual(response.status, 200)
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(tuple(rows[0]), server.EXPORT_CSV_COLUMNS)
+        self.assertEqual({row[0] for row in rows[1:]}, {'first', 'second'})
+
+    def test_ndjson_has_one_line_per_valuation(self):
+        response, body = self.request('GET', '/api/export')
+        self.assertEqual(response.status, 200)
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(record['id'] for record in records), ['first', 'second'])
+
+
+class UnreadableExportTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        return server.ValuationBackend(UnreadableIndex(cls.temp.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def test_store_errors_are_reported_before_the_headers(self):
+        for export_format in server.EXPORT_FORMATS:
+            with self.subTest(format=export_format):
+                response, body = self.request('GET', f'/api/export?format={export_format}')
+                self.assertEqual(response.status, 500)
+                self.assertIn('store unavailable', json.loads(body)['error'])
@@ -0,0 +1,110 @@
+import http.client
+import json
+import socket
+import socketserver
+import threading
+import time
+import unittest
+
+import server
+from tests.support import QuietHandler, ServerTestCase
+
+VALUATION_ID = 'nlrp3-inhibitor-parkinsons-2026-01-25'
+
+
+class KeepAliveTests(ServerTestCase):
+    def test_connection_is_reused(self):
+        connection = self.connect()
+        for _ in range(3):
+            response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}', connection=connection)
+            self.assertEqual(response.status, 200)
+            self.assertIsNone(response.getheader('Connection'))
+        self.assertEqual(json.loads(body)['assetOverview']['currentDevelopmentStage'], 'Phase I Ready')
+
+    def test_request_after_early_error_with_body(self):
+        # The 404 is sent before the POST body is read; the body must not be
+        # parsed as the next request on the connection
+        connection = self.connect()
+        response, _ = self.request('POST', '/api/valuations/missing/dcf', {'marketParameters': {}},
+                                   connection=connection)
+        self.assertEqual(response.status, 404)
+        if response.getheader('Connection') == 'close':
+            connection = self.connect()
+        response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}/dcf', connection=connection)
+        self.assertEqual(response.status, 200)
+        self.assertIn('npv', json.loads(body))
+
+    def test_request_after_bad_json(self):
+        connection = self.connect()
+        response, _ = self.request('POST', f'/api/valuations/{VALUATION_ID}/dcf', b'{not json',
+                                   {'Content-Type': 'application/json'}, connection=connection)
+        self.assertEqual(response.status, 400)
+        response, _ = self.request('GET', f'/api/valuations/{VALUATION_ID}', connection=connection)
+        self.assertEqual(response.status, 200)
+
+    def test_http_1_0_clients_are_closed(self):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=10) as sock:
+            sock.sendall(f'GET /api/valuations/{VALUATION_ID} HTTP/1.0\r\n\r\n'.encode())
+            data = b''
+            while chunk := sock.recv(65536):
+                data += chunk
+        self.assertTrue(data.startswith(b'HTTP/1.1 200'))
+
+
+class QueueLimitTests(ServerTestCase):
+    workers = 1
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.httpd.queue_limit = 1
+
+    def test_connections_beyond_the_queue_get_503(self):
+        # Hold the only worker with a connection that hasn't sent its request
+        holder = socket.create_connection(('127.0.0.1', self.port), timeout=10)
+        self.addCleanup(holder.close)
+        self.wait_for(lambda: self.httpd._active_connections == 1)
+
+        queued = self.connect()
+        queued.request('GET', f'/api/valuations/{VALUATION_ID}')
+        self.wait_for(lambda: self.httpd._waiting_connections == 1)
+
+        response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}')
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader('Retry-After'), '1')
+        self.assertIn('busy', json.loads(body)['error'])
+        self.assertEqual(self.httpd.rejected_connections, 1)
+
+        # Once the worker is free the queued request is served
+        holder.close()
+        self.assertEqual(queued.getresponse().status, 200)
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "server never reached the expected state")
+            time.sleep(0.01)
+
+
+class SingleThreadedTests(unittest.TestCase):
+    def test_connections_are_not_kept_alive(self):
+        handler = type('Handler', (server.SingleThreadedHandler, QuietHandler), {})
+        httpd = socketserver.TCPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+
+        connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=10)
+        self.addCleanup(connection.close)
+        connection.request('GET', f'/api/valuations/{VALUATION_ID}')
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.version, 10)
+        self.assertTrue(response.will_close)
+
+
+if __name__ == '__main__':
+    unittest.main()
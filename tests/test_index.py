@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import server
+from tests.test_dcf import load_valuation
+
+
+class ValuationIndexTests(unittest.TestCase):
+    def setUp(self):
+        temp = tempfile.TemporaryDirectory()
+        self.addCleanup(temp.cleanup)
+        self.directory = Path(temp.name)
+        self.index = server.ValuationIndex(self.directory)
+
+    def write(self, valuation_id, data):
+        path = self.directory / f'{valuation_id}.json'
+        path.write_bytes(data if isinstance(data, bytes) else json.dumps(data).encode())
+        return path
+
+    def test_refresh_reports_changes(self):
+        doc = load_valuation()
+        self.write('a', doc)
+        self.assertEqual(self.index.refresh(), (['a'], [], []))
+        self.assertEqual(self.index.refresh(), ([], [], []))
+
+        doc['assetOverview']['assetName'] = 'Renamed'
+        path = self.write('a', doc)
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(self.index.refresh(), ([], ['a'], []))
+        self.assertEqual(self.index.get('a').summary['assetName'], 'Renamed')
+
+        path.unlink()
+        self.assertEqual(self.index.refresh(), ([], [], ['a']))
+        self.assertIsNone(self.index.get('a'))
+
+    def test_unreadable_documents_are_skipped(self):
+        self.write('good', load_valuation())
+        self.write('broken', b'{"assetOverview": ')
+        self.write('list', b'[1, 2, 3]')
+        self.write('latin1', '{"assetOverview": {"assetName": "caf\xe9"}}'.encode('latin-1'))
+
+        summaries = self.index.summaries()
+        self.assertEqual([s['id'] for s in summaries], ['good'])
+        with self.assertRaises(ValueError):
+            self.index.get('list')
+        with self.assertRaises(ValueError):
+            self.index.get('latin1')
+
+    def test_concurrent_refreshes_report_each_change_once(self):
+        for i in range(20):
+            self.write(f'v{i}', load_valuation())
+        created = []
+        barrier = threading.Barrier(4)
+
+        def refresh():
+            barrier.wait()
+            created.extend(self.index.refresh()[0])
+
+        threads = [threading.Thread(target=refresh) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(created), sorted(f'v{i}' for i in range(20)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import time
+import unittest
+
+import server
+from tests.support import ServerTestCase
+
+
+def spin(seconds):
+    """A job task that runs for ``seconds`` unless its job is cancelled."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        server.check_cancelled()
+        time.sleep(0.01)
+    return seconds
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.02)
+
+
+class JobManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = server.JobManager(max_workers=1, max_jobs=2)
+        self.addCleanup(self.manager.shutdown)
+
+    def test_job_results_are_combined(self):
+        job = self.manager.submit('sum', [(pow, (2, 3)), (pow, (3, 2))], sum)
+        wait_for(lambda: job.status in server.JOB_STATUSES_FINISHED)
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result, 17)
+        self.assertIsNotNone(job.started)
+
+    def test_cancel_stops_a_running_task(self):
+        job = self.manager.submit('spin', [(spin, (60,))], sum)
+        wait_for(lambda: job.status == 'running')
+        self.manager.cancel(job.id)
+        self.assertEqual(job.status, 'cancelled')
+
+        # The single worker is only free again if the running task stopped
+        started = time.monotonic()
+        quick = self.manager.submit('quick', [(pow, (2, 10))], sum)
+        wait_for(lambda: quick.status in server.JOB_STATUSES_FINISHED)
+        self.assertEqual(quick.result, 1024)
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_timeout_stops_a_running_task(self):
+        job = self.manager.submit('spin', [(spin, (60,))], sum, timeout=0.5)
+        wait_for(lambda: job.status in server.JOB_STATUSES_FINISHED)
+        self.assertEqual(job.status, 'timed_out')
+        quick = self.manager.submit('quick', [(pow, (3, 3))], sum)
+        wait_for(lambda: quick.status in server.JOB_STATUSES_FINISHED, timeout=10)
+        self.assertEqual(quick.result, 27)
+
+    def test_queue_limit(self):
+        self.manager.submit('spin', [(spin, (60,))], sum)
+        self.manager.submit('spin', [(spin, (60,))], sum)
+        with self.assertRaises(server.JobQueueFull):
+            self.manager.submit('spin', [(spin, (60,))], sum)
+
+    def test_timeout_must_be_a_positive_finite_number(self):
+        for timeout in ('nan', 'inf', '-inf', 0, -1, 'soon'):
+            with self.subTest(timeout=timeout):
+                with self.assertRaises(ValueError):
+                    self.manager.submit('quick', [(pow, (2, 2))], sum, timeout=timeout)
+        job = self.manager.submit('quick', [(pow, (2, 2))], sum, timeout=1e9)
+        self.assertEqual(job.timeout, self.manager.max_timeout)
+
+    def test_check_cancelled_is_a_no_op_outside_jobs(self):
+        server.check_cancelled()
+
+
+class JobEndpointTests(ServerTestCase):
+    def test_montecarlo_job(self):
+        request = {'type': 'montecarlo', 'valuationId': 'nlrp3-inhibitor-parkinsons-2026-01-25',
+                   'params': {'draws': 25_000, 'seed': 5, 'bins': 10}}
+        response, body = self.request('POST', '/api/jobs', request)
+        self.assertEqual(response.status, 202)
+        job_id = json.loads(body)['id']
+
+        def finished():
+            _, body = self.request('GET', f'/api/jobs/{job_id}')
+            self.status = json.loads(body)
+            return self.status['status'] in server.JOB_STATUSES_FINISHED
+
+        wait_for(finished, timeout=60)
+        self.assertEqual(self.status['status'], 'succeeded')
+        doc = server.VALUATION_INDEX.get('nlrp3-inhibitor-parkinsons-2026-01-25').data
+        expected = server.run_monte_carlo(doc, draws=25_000, seed=5, bins=10)
+        self.assertEqual(self.status['result']['percentiles'], expected['percentiles'])
+
+    def test_non_finite_timeout_is_rejected(self):
+        request = {'type': 'montecarlo', 'valuationId': 'nlrp3-inhibitor-parkinsons-2026-01-25',
+                   'params': {'draws': 100}, 'timeout': 'nan'}
+        response, body = self.request('POST', '/api/jobs', request)
+        self.assertEqual(response.status, 400)
+        self.assertIn('timeout', json.loads(body)['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from urllib.parse import quote
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+def valuation(name, area, stage=None, phase=None, generated='2026-01-01'):
+    doc = load_valuation()
+    overview = doc['assetOverview']
+    overview['assetName'] = name
+    overview['therapeuticArea'] = area
+    overview.pop('currentDevelopmentStage', None)
+    if stage is not None:
+        overview['currentDevelopmentStage'] = stage
+    if phase is not None:
+        overview['currentDevelopmentPhase'] = phase
+    doc.setdefault('metadata', {})['generatedDate'] = generated
+    return doc
+
+
+DOCUMENTS = {
+    'staged': valuation('Staged', 'Oncology', stage='Phase II', generated='2026-01-03'),
+    'phased': valuation('Phased', 'ONCOLOGY', phase='Phase III', generated='2026-01-02'),
+    'accented': valuation('Accented', 'Dermatología', stage='Preclinical', generated='2026-01-01'),
+}
+
+
+class SummaryTests(unittest.TestCase):
+    def test_stage_falls_back_to_development_phase(self):
+        summary = server.summarize_valuation('phased', DOCUMENTS['phased'])
+        self.assertEqual(summary['developmentStage'], 'Phase III')
+
+    def test_fold_case_only_folds_ascii(self):
+        self.assertEqual(server.fold_case('ONCOLOGY'), 'oncology')
+        self.assertEqual(server.fold_case('DERMATOLOGÍA'), 'dermatologÍa')
+
+
+class ListingTests:
+    """Runs against each store; both must list the same valuations."""
+
+    def ids(self, query=''):
+        response, body = self.request('GET', '/api/valuations' + query)
+        self.assertEqual(response.status, 200)
+        return [summary['id'] for summary in json.loads(body)]
+
+    def test_stage_filter_uses_development_phase(self):
+        self.assertEqual(self.ids('?stage=phase%203'), ['phased'])
+        self.assertEqual(self.ids('?stage=Phase%20II'), ['staged'])
+
+    def test_stage_sort_uses_development_phase(self):
+        self.assertEqual(self.ids('?sort=developmentStage'), ['accented', 'staged', 'phased'])
+
+    def test_pages_follow_the_cursor(self):
+        pages, cursor = [], None
+        while True:
+            response, body = self.request('GET', '/api/valuations?limit=1&sort=assetName' +
+                                          (f'&cursor={cursor}' if cursor else ''))
+            self.assertEqual(response.status, 200)
+            pages.append([summary['id'] for summary in json.loads(body)])
+            cursor = response.getheader('X-Next-Cursor')
+            if cursor is None:
+                break
+        self.assertEqual(pages, [['accented'], ['phased'], ['staged']])
+
+    def test_cursor_is_tied_to_its_sort(self):
+        response, _ = self.request('GET', '/api/valuations?limit=1&sort=assetName')
+        cursor = response.getheader('X-Next-Cursor')
+        response, _ = self.request('GET', f'/api/valuations?limit=1&sort=npv&cursor={cursor}')
+        self.assertEqual(response.status, 400)
+
+    def test_area_filter_folds_ascii_case_only(self):
+        self.assertEqual(self.ids('?area=oncology'), ['staged', 'phased'])
+        self.assertEqual(self.ids('?area=' + quote('dermatologÍa')), [])
+        self.assertEqual(self.ids('?area=' + quote('DERMATOLOGía')), ['accented'])
+
+
+class DirectoryListingTests(ListingTests, ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        directory = Path(cls.temp.name)
+        for valuation_id, doc in DOCUMENTS.items():
+            (directory / f'{valuation_id}.json').write_text(json.dumps(doc))
+        return server.ValuationBackend(server.ValuationIndex(directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+
+class SqliteListingTests(ListingTests, ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        store = server.SqliteValuationStore(Path(cls.temp.name) / 'valuations.db')
+        store.write_many(DOCUMENTS.items())
+        return server.ValuationBackend(store)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+import server
+from tests.support import ServerTestCase
+
+
+class MetricsRouteTests(unittest.TestCase):
+    def test_known_routes_keep_their_label(self):
+        self.assertEqual(server.metrics_route('/api/valuations?limit=5'), '/api/valuations')
+        self.assertEqual(server.metrics_route('/api/valuations/abc/dcf'), '/api/valuations/{id}/dcf')
+        self.assertEqual(server.metrics_route('/api/valuations/abc'), '/api/valuations/{id}')
+        self.assertEqual(server.metrics_route('/api/jobs/123'), '/api/jobs/{id}')
+        self.assertEqual(server.metrics_route('/index.html'), '/')
+        self.assertEqual(server.metrics_route('/styles.css'), 'static')
+
+    def test_unknown_api_paths_share_one_label(self):
+        for path in ('/api/made/up', '/api/valuations/abc/unknown', '/api/jobs/1/2', '/api', '/api/'):
+            with self.subTest(path=path):
+                self.assertEqual(server.metrics_route(path), 'other')
+
+
+class MetricsEndpointTests(ServerTestCase):
+    def test_unknown_routes_do_not_add_series(self):
+        self.request('GET', '/api/no/such/route')
+        response, body = self.request('GET', '/api/metrics')
+        self.assertEqual(response.status, 200)
+        text = body.decode()
+        self.assertNotIn('/api/no/such/route', text)
+        self.assertIn('route="other"', text)
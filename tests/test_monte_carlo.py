@@ -0,0 +1,51 @@
+import json
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+VALUATION_ID = 'nlrp3-inhibitor-parkinsons-2026-01-25'
+
+
+class MonteCarloTests(ServerTestCase):
+    def test_runs_are_reproducible(self):
+        doc = load_valuation()
+        first = server.run_monte_carlo(doc, draws=2_500, seed=11, bins=10)
+        self.assertEqual(first, server.run_monte_carlo(doc, draws=2_500, seed=11, bins=10))
+        self.assertEqual(first['draws'], 2_500)
+        self.assertEqual(sum(first['histogram']['counts']), 2_500)
+        self.assertLessEqual(first['percentiles']['p5'], first['percentiles']['p95'])
+
+    def test_draw_limits(self):
+        with self.assertRaises(ValueError):
+            server.monte_carlo_chunks(0)
+        with self.assertRaises(ValueError):
+            server.monte_carlo_chunks(server.MONTE_CARLO_MAX_DRAWS + 1)
+        with self.assertRaises(ValueError):
+            server.monte_carlo_chunks(1_000, bins=server.MONTE_CARLO_MAX_BINS + 1)
+        self.assertEqual(server.monte_carlo_chunks(25_000),
+                         [(0, 10_000), (1, 10_000), (2, 5_000)])
+
+    def test_endpoint_matches_run_monte_carlo(self):
+        response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}/montecarlo?draws=1000&seed=3&bins=5')
+        self.assertEqual(response.status, 200)
+        results = json.loads(body)
+        expected = server.run_monte_carlo(load_valuation(), draws=1000, seed=3, bins=5)
+        self.assertEqual(results['mean'], expected['mean'])
+        self.assertEqual(results['deterministicNpv'], server.calculate_dcf(load_valuation())['npv'])
+
+    def test_large_runs_are_sent_to_jobs(self):
+        draws = server.MONTE_CARLO_MAX_SYNC_DRAWS + 1
+        response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}/montecarlo?draws={draws}')
+        self.assertEqual(response.status, 400)
+        self.assertIn('/api/jobs', json.loads(body)['error'])
+
+    def test_bins_are_capped(self):
+        bins = server.MONTE_CARLO_MAX_BINS + 1
+        response, body = self.request('GET', f'/api/valuations/{VALUATION_ID}/montecarlo?draws=100&bins={bins}')
+        self.assertEqual(response.status, 400)
+        self.assertIn('bins', json.loads(body)['error'])
+        response, body = self.request('POST', '/api/jobs', {
+            'type': 'montecarlo', 'valuationId': VALUATION_ID, 'params': {'draws': 100, 'bins': bins},
+        })
+        self.assertEqual(response.status, 400)
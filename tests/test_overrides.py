@@ -0,0 +1,45 @@
+import json
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+VALUATION_ID = 'nlrp3-inhibitor-parkinsons-2026-01-25'
+
+
+class ApplyOverridesTests(ServerTestCase):
+    def test_nested_and_flat_overrides_agree(self):
+        doc = load_valuation()
+        nested = server.apply_overrides(doc, {'marketParameters': {'annualPricing': 30000}})
+        flat = server.apply_overrides(doc, {'marketParameters.annualPricing': 30000})
+        self.assertEqual(nested, flat)
+        self.assertEqual(nested['marketParameters']['annualPricing']['value'], 30000)
+        self.assertEqual(nested['marketParameters']['annualPricing']['source'],
+                         doc['marketParameters']['annualPricing']['source'])
+        self.assertEqual(doc, load_valuation())
+
+    def test_scalar_section_override_is_rejected(self):
+        with self.assertRaises(ValueError):
+            server.apply_overrides(load_valuation(), {'marketParameters': 5})
+        with self.assertRaises(ValueError):
+            server.apply_overrides(load_valuation(), [])
+
+    def test_endpoint(self):
+        path = f'/api/valuations/{VALUATION_ID}/dcf'
+        response, body = self.request('POST', path, {'financialParameters.discountRate': 14})
+        self.assertEqual(response.status, 200)
+        expected = server.calculate_dcf(server.apply_overrides(load_valuation(), {'financialParameters.discountRate': 14}))
+        self.assertEqual(json.loads(body)['npv'], expected['npv'])
+
+        response, body = self.request('POST', path, {'marketParameters': 5})
+        self.assertEqual(response.status, 400)
+        self.assertIn('marketParameters', json.loads(body)['error'])
+
+    def test_overrides_the_model_cannot_value_are_rejected(self):
+        path = f'/api/valuations/{VALUATION_ID}/dcf'
+        for overrides in ({'assetOverview.currentDevelopmentStage': 'Phase IX'},
+                          {'financialParameters.discountRate': -100}):
+            with self.subTest(overrides=overrides):
+                response, body = self.request('POST', path, overrides)
+                self.assertEqual(response.status, 400)
+                self.assertIn('Invalid overrides', json.loads(body)['error'])
@@ -0,0 +1,101 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+class JsonPatchTests(unittest.TestCase):
+    def test_operations(self):
+        document = {'a': {'b': 1}, 'list': [1, 2]}
+        patched = server.apply_json_patch(document, [
+            {'op': 'add', 'path': '/a/c', 'value': 2},
+            {'op': 'replace', 'path': '/a/b', 'value': 3},
+            {'op': 'add', 'path': '/list/-', 'value': 3},
+            {'op': 'remove', 'path': '/list/0'},
+            {'op': 'copy', 'from': '/a/c', 'path': '/d'},
+            {'op': 'move', 'from': '/d', 'path': '/e~1f'},
+            {'op': 'test', 'path': '/e~1f', 'value': 2},
+        ])
+        self.assertEqual(patched, {'a': {'b': 3, 'c': 2}, 'list': [2, 3], 'e/f': 2})
+        self.assertEqual(document, {'a': {'b': 1}, 'list': [1, 2]})
+
+    def test_failures_leave_no_partial_result(self):
+        document = {'a': 1}
+        with self.assertRaises(server.JsonPatchTestFailed):
+            server.apply_json_patch(document, [{'op': 'replace', 'path': '/a', 'value': 2},
+                                               {'op': 'test', 'path': '/a', 'value': 1}])
+        for operations in ({'op': 'add'}, [{'op': 'remove', 'path': '/missing'}],
+                           [{'op': 'add', 'path': 'no-slash', 'value': 1}], [{'op': 'jump', 'path': '/a'}]):
+            with self.subTest(operations=operations):
+                with self.assertRaises(server.JsonPatchError):
+                    server.apply_json_patch(document, operations)
+        self.assertEqual(document, {'a': 1})
+
+
+class PatchEndpointTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        cls.directory = Path(cls.temp.name)
+        (cls.directory / 'asset.json').write_text(json.dumps(load_valuation()))
+        return server.ValuationBackend(server.ValuationIndex(cls.directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def patch(self, operations):
+        return self.request('PATCH', '/api/valuations/asset', operations)
+
+    def test_patch_is_served_at_once_and_written_later(self):
+        response, body = self.patch([{'op': 'replace', 'path': '/financialParameters/discountRate/value',
+                                      'value': 12}])
+        self.assertEqual(response.status, 200)
+        expected = load_valuation()
+        expected['financialParameters']['discountRate']['value'] = 12
+        self.assertEqual(json.loads(body)['npv'], server.calculate_dcf(expected)['npv'])
+
+        _, body = self.request('GET', '/api/valuations/asset')
+        self.assertEqual(json.loads(body)['financialParameters']['discountRate']['value'], 12)
+        self.backend.writer.flush_all()
+        on_disk = json.loads((self.directory / 'asset.json').read_text())
+        self.assertEqual(on_disk['financialParameters']['discountRate']['value'], 12)
+
+    def test_failed_test_operation_is_a_conflict(self):
+        response, _ = self.patch([{'op': 'test', 'path': '/assetOverview/assetName', 'value': 'Someone else'}])
+        self.assertEqual(response.status, 409)
+
+    def test_invalid_patch_is_rejected(self):
+        response, _ = self.patch({'op': 'replace'})
+        self.assertEqual(response.status, 400)
+        response, _ = self.request('PATCH', '/api/valuations/missing', [])
+        self.assertEqual(response.status, 404)
+
+    def test_patches_that_break_the_valuation_are_not_stored(self):
+        _, before = self.request('GET', '/api/valuations/asset')
+        for operations in ([{'op': 'replace', 'path': '', 'value': [1, 2]}],
+                           [{'op': 'replace', 'path': '/assetOverview', 'value': 5}],
+                           [{'op': 'replace', 'path': '/assetOverview/currentDevelopmentStage', 'value': 'Phase IX'}],
+                           [{'op': 'replace', 'path': '/financialParameters/discountRate/value', 'value': -100}]):
+            with self.subTest(operations=operations):
+                response, _ = self.patch(operations)
+                self.assertEqual(response.status, 400)
+                _, after = self.request('GET', '/api/valuations/asset')
+                self.assertEqual(json.loads(after), json.loads(before))
+                response, _ = self.request('GET', '/api/valuations/asset/dcf')
+                self.assertEqual(response.status, 200)
+
+    def test_put_rejects_documents_that_cannot_be_valued(self):
+        on_disk = (self.directory / 'asset.json').read_text()
+        broken = load_valuation()
+        broken['assetOverview']['currentDevelopmentStage'] = 'Phase IX'
+        for document in ([1, 2], {'assetOverview': []}, broken):
+            with self.subTest(document=document):
+                response, _ = self.request('PUT', '/api/valuations/asset', document)
+                self.assertEqual(response.status, 400)
+                self.assertEqual((self.directory / 'asset.json').read_text(), on_disk)
@@ -0,0 +1,86 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+def valuation(discount_rate):
+    doc = load_valuation()
+    doc['financialParameters']['discountRate']['value'] = discount_rate
+    return doc
+
+
+class PortfolioTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        directory = Path(cls.temp.name)
+        cls.documents = {'low': valuation(8), 'high': valuation(14)}
+        for valuation_id, doc in cls.documents.items():
+            (directory / f'{valuation_id}.json').write_text(json.dumps(doc))
+        return server.ValuationBackend(server.ValuationIndex(directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def test_totals_add_up_the_assets(self):
+        response, body = self.request('GET', '/api/portfolio')
+        self.assertEqual(response.status, 200)
+        portfolio = json.loads(body)
+        self.assertEqual(portfolio['assetCount'], 2)
+        self.assertEqual(portfolio['errors'], [])
+        npvs = {asset['id']: asset['npv'] for asset in portfolio['assets']}
+        for valuation_id, doc in self.documents.items():
+            self.assertAlmostEqual(npvs[valuation_id], server.calculate_dcf(doc)['npv'], places=6)
+        self.assertAlmostEqual(portfolio['totalNpv'], sum(npvs.values()), places=6)
+        self.assertAlmostEqual(sum(asset['shareOfTotal'] for asset in portfolio['assets']), 1.0)
+
+    def test_etag_follows_asset_content(self):
+        response, _ = self.request('GET', '/api/portfolio')
+        etag = response.getheader('ETag')
+        response, _ = self.request('GET', '/api/portfolio', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 304)
+
+        self.request('PATCH', '/api/valuations/high',
+                     [{'op': 'replace', 'path': '/financialParameters/discountRate/value', 'value': 15}])
+        self.addCleanup(self.request, 'PATCH', '/api/valuations/high',
+                        [{'op': 'replace', 'path': '/financialParameters/discountRate/value', 'value': 14}])
+        response, body = self.request('GET', '/api/portfolio', headers={'If-None-Match': etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+
+
+class PortfolioPoolTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        directory = Path(cls.temp.name)
+        cls.documents = {f'asset-{i}': valuation(8 + i) for i in range(server.PORTFOLIO_PARALLEL_THRESHOLD)}
+        for valuation_id, doc in cls.documents.items():
+            (directory / f'{valuation_id}.json').write_text(json.dumps(doc))
+        return server.ValuationBackend(server.ValuationIndex(directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def test_slow_batches_are_a_503(self):
+        with mock.patch.object(server, 'PORTFOLIO_TIMEOUT', 0):
+            response, _ = self.request('GET', '/api/portfolio')
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader('Retry-After'), '5')
+
+        # The aggregator's own pool, not the job pool, computes the batches
+        with mock.patch.object(server.JobManager, '_executor', side_effect=AssertionError('job pool used')):
+            response, body = self.request('GET', '/api/portfolio')
+        self.assertEqual(response.status, 200)
+        npvs = {asset['id']: asset['npv'] for asset in json.loads(body)['assets']}
+        for valuation_id, doc in self.documents.items():
+            self.assertAlmostEqual(npvs[valuation_id], server.calculate_dcf(doc)['npv'], places=6)
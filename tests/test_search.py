@@ -0,0 +1,51 @@
+import json
+import types
+import unittest
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+def entry(data):
+    return types.SimpleNamespace(data=data)
+
+
+class SearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = server.SearchIndex()
+        first = load_valuation()
+        first['financialParameters']['discountRate']['explanation'] = 'Quokka adjusted benchmark rate'
+        second = load_valuation()
+        second['marketParameters']['annualPricing']['source'] = 'Quokka pricing survey and wombat panel'
+        self.index.update('first', entry(first))
+        self.index.update('second', entry(second))
+
+    def test_hits_name_the_matching_fields(self):
+        total, hits = self.index.search('quokka')
+        self.assertEqual(total, 2)
+        paths = {hit['id']: [match['path'] for match in hit['matches']] for hit in hits}
+        self.assertEqual(paths['first'], ['financialParameters.discountRate.explanation'])
+        self.assertEqual(paths['second'], ['marketParameters.annualPricing.source'])
+
+    def test_every_term_must_match(self):
+        total, hits = self.index.search('quokka wombat')
+        self.assertEqual((total, [hit['id'] for hit in hits]), (1, ['second']))
+        self.assertEqual(self.index.search('quokka platypus'), (0, []))
+
+    def test_removed_valuations_are_forgotten(self):
+        self.index.update('second', None)
+        self.assertEqual([hit['id'] for hit in self.index.search('quokka')[1]], ['first'])
+        self.assertEqual(self.index.search('wombat'), (0, []))
+
+
+class SearchEndpointTests(ServerTestCase):
+    def test_query_is_required(self):
+        response, _ = self.request('GET', '/api/search?q=%20')
+        self.assertEqual(response.status, 400)
+
+    def test_search_finds_the_sample_valuation(self):
+        response, body = self.request('GET', '/api/search?q=parkinson&limit=5')
+        self.assertEqual(response.status, 200)
+        results = json.loads(body)
+        self.assertIn('nlrp3-inhibitor-parkinsons-2026-01-25', [hit['id'] for hit in results['hits']])
@@ -0,0 +1,51 @@
+import json
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+VALUATION_ID = 'nlrp3-inhibitor-parkinsons-2026-01-25'
+
+
+class SensitivityTests(ServerTestCase):
+    def test_tornado_matches_single_valuations(self):
+        doc = load_valuation()
+        results = server.run_sensitivity(doc, include_grid=False)
+        self.assertEqual(results['baseNpv'], server.calculate_dcf(doc)['npv'])
+        swings = [entry['swing'] for entry in results['tornado']]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        self.assertNotIn('grid', results)
+
+        top = results['tornado'][0]
+        section, key = top['parameter'].split('.')
+        doc[section][key]['value'] = top['lowValue']
+        self.assertAlmostEqual(server.calculate_dcf(doc)['npv'], top['lowNpv'], delta=1e-6 * abs(top['lowNpv']))
+
+    def test_grid_has_one_npv_per_cell(self):
+        grid = {'x': {'parameter': 'financialParameters.discountRate', 'values': [8, 10, 12]},
+                'y': {'parameter': 'marketParameters.peakMarketShare', 'values': [5, 10]}}
+        response, body = self.request('POST', f'/api/valuations/{VALUATION_ID}/sensitivity',
+                                      {'parameters': {'financialParameters.discountRate': None}, 'grid': grid})
+        self.assertEqual(response.status, 200)
+        results = json.loads(body)
+        self.assertEqual([len(row) for row in results['grid']['npv']], [3, 3])
+        self.assertEqual(len(results['tornado']), 1)
+
+    def test_unknown_parameter_is_rejected(self):
+        response, body = self.request('POST', f'/api/valuations/{VALUATION_ID}/sensitivity',
+                                      {'parameters': {'marketParameters.nope': None}})
+        self.assertEqual(response.status, 400)
+        self.assertIn('marketParameters.nope', json.loads(body)['error'])
+
+    def test_discount_rate_of_minus_100_is_rejected(self):
+        for parameters, grid in (
+            ({'financialParameters.discountRate': {'low': -100, 'high': 10}}, False),
+            ({'financialParameters.discountRate': 1100}, False),
+            ({}, {'x': {'parameter': 'financialParameters.discountRate', 'values': [-150, 10]},
+                  'y': {'parameter': 'marketParameters.peakMarketShare', 'values': [5, 10]}}),
+        ):
+            with self.subTest(parameters=parameters, grid=grid):
+                response, body = self.request('POST', f'/api/valuations/{VALUATION_ID}/sensitivity',
+                                              {'parameters': parameters, 'grid': grid})
+                self.assertEqual(response.status, 400)
+                self.assertIn('-100', json.loads(body)['error'])
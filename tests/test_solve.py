@@ -0,0 +1,49 @@
+import json
+import tempfile
+from pathlib import Path
+
+import server
+from tests.support import ServerTestCase
+from tests.test_dcf import load_valuation
+
+
+class SolveTests(ServerTestCase):
+    @classmethod
+    def make_backend(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        directory = Path(cls.temp.name)
+        doc = load_valuation()
+        (directory / 'asset.json').write_text(json.dumps(doc))
+        doc['financialParameters']['discountRate']['value'] = -100
+        (directory / 'undiscountable.json').write_text(json.dumps(doc))
+        return server.ValuationBackend(server.ValuationIndex(directory))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.temp.cleanup()
+
+    def solve(self, valuation_id, target):
+        response, body = self.request('POST', f'/api/valuations/{valuation_id}/solve', target)
+        return response.status, json.loads(body)
+
+    def test_break_even_discount_rate(self):
+        status, results = self.solve('asset', {'parameter': 'financialParameters.discountRate'})
+        self.assertEqual(status, 200)
+        solution = results['solutions'][0]
+        self.assertTrue(solution['converged'])
+        self.assertAlmostEqual(solution['achieved'], 0, delta=1e-3)
+
+    def test_bounds_outside_the_model_domain_are_rejected(self):
+        for parameter, bounds in [('financialParameters.discountRate', [-100, 20]),
+                                  ('financialParameters.discountRate', [-150, 20]),
+                                  ('developmentTimeline.phaseIIDuration', [0, 1e9]),
+                                  ('marketParameters.peakMarketShare', [0, 'inf'])]:
+            with self.subTest(parameter=parameter, bounds=bounds):
+                status, body = self.solve('asset', {'parameter': parameter, 'bounds': bounds})
+                self.assertEqual(status, 400)
+                self.assertIn('bounds', body['error'])
+
+    def test_undiscountable_document_is_a_client_error(self):
+        status, body = self.solve('undiscountable', {'parameter': 'marketParameters.peakMarketShare'})
+        self.assertEqual(status, 400)
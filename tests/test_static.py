@@ -0,0 +1,56 @@
+import gzip
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import server
+from tests.support import ServerTestCase
+
+
+class StaticAssetCacheTests(unittest.TestCase):
+    def test_files_are_reread_only_when_changed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'page.html'
+            path.write_text('<p>one</p>' * 100)
+            cache = server.StaticAssetCache(directory, check_interval=0)
+            first = cache.get('page.html')
+            self.assertIs(cache.get('page.html'), first)
+            self.assertIn('gzip', first.bodies)
+
+            path.write_text('<p>two</p>' * 100)
+            os.utime(path, ns=(1, 1))
+            second = cache.get('page.html')
+            self.assertNotEqual(second.etag, first.etag)
+
+            path.unlink()
+            self.assertIsNone(cache.get('page.html'))
+
+
+class StaticEndpointTests(ServerTestCase):
+    def test_page_is_served_compressed(self):
+        response, body = self.request('GET', '/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(gzip.decompress(body), (server.STATIC_DIR / 'index.html').read_bytes())
+        self.assertTrue(response.getheader('ETag').endswith('-gzip"'))
+
+    def test_validators(self):
+        response, _ = self.request('GET', '/styles.css')
+        etag, last_modified = response.getheader('ETag'), response.getheader('Last-Modified')
+        response, body = self.request('GET', '/styles.css', headers={'If-None-Match': etag})
+        self.assertEqual((response.status, body), (304, b''))
+        self.assertEqual(response.getheader('ETag'), etag)
+        response, _ = self.request('GET', '/styles.css', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status, 304)
+
+    def test_incompressible_files_are_sent_as_is(self):
+        response, body = self.request('GET', '/favicon.png', headers={'Accept-Encoding': 'gzip'})
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(body, (server.STATIC_DIR / 'favicon.png').read_bytes())
+
+    def test_head_has_no_body(self):
+        response, body = self.request('HEAD', '/index.html')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, b'')
+        self.assertGreater(int(response.getheader('Content-Length')), 0)